@@ -1,12 +1,107 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_request_context, jsonify, make_response, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import click
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from functools import wraps
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, groupby, islice
+import csv
+import hashlib
+import heapq
+import hmac
+import io
+import json
+import logging
 import os
+import queue
+import re
+import sys
+import threading
+import time
+import unicodedata
+import uuid
+import zlib
+from urllib.parse import quote
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import mysql.connector
 
+# Dependencias opcionales: JSON y compresión más rápidos si están instaladas
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+# Opcional: exportación columnar (Parquet / Arrow IPC)
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
 app = Flask(__name__)
 
 
+class JSONProviderRapido(DefaultJSONProvider):
+    """Proveedor JSON de Flask sobre orjson con la misma salida que el de Flask
+
+    Las fechas pasan por el default de Flask (http_date) y los Decimal salen
+    como string, igual que con jsonify; las claves se ordenan igual.
+    """
+
+    def _opciones(self, indentar=False):
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opciones()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        with medir_serializacion():
+            cuerpo = orjson.dumps(obj, default=self.default, option=self._opciones(indentar))
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+
+class JSONProviderMedido(DefaultJSONProvider):
+    """El proveedor JSON de Flask, midiendo la serialización de jsonify"""
+
+    def response(self, *args, **kwargs):
+        with medir_serializacion():
+            return super().response(*args, **kwargs)
+
+
+# API_JSON=std fuerza el encoder estándar de Flask
+if orjson is not None and os.getenv("API_JSON", "orjson") == "orjson":
+    app.json = JSONProviderRapido(app)
+else:
+    app.json = JSONProviderMedido(app)
+
+
 # Configuraciones de base de datos usando variables de entorno y nombres de servicios Docker
 MYSQL_CONFIG = {
     "host": os.getenv("MYSQL_HOST", "mysql"),  # nombre del servicio en docker-compose
@@ -34,334 +129,4135 @@ POSTGRES_CONFIG = {
 }
 
 
-def get_mysql_connection():
-    """Conexión a MySQL para hoja de vida"""
+# Configuración de los pools de conexiones (uno por backend)
+def _pool_config(prefijo, size="5", max_overflow="10"):
+    return {
+        "size": int(os.getenv(f"{prefijo}_POOL_SIZE", size)),
+        "max_overflow": int(os.getenv(f"{prefijo}_POOL_MAX_OVERFLOW", max_overflow)),
+        "timeout": float(os.getenv(f"{prefijo}_POOL_TIMEOUT", "10")),
+        "pre_ping": os.getenv(f"{prefijo}_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+        # Peticiones que pueden esperar conexión a la vez; las demás fallan enseguida (503)
+        "max_waiters": int(os.getenv(f"{prefijo}_POOL_MAX_WAITERS", "32")),
+        # Timeout de sentencia en el servidor, en segundos (0 = sin límite)
+        "statement_timeout": float(
+            os.getenv(f"{prefijo}_STATEMENT_TIMEOUT", os.getenv("API_STATEMENT_TIMEOUT", "30"))
+        ),
+    }
+
+MYSQL_POOL_CONFIG = _pool_config("MYSQL")
+MARIADB_POOL_CONFIG = _pool_config("MARIADB")
+POSTGRES_POOL_CONFIG = _pool_config("DB")
+
+
+# Timeout de sentencia para lecturas largas a propósito (volcados en streaming, índices, rollups)
+STATEMENT_TIMEOUT_LARGO = float(os.getenv("API_STATEMENT_TIMEOUT_LARGO", "600"))
+
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+class PoolSaturado(PoolTimeout):
+    """La cola de espera del pool está llena; se falla sin esperar"""
+
+
+def _marcar_saturado(backend):
+    """Anota en la petición en curso que faltó cupo, para responder 503 en vez de 500"""
+    if has_request_context():
+        g.saturado = backend
+
+
+class ConnectionPool:
+    """Pool de conexiones reutilizables con overflow, timeout y verificación al prestar"""
+
+    def __init__(self, name, connect, ping, set_timeout=None, size=5, max_overflow=10, timeout=10.0,
+                 pre_ping=True, max_waiters=32, statement_timeout=0.0):
+        self.name = name
+        self._connect = connect
+        self._ping = ping
+        self._set_timeout = set_timeout
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.max_waiters = max_waiters
+        self.statement_timeout = statement_timeout if set_timeout else 0.0
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._rechazos = 0
+        self._checkouts = 0
+        self._reconnects = 0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+        # id() de las conexiones prestadas que no deben volver al pool
+        self._descartadas = set()
+
+    def _acquire(self, timeout=None):
+        inicio = time.perf_counter()
+        timeout = self.timeout if timeout is None else timeout
+        limite = inicio + timeout
+        conn = None
+        with self._cond:
+            esperando = False
+            try:
+                while True:
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._open < self.size + self.max_overflow:
+                        self._open += 1
+                        break
+                    restante = limite - time.perf_counter()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        _marcar_saturado(self.name)
+                        raise PoolTimeout(
+                            f"Pool {self.name} agotado: sin conexiones libres tras {timeout}s"
+                        )
+                    if not esperando and self._waiting >= self.max_waiters:
+                        self._rechazos += 1
+                        _marcar_saturado(self.name)
+                        raise PoolSaturado(
+                            f"Pool {self.name} saturado: {self._waiting} peticiones ya esperan conexión"
+                        )
+                    if not esperando:
+                        esperando = True
+                        self._waits += 1
+                        self._waiting += 1
+                    self._cond.wait(restante)
+            finally:
+                if esperando:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if conn is None:
+                conn = self._nueva()
+            elif self.pre_ping and not self._ping(conn):
+                self._close(conn)
+                self._reconnects += 1
+                conn = self._nueva()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        transcurrido = time.perf_counter() - inicio
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_total += transcurrido
+            self._checkout_max = max(self._checkout_max, transcurrido)
+        return conn
+
+    def _release(self, conn, discard=False):
+        if not discard:
+            try:
+                # Cierra la transacción abierta para devolver la conexión limpia
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard or len(self._idle) >= self.size:
+                self._open -= 1
+            else:
+                self._idle.append(conn)
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close(conn)
+
+    def _nueva(self):
+        """Abre una conexión con el timeout de sentencia del pool ya fijado"""
+        conn = self._connect()
+        if self.statement_timeout:
+            try:
+                self._set_timeout(conn, self.statement_timeout)
+            except Exception:
+                self._close(conn)
+                raise
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self, timeout=None, statement_timeout=None):
+        """Presta una conexión del pool y la devuelve al salir del bloque
+
+        timeout reemplaza, solo para esta espera, el timeout del pool.
+        statement_timeout reemplaza, mientras dure el bloque, el timeout de
+        sentencia del pool (segundos, 0 = sin límite); al salir se restaura.
+        """
+        inicio = time.perf_counter()
+        conn = self._acquire(timeout)
+        sumar_fase(self.name, "conexion", time.perf_counter() - inicio)
+        cambiar = (
+            self._set_timeout is not None and statement_timeout is not None
+            and statement_timeout != self.statement_timeout
+        )
+        descartar = False
+        try:
+            if cambiar:
+                self._set_timeout(conn, statement_timeout)
+            yield conn
+        finally:
+            with self._cond:
+                if id(conn) in self._descartadas:
+                    self._descartadas.discard(id(conn))
+                    descartar = True
+            if cambiar and not descartar:
+                try:
+                    conn.rollback()
+                    self._set_timeout(conn, self.statement_timeout)
+                except Exception:
+                    descartar = True
+            self._release(conn, descartar)
+
+    def descartar(self, conn):
+        """Cierra ya una conexión prestada; al salir del bloque no vuelve al pool
+
+        Para conexiones en un estado que no conviene limpiar, por ejemplo con
+        un resultado sin leer que el rollback tendría que descargar entero.
+        """
+        with self._cond:
+            self._descartadas.add(id(conn))
+        self._close(conn)
+
+    def calentar(self, n):
+        """Abre y deja libres hasta n conexiones (sin pasar de size); devuelve cuántas quedaron"""
+        conexiones = []
+        try:
+            for _ in range(min(n, self.size)):
+                conexiones.append(self._acquire())
+        except Exception as err:
+            print(f"No se pudo calentar el pool {self.name}: {err}")
+        finally:
+            for conn in conexiones:
+                self._release(conn)
+        return len(conexiones)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "timeout": self.timeout,
+                "pre_ping": self.pre_ping,
+                "max_waiters": self.max_waiters,
+                "statement_timeout": self.statement_timeout,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "rejected": self._rechazos,
+                "reconnects": self._reconnects,
+                "checkouts": self._checkouts,
+                "checkout_avg_ms": round(1000 * self._checkout_total / self._checkouts, 3) if self._checkouts else 0.0,
+                "checkout_max_ms": round(1000 * self._checkout_max, 3),
+            }
+
+
+def _ping_mysql(conn):
     try:
-        return mysql.connector.connect(**MYSQL_CONFIG)
-    except mysql.connector.Error as err:
-        print(f"Error conectando a MySQL: {err}")
-        return None
+        conn.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
 
-def get_mariadb_connection():
-    """Conexión a MariaDB para factura_db"""
+def _ping_postgres(conn):
+    if conn.closed:
+        return False
     try:
-        return mysql.connector.connect(**MARIADB_CONFIG)
-    except mysql.connector.Error as err:
-        print(f"Error conectando a MariaDB: {err}")
-        return None
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def _timeout_mysql(conn, segundos):
+    """max_statement_time de MariaDB (segundos); en MySQL, max_execution_time (ms, solo SELECT)"""
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute("SET SESSION max_statement_time = %s", (segundos,))
+        except mysql.connector.Error:
+            cursor.execute("SET SESSION max_execution_time = %s", (int(segundos * 1000),))
+    finally:
+        cursor.close()
+
+def _timeout_postgres(conn, segundos):
+    """statement_timeout en ms; se confirma para que el rollback al devolver no lo deshaga"""
+    with conn.cursor() as cur:
+        cur.execute("SET statement_timeout = %s", (int(segundos * 1000),))
+    conn.commit()
+
+
+mysql_pool = ConnectionPool(
+    "mysql", lambda: mysql.connector.connect(**MYSQL_CONFIG), _ping_mysql, _timeout_mysql, **MYSQL_POOL_CONFIG
+)
+mariadb_pool = ConnectionPool(
+    "mariadb", lambda: mysql.connector.connect(**MARIADB_CONFIG), _ping_mysql, _timeout_mysql,
+    **MARIADB_POOL_CONFIG
+)
+postgres_pool = ConnectionPool(
+    "postgres", lambda: psycopg2.connect(**POSTGRES_CONFIG), _ping_postgres, _timeout_postgres,
+    **POSTGRES_POOL_CONFIG
+)
+
+POOLS = {"mysql": mysql_pool, "mariadb": mariadb_pool, "postgres": postgres_pool}
+
+
+class Saturado(Exception):
+    """Una ruta no tiene cupo: la cola de espera está llena o se agotó la espera"""
+
+
+class Limitador:
+    """Cupo de peticiones concurrentes con una cola de espera acotada
+
+    Con la cola llena se rechaza enseguida; si no, se espera hasta `espera`
+    segundos a que se libere un cupo.
+    """
+
+    def __init__(self, nombre, limite, cola=8, espera=2.0):
+        self.nombre = nombre
+        self.limite = limite
+        self.cola = cola
+        self.espera = espera
+        self._cond = threading.Condition()
+        self._activos = 0
+        self._esperando = 0
+        self._admitidas = 0
+        self._rechazos = 0
+        self._timeouts = 0
+
+    def entrar(self):
+        with self._cond:
+            if self._activos >= self.limite:
+                if self._esperando >= self.cola:
+                    self._rechazos += 1
+                    raise Saturado(f"Ruta {self.nombre} saturada: {self._esperando} peticiones en cola")
+                limite = time.perf_counter() + self.espera
+                self._esperando += 1
+                try:
+                    while self._activos >= self.limite:
+                        restante = limite - time.perf_counter()
+                        if restante <= 0:
+                            self._timeouts += 1
+                            raise Saturado(f"Ruta {self.nombre} saturada: sin cupo tras {self.espera}s")
+                        self._cond.wait(restante)
+                finally:
+                    self._esperando -= 1
+            self._activos += 1
+            self._admitidas += 1
+
+    def salir(self):
+        with self._cond:
+            self._activos -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": self.limite,
+                "queue": self.cola,
+                "wait": self.espera,
+                "active": self._activos,
+                "waiting": self._esperando,
+                "admitted": self._admitidas,
+                "rejected": self._rechazos,
+                "timeouts": self._timeouts,
+            }
+
+
+# Control de admisión por ruta (endpoint de Flask): "ruta=limite,..."; las rutas
+# que no aparecen no se limitan y un límite 0 quita el de la lista por defecto
+LIMITES_RUTAS_DEFECTO = (
+    "obtener_paises_estados_ciudades=2,tablas_persona=4,tabla_productos=4,"
+    "anomalias_precio=2,reporte_tiempo_experiencia_batch=4,facturas_bulk=2,"
+    "exportar_mundo=2,exportar_hoja_vida=2,exportar_tienda=2"
+)
+LIMITES_RUTAS = {
+    ruta.strip(): int(limite)
+    for ruta, limite in (
+        par.split("=", 1)
+        for par in (LIMITES_RUTAS_DEFECTO + "," + os.getenv("API_LIMITES_RUTAS", "")).split(",")
+        if "=" in par
+    )
+}
+COLA_RUTA = int(os.getenv("API_COLA_RUTA", "8"))
+COLA_ESPERA = float(os.getenv("API_COLA_ESPERA", "2"))
+RETRY_AFTER = int(os.getenv("API_RETRY_AFTER", "1"))
+
+LIMITADORES = {
+    ruta: Limitador(ruta, limite, COLA_RUTA, COLA_ESPERA)
+    for ruta, limite in LIMITES_RUTAS.items() if limite > 0
+}
+
+# Token para endpoints administrativos (si no se define, quedan abiertos)
+ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+
+# Caché de consultas por país (geografía casi estática)
+MUNDO_CACHE_CONFIG = {
+    "maxsize": int(os.getenv("MUNDO_CACHE_SIZE", "256")),
+    "ttl": float(os.getenv("MUNDO_CACHE_TTL", "600")),
+}
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por TTL"""
+
+    _FALTA = object()
+
+    def __init__(self, maxsize=256, ttl=600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._FALTA)
+            if item is self._FALTA:
+                self.misses += 1
+                return default
+            expira, valor = item
+            if expira < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return valor
+
+    def set(self, key, valor):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, valor)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicado=None):
+        """Elimina todas las entradas, o solo las claves donde predicado(clave) es verdadero"""
+        with self._lock:
+            if predicado is None:
+                n = len(self._data)
+                self._data.clear()
+                return n
+            claves = [k for k in self._data if predicado(k)]
+            for k in claves:
+                del self._data[k]
+            return len(claves)
+
+    def get_or_load(self, key, loader):
+        """Lectura a través de la caché: loader() devuelve (valor, err) y solo se guarda sin error"""
+        valor = self.get(key, self._FALTA)
+        if valor is not self._FALTA:
+            return valor, None
+        valor, err = loader()
+        if not err:
+            self.set(key, valor)
+        return valor, err
+
+    def stats(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+mundo_cache = TTLCache(**MUNDO_CACHE_CONFIG)
+
+# Caché del reporte de experiencia por documento; se invalida con experiencia_cambios
+REPORTE_CACHE_CONFIG = {
+    "maxsize": int(os.getenv("REPORTE_CACHE_SIZE", "1024")),
+    "ttl": float(os.getenv("REPORTE_CACHE_TTL", "300")),
+}
+REPORTE_CAMBIOS_INTERVALO = float(os.getenv("REPORTE_CAMBIOS_INTERVALO", "2"))
+
+reporte_cache = TTLCache(**REPORTE_CACHE_CONFIG)
+
+
+def requiere_admin():
+    """Devuelve una respuesta 403 si el token administrativo no coincide"""
+    if ADMIN_TOKEN and not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "No autorizado"}), 403
+    return None
+
+def normalizar_pais(country_name):
+    """Clave de un país para cachés e índices: el nombre sin mayúsculas, como lo compara ILIKE"""
+    return country_name.lower()
+
+
+# Observadores de sentencias SQL: reciben (backend, sql, params) antes de ejecutarlas
+_observadores_sql = []
+
+def observar_sql(funcion):
+    """Registra una función que se llama con cada sentencia que emite la API"""
+    _observadores_sql.append(funcion)
+    return funcion
+
+def notificar_sql(backend, sql, params=()):
+    for funcion in _observadores_sql:
+        funcion(backend, sql, params)
+
+
+# Métricas estilo Prometheus (GET /metrics), por proceso
+METRICAS_BUCKETS = tuple(
+    float(b) for b in os.getenv(
+        "API_METRICAS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+)
+# Consultas de al menos SLOW_QUERY_MS milisegundos van al registro (negativo lo apaga)
+SLOW_QUERY_MS = float(os.getenv("API_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_SQL_MAX = 2000
+# Parámetros con forma de documento de identidad (CC1001, 1020304050) no se registran
+DOCUMENTO_RE = re.compile(os.getenv("API_DOCUMENTO_RE", r"^[A-Za-z]{0,3}-?\d{4,}$"))
+
+
+def _etiquetas(nombres, valores):
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{nombre}="{valor}"')
+    return ",".join(pares)
 
-def get_db_connection():
-    return psycopg2.connect(**POSTGRES_CONFIG)
+class Histograma:
+    """Histograma por combinación de etiquetas, en el formato de texto de Prometheus"""
+
+    def __init__(self, nombre, ayuda, etiquetas, buckets=METRICAS_BUCKETS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                # Un contador por bucket, el de +Inf y la suma
+                serie = self._series[etiquetas] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[bisect_left(self.buckets, valor)] += 1
+            serie[-1] += valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(etiquetas, list(serie)) for etiquetas, serie in self._series.items()]
+        for etiquetas, serie in sorted(series):
+            base = _etiquetas(self.etiquetas, etiquetas)
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, serie):
+                acumulado += cuenta
+                lineas.append(f'{self.nombre}_bucket{{{base},le="{limite:g}"}} {acumulado}')
+            acumulado += serie[-2]
+            lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {serie[-1]:.6f}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {acumulado}")
+        return lineas
+
+class Contador:
+    """Contador por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, *etiquetas, valor=1):
+        with self._lock:
+            self._series[etiquetas] = self._series.get(etiquetas, 0) + valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        lineas.extend(f"{self.nombre}{{{_etiquetas(self.etiquetas, e)}}} {v}" for e, v in series)
+        return lineas
+
+
+METRICA_PETICIONES = Histograma(
+    "api_request_duration_seconds", "Duración de cada petición, hasta enviar el último byte",
+    ("route", "method", "status"),
+)
+METRICA_FASES = Histograma(
+    "api_phase_duration_seconds",
+    "Tiempo por petición en cada fase: conexion (pool), consulta (execute), lectura (fetch) y serializacion",
+    ("route", "backend", "phase"),
+)
+METRICA_SQL = Histograma("api_sql_duration_seconds", "Duración de cada sentencia (execute + fetch)", ("route", "backend"))
+METRICA_FILAS = Contador("api_sql_rows_total", "Filas leídas por las sentencias", ("route", "backend"))
+METRICA_LENTAS = Contador("api_slow_queries_total", "Sentencias de al menos API_SLOW_QUERY_MS", ("route", "backend"))
+METRICA_RECHAZOS = Contador(
+    "api_shed_requests_total", "Peticiones respondidas con 503 por falta de cupo", ("route", "limit")
+)
+METRICA_EXPORT_BYTES = Contador("api_export_bytes_total", "Bytes enviados por las exportaciones", ("backend", "format"))
+METRICA_EXPORT_SEGUNDOS = Contador(
+    "api_export_seconds_total", "Duración de las exportaciones; bytes / segundos = throughput", ("backend", "format")
+)
+METRICAS = [
+    METRICA_PETICIONES, METRICA_FASES, METRICA_SQL, METRICA_FILAS, METRICA_LENTAS, METRICA_RECHAZOS,
+    METRICA_EXPORT_BYTES, METRICA_EXPORT_SEGUNDOS,
+]
+
+# Registro de consultas lentas: una línea JSON por consulta, a stderr o a API_SLOW_QUERY_LOG
+log_lentas = logging.getLogger("api.consultas_lentas")
+log_lentas.setLevel(logging.INFO)
+log_lentas.propagate = False
+log_lentas.addHandler(
+    logging.FileHandler(os.environ["API_SLOW_QUERY_LOG"]) if os.getenv("API_SLOW_QUERY_LOG")
+    else logging.StreamHandler(sys.stderr)
+)
+
+
+def _ruta():
+    """Regla de la ruta en curso como etiqueta ("-" fuera de una petición)"""
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return "-"
+
+def _metricas_peticion():
+    return g.get("metricas") if has_request_context() else None
+
+def sumar_fase(backend, fase, segundos):
+    """Acumula tiempo de una fase en la petición en curso (fuera de una petición no hace nada)"""
+    metricas = _metricas_peticion()
+    if metricas is None:
+        return
+    clave = (backend, fase)
+    metricas["fases"][clave] = metricas["fases"].get(clave, 0.0) + segundos
+    if fase != "serializacion":
+        metricas["db"] += segundos
+
+@contextmanager
+def medir_serializacion():
+    """Suma a la fase serializacion el tiempo del bloque, sin el tiempo que pasó en la base"""
+    metricas = _metricas_peticion()
+    if metricas is None:
+        yield
+        return
+    inicio, db = time.perf_counter(), metricas["db"]
+    try:
+        yield
+    finally:
+        sumar_fase("api", "serializacion", time.perf_counter() - inicio - (metricas["db"] - db))
+
+def _redactar(params):
+    """Parámetros para el registro, sin números de documento"""
+    sensibles = set()
+    if has_request_context():
+        sensibles.update(str(v) for k, v in (request.view_args or {}).items() if "documento" in k)
+        datos = request.get_json(silent=True) if request.is_json else None
+        if isinstance(datos, dict) and isinstance(datos.get("documentos"), list):
+            sensibles.update(str(d) for d in datos["documentos"])
+    return [
+        "<redactado>" if isinstance(p, str) and (p in sensibles or DOCUMENTO_RE.match(p)) else p
+        for p in params
+    ]
+
+def registrar_sql(backend, sql, params, filas, segundos):
+    """Métricas de una sentencia terminada y, si fue lenta, su línea en el registro"""
+    ruta = _ruta()
+    METRICA_SQL.observar(segundos, ruta, backend)
+    METRICA_FILAS.sumar(ruta, backend, valor=filas)
+    if SLOW_QUERY_MS < 0 or segundos * 1000 < SLOW_QUERY_MS:
+        return
+    METRICA_LENTAS.sumar(ruta, backend)
+    log_lentas.info(json.dumps({
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "route": ruta,
+        "backend": backend,
+        "ms": round(segundos * 1000, 1),
+        "rows": filas,
+        "sql": " ".join(sql.split())[:SLOW_QUERY_SQL_MAX],
+        "params": _redactar(list(params or ())),
+    }, ensure_ascii=False, default=str))
+
+def ejecutar_sql(cursor, backend, sql, params=()):
+    """notificar_sql + execute, con el tiempo en la fase consulta; devuelve el instante de inicio"""
+    notificar_sql(backend, sql, params)
+    inicio = time.perf_counter()
+    cursor.execute(sql, params)
+    sumar_fase(backend, "consulta", time.perf_counter() - inicio)
+    return inicio
+
+def leer_sql(backend, sql, params, inicio, leer):
+    """Llama leer() (fetch) con el tiempo en la fase lectura y registra la sentencia"""
+    antes = time.perf_counter()
+    filas = leer()
+    fin = time.perf_counter()
+    sumar_fase(backend, "lectura", fin - antes)
+    registrar_sql(backend, sql, params, len(filas), fin - inicio)
+    return filas
+
+@app.before_request
+def iniciar_metricas():
+    g.metricas = {"inicio": time.perf_counter(), "fases": {}, "db": 0.0}
+
+@app.after_request
+def registrar_metricas(respuesta):
+    """Server-Timing con el tiempo hasta aquí; las métricas se registran al cerrar la respuesta
+
+    Se registra antes que comprimir_respuesta, así que corre después de ella.
+    En las respuestas en streaming Server-Timing es el tiempo al primer byte.
+    """
+    metricas = g.get("metricas")
+    if metricas is None:
+        return respuesta
+    transcurrido = time.perf_counter() - metricas["inicio"]
+    respuesta.headers["Server-Timing"] = f"app;dur={transcurrido * 1000:.1f}"
+    etiquetas = (_ruta(), request.method, str(respuesta.status_code))
+
+    def registrar():
+        ruta = etiquetas[0]
+        METRICA_PETICIONES.observar(time.perf_counter() - metricas["inicio"], *etiquetas)
+        for (backend, fase), segundos in metricas["fases"].items():
+            METRICA_FASES.observar(segundos, ruta, backend, fase)
+
+    respuesta.call_on_close(registrar)
+    return respuesta
+
+
+def get_mysql_connection(statement_timeout=None):
+    """Conexión a MySQL para hoja de vida (prestada del pool)"""
+    return mysql_pool.connection(statement_timeout=statement_timeout)
+
+def get_mariadb_connection(statement_timeout=None):
+    """Conexión a MariaDB para factura_db (prestada del pool)"""
+    return mariadb_pool.connection(statement_timeout=statement_timeout)
+
+def get_db_connection(statement_timeout=None):
+    """Conexión a Postgres para mundo (prestada del pool)"""
+    return postgres_pool.connection(statement_timeout=statement_timeout)
 
 def postgres_all(sql, params=None):
     params = params or ()
     try:
         with get_db_connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(sql, params)
-                return cur.fetchall(), None
+                inicio = ejecutar_sql(cur, "postgres", sql, params)
+                return leer_sql("postgres", sql, params, inicio, cur.fetchall), None
     except psycopg2.Error as e:
         return None, str(e)
+    except PoolTimeout as e:
+        return None, str(e)
     
 def query_mysql(sql, params=None, database="mysql"):
     """Ejecutar consulta en MySQL/MariaDB"""
     params = params or ()
-    connection = get_mysql_connection() if database == "mysql" else get_mariadb_connection()
-    
-    if not connection:
-        return None, "No se pudo conectar a la base de datos"
-    
+    pool_conexion = get_mysql_connection() if database == "mysql" else get_mariadb_connection()
+
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute(sql, params)
-        
-        # Para procedimientos almacenados, necesitamos obtener todos los result sets
-        results = []
-        for result in cursor.stored_results():
-            results.extend(result.fetchall())
-        
-        # Si no hay stored_results, usar fetchall normal
-        if not results:
-            results = cursor.fetchall()
-            
-        cursor.close()
-        connection.close()
-        return results, None
+        with pool_conexion as connection:
+            cursor = connection.cursor(dictionary=True)
+            inicio = ejecutar_sql(cursor, database, sql, params)
+
+            def leer():
+                # Para procedimientos almacenados, necesitamos obtener todos los result sets
+                results = []
+                for result in cursor.stored_results():
+                    results.extend(result.fetchall())
+
+                # Si no hay stored_results, usar fetchall normal
+                if not results:
+                    results = cursor.fetchall()
+                return results
+
+            results = leer_sql(database, sql, params, inicio, leer)
+            cursor.close()
+            return results, None
+    except PoolTimeout as err:
+        return None, str(err)
     except mysql.connector.Error as err:
+        print(f"Error en {database}: {err}")
         return None, str(err)
 
-# BASE DE DATOS HOJA DE VIDA
+def callproc_mysql(nombre, args=(), database="mysql"):
+    """Ejecutar un procedimiento almacenado; devuelve la lista de result sets (filas como dict)"""
+    pool_conexion = get_mysql_connection() if database == "mysql" else get_mariadb_connection()
 
-@app.route("/mundo/obtenerPaisesEstadosCiudades", methods=["GET"])
-def obtener_paises_estados_ciudades():
-    sql = """
-    SELECT
-        c.name AS country,
-        s.name AS state,
-        ci.name AS city
-    FROM countries c
-    JOIN states   s  ON s.country_id = c.id
-    JOIN cities   ci ON ci.state_id  = s.id
-    ORDER BY c.name, s.name, ci.name;
-    """
-    rows, err = postgres_all(sql)
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+    try:
+        with pool_conexion as connection:
+            cursor = connection.cursor()
+            sql = f"CALL {nombre}({', '.join(['%s'] * len(args))})"
+            notificar_sql(database, sql, args)
+            inicio = time.perf_counter()
+            cursor.callproc(nombre, args)
+            sumar_fase(database, "consulta", time.perf_counter() - inicio)
 
-@app.route("/mundo/obtenerPaisesEstadosCiudades/<string:country_name>", methods=["GET"])
-def obtener_por_pais(country_name):
-    sql = """
-    SELECT
-        c.name AS country,
-        s.name AS state,
-        ci.name AS city
-    FROM countries c
-    JOIN states   s  ON s.country_id = c.id
-    JOIN cities   ci ON ci.state_id  = s.id
-    WHERE c.name ILIKE %s
-    ORDER BY s.name, ci.name;
-    """
-    rows, err = postgres_all(sql, (country_name,))
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+            def leer():
+                conjuntos = []
+                for result in cursor.stored_results():
+                    columnas = result.column_names
+                    conjuntos.append([dict(zip(columnas, fila)) for fila in result.fetchall()])
+                return conjuntos
 
-@app.route("/mundo/listarCiudadesRepetidasPais/<string:country_name>", methods=["GET"])
-def listar_ciudades_repetidas_pais(country_name):
-    # Lista ciudades repetidas mostrando todos los estados donde aparecen
-    sql = """
-    SELECT
-        c.name AS country,
-        s.name AS state,
-        ci.name AS city
-    FROM countries c
-    JOIN states  s  ON s.country_id = c.id
-    JOIN cities  ci ON ci.state_id  = s.id
-    WHERE c.name ILIKE %s
-    AND ci.name IN (
-        SELECT ci2.name
-        FROM cities ci2
-        JOIN states s2 ON ci2.state_id = s2.id
-        JOIN countries c2 ON s2.country_id = c2.id
-        WHERE c2.name ILIKE %s
-        GROUP BY ci2.name
-        HAVING COUNT(*) > 1
-    )
-    ORDER BY ci.name, s.name;
-    """
-    rows, err = postgres_all(sql, (country_name, country_name,))
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+            conjuntos = leer_sql(database, sql, args, inicio, leer)
+            cursor.close()
+            return conjuntos, None
+    except PoolTimeout as err:
+        return None, str(err)
+    except mysql.connector.Error as err:
+        print(f"Error en {database}: {err}")
+        return None, str(err)
 
+# Tamaño de página máximo y filas por viaje del cursor de servidor
+PAGE_MAX = int(os.getenv("API_PAGE_MAX", "5000"))
+STREAM_ITERSIZE = int(os.getenv("API_STREAM_ITERSIZE", "2000"))
+STREAM_CHUNK_BYTES = 64 * 1024
 
 
-# Api para formato Unico de hoja de Vida
-@app.route("/hoja_vida/reporte_tiempo_experiencia/<string:numero_documento>", methods=["GET"])
-def reporte_tiempo_experiencia(numero_documento):
-    check_persona_sql = "SELECT persona_id FROM persona WHERE numero_documento = %s LIMIT 1"
-    persona_result, err = query_mysql(check_persona_sql, (numero_documento,))
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    if not persona_result:
-        return jsonify({"error": f"No existe persona con documento {numero_documento}"}), 404
+def postgres_stream(sql, params=None):
+    """Itera filas desde un cursor de servidor (con nombre) sin cargar todo en memoria
 
-    sql = """
-    WITH
-    persona_lookup AS (
-      SELECT persona_id
-      FROM persona
-      WHERE numero_documento = %s
-      LIMIT 1
-    ),
-    base AS (
-  SELECT
-    CASE
-      WHEN sector = 'PUBLICA' THEN 'SERVIDOR PÚBLICO'
-      WHEN (
-        INSTR(LOWER(empresa), 'independient') > 0 OR
-        INSTR(LOWER(empresa), 'freelan') > 0 OR
-        INSTR(LOWER(cargo_contrato), 'independient') > 0 OR
-        INSTR(LOWER(cargo_contrato), 'servicio') > 0
-      ) THEN 'TRABAJADOR INDEPENDIENTE'
-      ELSE 'EMPLEADO DEL SECTOR PRIVADO'
-    END AS categoria,
-
-    -- inicio siempre válido y no futuro
-    GREATEST(DATE(fecha_ingreso), DATE('1900-01-01')) AS ini,
-
-    -- fin: si es_actual=1 o no hay retiro => hoy; si retiro > hoy => hoy; si no, retiro
-    LEAST(
-      COALESCE(
-        CASE WHEN es_actual = 1 THEN CURDATE() ELSE fecha_retiro END,
-        CURDATE()
-      ),
-      CURDATE()
-    ) AS fin
-  FROM experiencia_laboral
-  WHERE persona_id = (SELECT persona_id FROM persona_lookup)
-    AND fecha_ingreso IS NOT NULL
-    ),
-    rangos AS (
-      SELECT categoria, ini, fin
-      FROM base
-      WHERE fin >= ini
-    ),
-
-    -- Colapso POR CATEGORÍA
-    orden_cat AS (
-      SELECT
-        categoria, ini, fin,
-        CASE WHEN LAG(fin) OVER (PARTITION BY categoria ORDER BY ini) >= ini THEN 0 ELSE 1 END AS nueva_isla
-      FROM rangos
-    ),
-    islas_cat AS (
-      SELECT
-        categoria, ini, fin,
-        SUM(nueva_isla) OVER (PARTITION BY categoria ORDER BY ini ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS grp
-      FROM orden_cat
-    ),
-    colapsado_cat AS (
-      SELECT categoria, MIN(ini) AS ini, MAX(fin) AS fin
-      FROM islas_cat
-      GROUP BY categoria, grp
-    ),
-    meses_categoria AS (
-      SELECT categoria, COALESCE(SUM(TIMESTAMPDIFF(MONTH, ini, fin)), 0) AS total_meses
-      FROM colapsado_cat
-      GROUP BY categoria
-    ),
-    detalle AS (
-      SELECT 'SERVIDOR PÚBLICO' AS categoria,
-             COALESCE((SELECT total_meses FROM meses_categoria WHERE categoria='SERVIDOR PÚBLICO'), 0) AS total_meses
-      UNION ALL
-      SELECT 'EMPLEADO DEL SECTOR PRIVADO',
-             COALESCE((SELECT total_meses FROM meses_categoria WHERE categoria='EMPLEADO DEL SECTOR PRIVADO'), 0)
-      UNION ALL
-      SELECT 'TRABAJADOR INDEPENDIENTE',
-             COALESCE((SELECT total_meses FROM meses_categoria WHERE categoria='TRABAJADOR INDEPENDIENTE'), 0)
-    ),
-
-    -- Colapso GLOBAL (todas las categorías) para TOTAL sin doble conteo
-    orden_global AS (
-      SELECT
-        ini, fin,
-        CASE WHEN LAG(fin) OVER (ORDER BY ini) >= ini THEN 0 ELSE 1 END AS nueva_isla
-      FROM (SELECT ini, fin FROM rangos) t
-    ),
-    islas_global AS (
-      SELECT
-        ini, fin,
-        SUM(nueva_isla) OVER (ORDER BY ini ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS grp
-      FROM orden_global
-    ),
-    colapsado_global AS (
-      SELECT MIN(ini) AS ini, MAX(fin) AS fin
-      FROM islas_global
-      GROUP BY grp
-    ),
-    total_global AS (
-      SELECT COALESCE(SUM(TIMESTAMPDIFF(MONTH, ini, fin)), 0) AS total_meses
-      FROM colapsado_global
-    ),
-    totales AS (
-      SELECT 'TOTAL TIEMPO EXPERIENCIA' AS categoria,
-             (SELECT total_meses FROM total_global) AS total_meses
-    )
-    SELECT
-      s.categoria AS ocupacion,
-      FLOOR(s.total_meses / 12) AS anios,
-      MOD(s.total_meses, 12) AS meses,
-      s.total_meses AS total_meses_calculados
-    FROM (
-      SELECT * FROM detalle
-      UNION ALL
-      SELECT * FROM totales
-    ) AS s
-    ORDER BY FIELD(
-      s.categoria,
-      'SERVIDOR PÚBLICO',
-      'EMPLEADO DEL SECTOR PRIVADO',
-      'TRABAJADOR INDEPENDIENTE',
-      'TOTAL TIEMPO EXPERIENCIA'
-    )
+    statement_timeout cuenta por cada FETCH, así que basta el timeout normal.
     """
+    params = params or ()
+    with get_db_connection() as conn:
+        with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = STREAM_ITERSIZE
+            inicio = ejecutar_sql(cur, "postgres", sql, params)
+            filas = 0
+            try:
+                while True:
+                    antes = time.perf_counter()
+                    bloque = cur.fetchmany(STREAM_ITERSIZE)
+                    sumar_fase("postgres", "lectura", time.perf_counter() - antes)
+                    if not bloque:
+                        break
+                    filas += len(bloque)
+                    yield from bloque
+            finally:
+                registrar_sql("postgres", sql, params, filas, time.perf_counter() - inicio)
 
-    rows, err = query_mysql(sql, (numero_documento,))
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
+def mysql_stream(sql, params=None, database="mysql", diccionario=True):
+    """Itera filas con un cursor sin buffer de mysql-connector (memoria constante)
 
-    resultado = [{
-        "ocupacion": r["ocupacion"],
-        "años": int(r["anios"]),
-        "meses": int(r["meses"]),
-        "total_meses": int(r["total_meses_calculados"]),
-        "descripcion": f"{int(r['anios'])} años y {int(r['meses'])} meses"
-    } for r in rows]
+    Con cursor sin buffer la sentencia sigue viva mientras se envían las filas,
+    así que usa STATEMENT_TIMEOUT_LARGO en vez del timeout del pool. Con
+    diccionario=False las filas son tuplas en el orden del SELECT.
+    """
+    params = params or ()
+    pool = mysql_pool if database == "mysql" else mariadb_pool
+    with pool.connection(statement_timeout=STATEMENT_TIMEOUT_LARGO) as conn:
+        cursor = conn.cursor(dictionary=diccionario, buffered=False)
+        inicio, leidas, completo = None, 0, False
+        try:
+            inicio = ejecutar_sql(cursor, database, sql, params)
+            while True:
+                antes = time.perf_counter()
+                filas = cursor.fetchmany(STREAM_ITERSIZE)
+                sumar_fase(database, "lectura", time.perf_counter() - antes)
+                if not filas:
+                    break
+                leidas += len(filas)
+                yield from filas
+            completo = True
+        finally:
+            if inicio is not None:
+                registrar_sql(database, sql, params, leidas, time.perf_counter() - inicio)
+            if inicio is not None and not completo:
+                # El cliente cortó (o falló la lectura) con filas sin leer: descargarlas para
+                # reutilizar la conexión puede tardar tanto como la consulta entera. Se cierra;
+                # el servidor aborta la sentencia al no poder seguir enviando.
+                pool.descartar(conn)
+            else:
+                cursor.close()
 
-    return jsonify({"numero_documento": numero_documento, "reporte_experiencia": resultado}), 200
+def iniciar_stream(filas):
+    """Arranca un generador de filas para detectar errores antes de enviar la respuesta"""
+    try:
+        primera = next(filas)
+    except StopIteration:
+        return iter(()), None
+    except (psycopg2.Error, mysql.connector.Error, PoolTimeout) as err:
+        return None, str(err)
+    return chain([primera], filas), None
 
+def _agrupar(partes):
+    """Junta fragmentos pequeños en bloques de ~64KB para el envío chunked"""
+    buffer, tam = [], 0
+    for parte in partes:
+        buffer.append(parte)
+        tam += len(parte)
+        if tam >= STREAM_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, tam = [], 0
+    if buffer:
+        yield "".join(buffer)
 
-@app.route("/hoja_vida/tablas_persona/<string:name_tabla>", methods=["GET"])
-def tablas_persona(name_tabla):
-    # Validar nombres de tabla permitidos para evitar SQL injection
-    tablas_permitidas = ['persona', 'pais', 'estado', 'ciudad', 'distrito_militar', 
-                        'libreta_militar', 'idioma', 'educacion_basica', 
-                        'educacion_superior', 'experiencia_laboral']
-    
-    if name_tabla not in tablas_permitidas:
-        return jsonify({"error": "Tabla no permitida"}), 400
-    
-    sql = f"SELECT * FROM {name_tabla}"
-    rows, err = query_mysql(sql, (), "mysql")
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+def _json_array(filas):
+    yield "["
+    separador = ""
+    for fila in filas:
+        yield separador + app.json.dumps(fila)
+        separador = ","
+    yield "]"
 
+def _ndjson(filas):
+    for fila in filas:
+        yield app.json.dumps(fila) + "\n"
 
+def _columnas(filas):
+    """Un arreglo por columna ({"a": [...], "b": [...]}) en vez de un objeto por fila"""
+    columnas = {}
+    for fila in filas:
+        if not columnas:
+            columnas = {clave: [] for clave in fila}
+        for clave, valores in columnas.items():
+            valores.append(fila[clave])
+    yield app.json.dumps(columnas)
 
-    # BASE DE DATOS FACTURA
+FORMATOS = ("json", "ndjson", "columns")
 
-@app.route("/factura_db/historial_precio/<string:producto_name>", methods=["GET"])
-def historial_precio(producto_name):
-    sql = """
-    SELECT 
-        a.nombre AS articulo,
-        h.precio,
-        h.fecha_inicio,
-        h.fecha_fin
-    FROM historial_precio h
-    JOIN articulo a ON h.articulo_id = a.articulo_id
-    WHERE a.nombre = %s 
-    ORDER BY h.fecha_inicio
+def formato_solicitado():
+    formato = request.args.get("format", "json")
+    return formato if formato in FORMATOS else None
+
+def respuesta_filas(filas, formato="json", headers=None, stream=False):
+    """Respuesta JSON (arreglo), NDJSON o columnar; con stream=True se envía por bloques
+
+    El formato columnar arma todas las columnas antes de enviar, así que no
+    mantiene la memoria constante en los volcados sin limit.
     """
-    rows, err = query_mysql(sql, (producto_name,), "mariadb")
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+    if formato == "ndjson":
+        cuerpo, mimetype = _ndjson(filas), "application/x-ndjson"
+    elif formato == "columns":
+        cuerpo, mimetype = _columnas(filas), "application/json"
+    else:
+        cuerpo, mimetype = _json_array(filas), "application/json"
+    if stream:
+        return Response(stream_with_context(_medir_bloques(_agrupar(cuerpo))), status=200, mimetype=mimetype, headers=headers)
+    with medir_serializacion():
+        datos = "".join(cuerpo)
+    return Response(datos, status=200, mimetype=mimetype, headers=headers)
 
+def _medir_bloques(bloques):
+    """Mide la serialización de cada bloque (el tiempo en la base se descuenta)"""
+    try:
+        while True:
+            with medir_serializacion():
+                bloque = next(bloques, None)
+            if bloque is None:
+                return
+            yield bloque
+    finally:
+        bloques.close()
 
-@app.route("/factura_db/tabla_productos/<string:name_tabla>", methods=["GET"])
-def tabla_productos(name_tabla):
-    # Validar nombres de tabla permitidos para evitar SQL injection
-    tablas_permitidas = ['cliente', 'articulo', 'historial_precio', 'factura', 'detalle_factura']
-    
-    if name_tabla not in tablas_permitidas:
-        return jsonify({"error": "Tabla no permitida"}), 400
-    
-    sql = f"SELECT * FROM {name_tabla}"
-    rows, err = query_mysql(sql, (), "mariadb")
-    if err:
-        return jsonify({"error": "DB error", "detail": err}), 500
-    return jsonify(rows), 200
+def parse_after(valor, partes):
+    """Decodifica el cursor keyset `a,b,c` (admite comillas estilo CSV)"""
+    campos = next(csv.reader([valor]), [])
+    if len(campos) not in partes:
+        return None
+    return campos
 
+def format_after(campos):
+    salida = io.StringIO()
+    csv.writer(salida, lineterminator="").writerow(campos)
+    return salida.getvalue()
 
+# Versiones por tabla para el ETag: valores que cambian con cada escritura.
+# Registro version_cambios (lo llenan triggers, ver */version_tablas.sql): cada
+# escritura agrega una fila y la versión de una tabla es cuántos cambios lleva,
+# los ya plegados en version_plegado más los que siguen en el registro
+VERSIONES_TTL = float(os.getenv("API_VERSIONES_TTL", "1"))
+# Los cambio_id pueden confirmarse fuera de orden: quien lee un registro de cambios
+# por cambio_id relee esta ventana para no saltar uno que confirma tarde
+VERSIONES_VENTANA = 10000
+# Cada cuántos segundos se pliega el registro, y cuántos cambios por transacción
+VERSIONES_PLEGAR_INTERVALO = float(os.getenv("API_VERSIONES_PLEGAR", "60"))
+VERSIONES_PLEGAR_LOTE = 50000
+VERSIONES_IDS_POR_DELETE = 1000
 
-@app.route("/health", methods=["GET"])
-def health():
-    return jsonify({"status": "ok"}), 200
+SQL_VERSIONES = """
+SELECT p.tabla, p.cambios + (SELECT COUNT(*) FROM version_cambios c WHERE c.tabla = p.tabla) AS version
+FROM version_plegado p
+"""
+SQL_PLEGAR_VERSIONES = {
+    "mysql": "INSERT INTO version_plegado (tabla, cambios) VALUES {} "
+             "ON DUPLICATE KEY UPDATE cambios = cambios + VALUES(cambios)",
+    "postgres": "INSERT INTO version_plegado (tabla, cambios) VALUES {} "
+                "ON CONFLICT (tabla) DO UPDATE SET cambios = version_plegado.cambios + EXCLUDED.cambios",
+}
+
+_versiones = {}
+_plegado = {"siguiente": {}, "en_curso": set()}
+_plegado_lock = threading.Lock()
+
+def versiones_tablas(database):
+    """{tabla: version} de la base, releído como mucho cada VERSIONES_TTL segundos (None si falla)"""
+    ahora = time.monotonic()
+    vigente = _versiones.get(database)
+    if vigente and vigente[0] > ahora:
+        return vigente[1]
+    if database == "postgres":
+        rows, err = postgres_all(SQL_VERSIONES)
+    else:
+        rows, err = query_mysql(SQL_VERSIONES, (), database)
+    if err:
+        return None
+    versiones = {r["tabla"]: str(r["version"]) for r in rows}
+    _versiones[database] = (ahora + VERSIONES_TTL, versiones)
+    # El registro se pliega en segundo plano, como mucho cada VERSIONES_PLEGAR_INTERVALO segundos
+    with _plegado_lock:
+        lanzar = database not in _plegado["en_curso"] and _plegado["siguiente"].get(database, float("-inf")) <= ahora
+        if lanzar:
+            _plegado["en_curso"].add(database)
+            _plegado["siguiente"][database] = ahora + VERSIONES_PLEGAR_INTERVALO
+    if lanzar:
+        threading.Thread(target=_plegar_en_segundo_plano, args=(database,), name=f"versiones-{database}", daemon=True).start()
+    return versiones
+
+def plegar_versiones(database):
+    """Pasa los cambios confirmados de version_cambios a los contadores de version_plegado
+
+    Cada lote es una transacción READ COMMITTED que toma sus filas con FOR
+    UPDATE SKIP LOCKED (los cambios que aún no confirman quedan para después),
+    las suma a version_plegado y las borra: la versión de cada tabla no cambia
+    y el registro no crece sin límite. Las escrituras solo insertan en el
+    registro, así que no esperan por el contador. Devuelve (plegados, err).
+    """
+    plegados = 0
+    try:
+        postgres = database == "postgres"
+        if postgres:
+            conexion = get_db_connection()
+        else:
+            conexion = get_mysql_connection() if database == "mysql" else get_mariadb_connection()
+        with conexion as conn:
+            cursor = conn.cursor()
+            while True:
+                if not postgres:
+                    conn.start_transaction(isolation_level="READ COMMITTED")
+                cursor.execute(
+                    "SELECT cambio_id, tabla FROM version_cambios ORDER BY cambio_id LIMIT %s FOR UPDATE SKIP LOCKED",
+                    (VERSIONES_PLEGAR_LOTE,),
+                )
+                filas = cursor.fetchall()
+                if not filas:
+                    conn.commit()
+                    break
+                por_tabla = Counter(tabla for _, tabla in filas)
+                cursor.execute(
+                    SQL_PLEGAR_VERSIONES["postgres" if postgres else "mysql"].format(", ".join(["(%s, %s)"] * len(por_tabla))),
+                    [valor for par in por_tabla.items() for valor in par],
+                )
+                ids = [cambio_id for cambio_id, _ in filas]
+                for inicio in range(0, len(ids), VERSIONES_IDS_POR_DELETE):
+                    parte = ids[inicio:inicio + VERSIONES_IDS_POR_DELETE]
+                    cursor.execute(
+                        "DELETE FROM version_cambios WHERE cambio_id IN (" + ", ".join(["%s"] * len(parte)) + ")", parte
+                    )
+                conn.commit()
+                plegados += len(filas)
+                if len(filas) < VERSIONES_PLEGAR_LOTE:
+                    break
+            cursor.close()
+    except (psycopg2.Error, mysql.connector.Error, PoolTimeout) as err:
+        return plegados, str(err)
+    return plegados, None
+
+def _plegar_en_segundo_plano(database):
+    try:
+        _, err = plegar_versiones(database)
+        if err:
+            print(f"Error plegando version_cambios de {database}: {err}")
+    finally:
+        with _plegado_lock:
+            _plegado["en_curso"].discard(database)
+
+@app.cli.group()
+def versiones():
+    """Registro de versiones del ETag (version_cambios)"""
+
+@versiones.command("plegar")
+def versiones_plegar():
+    """Pliega ya todo version_cambios en version_plegado (la API lo hace sola cada API_VERSIONES_PLEGAR segundos)"""
+    for database in ("mysql", "mariadb", "postgres"):
+        plegados, err = plegar_versiones(database)
+        if err:
+            raise click.ClickException(f"{database}: {err}")
+        click.echo(f"{database}: {plegados} cambios plegados")
+
+def respuesta_condicional(database, tablas, cache_control, por_dia=False, estado=None):
+    """ETag a partir de las versiones de las tablas, 304 para If-None-Match y Cache-Control
+
+    tablas es una lista o una función que recibe los argumentos de la ruta. Las
+    versiones se leen antes de consultar: si una escritura cae en medio, el ETag
+    queda viejo y el siguiente pedido trae el cuerpo otra vez (nunca al revés).
+    Con por_dia=True el ETag cambia cada día (respuestas que dependen de hoy).
+
+    Si el cuerpo sale de una caché o un índice en memoria que se pone al día
+    con retraso, la versión de las tablas puede adelantarse al cuerpo. Para
+    esas rutas estado() devuelve la versión que la caché ya aplicó (por
+    ejemplo el último cambio_id) y reemplaza a las tablas; None = sin ETag.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(**kwargs):
+            if estado is not None:
+                version = estado()
+                valores = None if version is None else [version]
+            else:
+                nombres = tablas(**kwargs) if callable(tablas) else tablas
+                versiones = versiones_tablas(database)
+                valores = None
+                if versiones is not None and nombres and all(t in versiones for t in nombres):
+                    valores = [versiones[t] for t in nombres]
+            etag = None
+            if valores is not None:
+                partes = [
+                    request.endpoint, request.path, sorted(request.args.items(multi=True)),
+                    valores,
+                    date.today().isoformat() if por_dia else None,
+                ]
+                etag = hashlib.blake2b(repr(partes).encode(), digest_size=12).hexdigest()
+                # El cliente puede tener la versión comprimida (ETag con sufijo -gzip, -br...)
+                variantes = [etag, *(f"{etag}-{c}" for c in CODIFICACIONES)]
+                coincide = next((e for e in variantes if request.if_none_match.contains_weak(e)), None)
+                if coincide:
+                    respuesta = Response(status=304)
+                    respuesta.set_etag(coincide)
+                    respuesta.headers["Cache-Control"] = cache_control
+                    respuesta.vary.add("Accept-Encoding")
+                    return respuesta
+
+            respuesta = make_response(vista(**kwargs))
+            if respuesta.status_code == 200:
+                if etag:
+                    respuesta.set_etag(etag)
+                respuesta.headers["Cache-Control"] = cache_control
+            return respuesta
+        return envoltura
+    return decorador
+
+# Cache-Control por tipo de dato: la geografía es casi estática y pública;
+# hoja de vida y tienda tienen datos personales, solo los guarda el navegador
+CACHE_MUNDO = os.getenv("API_CACHE_MUNDO", "public, max-age=300")
+CACHE_PRECIOS = os.getenv("API_CACHE_PRECIOS", "public, max-age=60")
+CACHE_PRIVADO = "private, no-cache"
+TABLAS_MUNDO = ("countries", "states", "cities")
+
+# Compresión negociada por Accept-Encoding (zstd y br solo si están instalados)
+COMPRESION_MINIMO = int(os.getenv("API_COMPRESION_MIN", "1024"))
+COMPRESION_TIPOS = {"application/json", "application/x-ndjson", "text/csv", "text/plain"}
+GZIP_NIVEL = int(os.getenv("API_GZIP_NIVEL", "6"))
+BROTLI_CALIDAD = int(os.getenv("API_BROTLI_CALIDAD", "5"))
+ZSTD_NIVEL = int(os.getenv("API_ZSTD_NIVEL", "3"))
+
+
+class Compresor:
+    """Interfaz común (comprimir/terminar) para gzip, brotli y zstd"""
+
+    def __init__(self, codificacion):
+        self.codificacion = codificacion
+        if codificacion == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_NIVEL).compressobj()
+        elif codificacion == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_CALIDAD)
+        else:
+            # wbits=31: deflate con cabecera y cola gzip
+            self._obj = zlib.compressobj(GZIP_NIVEL, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos):
+        if self.codificacion == "br":
+            return self._obj.process(datos)
+        return self._obj.compress(datos)
+
+    def terminar(self):
+        if self.codificacion == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+# Orden de preferencia del servidor entre las que acepta el cliente
+CODIFICACIONES = [
+    c for c in os.getenv("API_COMPRESION", "zstd,br,gzip").split(",")
+    if c == "gzip" or (c == "br" and brotli) or (c == "zstd" and zstandard)
+]
+
+def negociar_codificacion():
+    """Codificación con mayor q en Accept-Encoding; empata la preferencia del servidor"""
+    aceptadas = [(request.accept_encodings[c], -i, c) for i, c in enumerate(CODIFICACIONES)]
+    calidad, _, codificacion = max(aceptadas, default=(0, 0, None))
+    return codificacion if calidad > 0 else None
+
+def _comprimir_stream(partes, codificacion):
+    compresor = Compresor(codificacion)
+    try:
+        for parte in partes:
+            bloque = compresor.comprimir(parte.encode() if isinstance(parte, str) else parte)
+            if bloque:
+                yield bloque
+        yield compresor.terminar()
+    finally:
+        # Cierra el generador original (y su cursor) si el cliente se desconecta
+        if hasattr(partes, "close"):
+            partes.close()
+
+@app.after_request
+def comprimir_respuesta(respuesta):
+    if respuesta.status_code != 200 or respuesta.direct_passthrough:
+        return respuesta
+    if respuesta.mimetype not in COMPRESION_TIPOS or "Content-Encoding" in respuesta.headers:
+        return respuesta
+    respuesta.vary.add("Accept-Encoding")
+    codificacion = negociar_codificacion()
+    if codificacion is None:
+        return respuesta
+
+    if respuesta.is_streamed:
+        respuesta.response = _comprimir_stream(respuesta.response, codificacion)
+        respuesta.headers.pop("Content-Length", None)
+    else:
+        datos = respuesta.get_data()
+        if len(datos) < COMPRESION_MINIMO:
+            return respuesta
+        compresor = Compresor(codificacion)
+        respuesta.set_data(compresor.comprimir(datos) + compresor.terminar())
+    respuesta.headers["Content-Encoding"] = codificacion
+
+    # Cada codificación es una representación distinta: su propio ETag
+    etag, debil = respuesta.get_etag()
+    if etag:
+        respuesta.set_etag(f"{etag}-{codificacion}", debil)
+    return respuesta
+
+# Índice geográfico en memoria: startup (carga al iniciar), lazy (primer uso) u off
+GEO_INDEX_MODE = os.getenv("GEO_INDEX", "lazy").lower()
+
+
+class GeoIndex:
+    """Índice compacto en memoria de countries/states/cities
+
+    Los nombres se internan y los IDs/relaciones se guardan en arrays (columnas),
+    sin un dict por fila. Las ciudades quedan agrupadas por país en el orden
+    (state, city) que devuelve Postgres, así que cada país es un rango contiguo.
+    Los rangos de estado y ciudad son su posición en el orden de Postgres
+    (con su collation), para ordenar como las consultas cuando coinciden
+    varios países.
+    """
+
+    SQL = """
+    SELECT
+        c.id, c.name, s.id, s.name, ci.id, ci.name,
+        dense_rank() OVER (ORDER BY s.name) AS state_rank,
+        dense_rank() OVER (ORDER BY ci.name) AS city_rank
+    FROM countries c
+    JOIN states   s  ON s.country_id = c.id
+    JOIN cities   ci ON ci.state_id  = s.id
+    ORDER BY c.name, c.id, s.name, ci.name
+    """
+
+    def __init__(self):
+        self.country_ids = array("i")
+        self.country_names = []
+        self.country_start = array("i")
+        self.country_end = array("i")
+        self.country_key = {}
+        self.state_ids = array("i")
+        self.state_names = []
+        self.state_country = array("i")
+        self.state_rank = array("i")
+        self.city_ids = array("i")
+        self.city_names = []
+        self.city_state = array("i")
+        self.city_rank = array("i")
+        # Por país: nombre de ciudad repetida -> índices de los estados donde aparece
+        self.duplicates = {}
+        self.loaded_at = None
+        self.load_seconds = None
+
+    @classmethod
+    def load(cls):
+        """Construye el índice leyendo Postgres con un cursor de servidor"""
+        inicio = time.perf_counter()
+        with get_db_connection(STATEMENT_TIMEOUT_LARGO) as conn:
+            with conn.cursor(name=f"geo_index_{uuid.uuid4().hex}") as cur:
+                cur.itersize = STREAM_ITERSIZE
+                notificar_sql("postgres", cls.SQL)
+                cur.execute(cls.SQL)
+                indice = cls.desde_filas(cur)
+        indice.loaded_at = time.time()
+        indice.load_seconds = round(time.perf_counter() - inicio, 3)
+        return indice
+
+    @classmethod
+    def desde_filas(cls, filas):
+        """Construye el índice desde filas con las columnas y el orden de SQL"""
+        indice = cls()
+        estados = {}
+        pais_actual = None
+        ciudades_pais = {}
+        for country_id, country, state_id, state, city_id, city, state_rank, rank in filas:
+            if country_id != pais_actual:
+                if pais_actual is not None:
+                    indice._cerrar_pais(ciudades_pais)
+                pais_actual = country_id
+                ciudades_pais = {}
+                indice._abrir_pais(country_id, country)
+            idx_estado = estados.get(state_id)
+            if idx_estado is None:
+                idx_estado = estados[state_id] = len(indice.state_ids)
+                indice.state_ids.append(state_id)
+                indice.state_names.append(sys.intern(state))
+                indice.state_country.append(len(indice.country_ids) - 1)
+                indice.state_rank.append(state_rank)
+            indice.city_ids.append(city_id)
+            indice.city_names.append(sys.intern(city))
+            indice.city_state.append(idx_estado)
+            indice.city_rank.append(rank)
+            entrada = ciudades_pais.get(city)
+            if entrada is None:
+                entrada = ciudades_pais[city] = (rank, array("i"))
+            entrada[1].append(idx_estado)
+        if pais_actual is not None:
+            indice._cerrar_pais(ciudades_pais)
+        return indice
+
+    def _abrir_pais(self, country_id, country):
+        idx = len(self.country_ids)
+        self.country_ids.append(country_id)
+        self.country_names.append(sys.intern(country))
+        self.country_start.append(len(self.city_ids))
+        self.country_end.append(len(self.city_ids))
+        self.country_key.setdefault(normalizar_pais(country), []).append(idx)
+
+    def _cerrar_pais(self, ciudades_pais):
+        idx = len(self.country_ids) - 1
+        self.country_end[idx] = len(self.city_ids)
+        repetidas = sorted(
+            (rank, nombre, estados) for nombre, (rank, estados) in ciudades_pais.items() if len(estados) > 1
+        )
+        if repetidas:
+            self.duplicates[idx] = {sys.intern(nombre): estados for _, nombre, estados in repetidas}
+
+    def _paises(self, country_name):
+        """Países que cumplen name ILIKE country_name (None: lo resuelve Postgres)
+
+        Con comodines de ILIKE (% _ \\) la consulta no es una igualdad. Fuera de
+        ASCII, lower() de Python y el de Postgres pueden diferir.
+        """
+        if any(ch in country_name for ch in "%_\\") or not country_name.isascii():
+            return None
+        return self.country_key.get(normalizar_pais(country_name), [])
+
+    def _fila(self, pos):
+        return {
+            "country": self.country_names[self.state_country[self.city_state[pos]]],
+            "state": self.state_names[self.city_state[pos]],
+            "city": self.city_names[pos],
+        }
+
+    def por_pais(self, country_name):
+        """Filas {country, state, city} de los países que coinciden, ordenadas por estado y ciudad"""
+        paises = self._paises(country_name)
+        if paises is None:
+            return None
+        if len(paises) == 1:
+            return [self._fila(pos) for pos in range(self.country_start[paises[0]], self.country_end[paises[0]])]
+        # Varios países: el ORDER BY s.name, ci.name es sobre todos juntos
+        posiciones = [pos for idx in paises for pos in range(self.country_start[idx], self.country_end[idx])]
+        posiciones.sort(key=lambda pos: (self.state_rank[self.city_state[pos]], self.city_rank[pos]))
+        return [self._fila(pos) for pos in posiciones]
+
+    def repetidas_pais(self, country_name):
+        """Ciudades con el mismo nombre en varios registros de los países que coinciden, por ciudad y estado"""
+        paises = self._paises(country_name)
+        if paises is None:
+            return None
+        if len(paises) == 1:
+            country = self.country_names[paises[0]]
+            return [
+                {"country": country, "state": self.state_names[idx_estado], "city": city}
+                for city, estados in self.duplicates.get(paises[0], {}).items()
+                for idx_estado in estados
+            ]
+        # Varios países: una ciudad se repite si aparece más de una vez entre todos
+        posiciones = [pos for idx in paises for pos in range(self.country_start[idx], self.country_end[idx])]
+        veces = Counter(self.city_names[pos] for pos in posiciones)
+        posiciones = [pos for pos in posiciones if veces[self.city_names[pos]] > 1]
+        posiciones.sort(key=lambda pos: (self.city_rank[pos], self.state_rank[self.city_state[pos]]))
+        return [self._fila(pos) for pos in posiciones]
+
+    def memory_bytes(self):
+        """Memoria aproximada: contenedores más cada cadena única una sola vez"""
+        contenedores = [
+            self.country_ids, self.country_names, self.country_start, self.country_end,
+            self.country_key, self.state_ids, self.state_names, self.state_country, self.state_rank,
+            self.city_ids, self.city_names, self.city_state, self.city_rank, self.duplicates,
+        ]
+        total = sum(sys.getsizeof(c) for c in contenedores)
+        total += sum(sys.getsizeof(v) for v in self.country_key.values())
+        for mapa in self.duplicates.values():
+            total += sys.getsizeof(mapa) + sum(sys.getsizeof(e) for e in mapa.values())
+        cadenas = {id(t): t for t in chain(self.country_names, self.state_names, self.city_names, self.country_key)}
+        total += sum(sys.getsizeof(t) for t in cadenas.values())
+        return total
+
+    def stats(self):
+        return {
+            "countries": len(self.country_ids),
+            "states": len(self.state_ids),
+            "cities": len(self.city_ids),
+            "countries_with_duplicates": len(self.duplicates),
+            "memory_bytes": self.memory_bytes(),
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+
+_geo_index = None
+_geo_estado = {"loading": False, "error": None, "reloads": 0}
+_geo_lock = threading.Lock()
+
+
+def _cargar_geo_index():
+    global _geo_index
+    try:
+        nuevo = GeoIndex.load()
+    except (psycopg2.Error, PoolTimeout) as err:
+        print(f"Error cargando índice geográfico: {err}")
+        with _geo_lock:
+            _geo_estado.update(loading=False, error=str(err))
+        return
+    # El cambio de referencia es atómico: las peticiones en curso siguen con el índice anterior
+    with _geo_lock:
+        _geo_index = nuevo
+        _geo_estado.update(loading=False, error=None, reloads=_geo_estado["reloads"] + 1)
+
+def recargar_geo_index(esperar=False):
+    """Lanza la (re)carga del índice en segundo plano (o aquí con esperar=True); False si ya hay una en curso"""
+    with _geo_lock:
+        if _geo_estado["loading"]:
+            return False
+        _geo_estado["loading"] = True
+    if esperar:
+        _cargar_geo_index()
+    else:
+        threading.Thread(target=_cargar_geo_index, name="geo-index", daemon=True).start()
+    return True
+
+def geo_index():
+    """Índice vigente o None si aún no está listo (en modo lazy dispara la carga)"""
+    if _geo_index is None and GEO_INDEX_MODE == "lazy" and not _geo_estado["loading"]:
+        recargar_geo_index()
+    return _geo_index
+
+# Búsqueda typeahead en memoria (prefijos y trigramas): startup, lazy (primer uso) u off
+BUSQUEDA_INDEX_MODE = os.getenv("BUSQUEDA_INDEX", "lazy").lower()
+# Cada cuántos segundos se comparan las versiones de las tablas para recargar el índice
+BUSQUEDA_REVISION = float(os.getenv("BUSQUEDA_REVISION", "30"))
+BUSQUEDA_LIMIT_MAX = int(os.getenv("BUSQUEDA_LIMIT_MAX", "50"))
+CACHE_BUSQUEDA = os.getenv("API_CACHE_BUSQUEDA", "public, max-age=60")
+# Candidatos por prefijo que se revisan como máximo por consulta
+BUSQUEDA_CANDIDATOS = 1000
+# Candidatos a los que se les recalcula la similitud con todos sus trigramas
+BUSQUEDA_RECALCULO = 200
+# Similitud mínima de trigramas (la misma que pg_trgm por defecto)
+SIMILITUD_MIN = 0.3
+COINCIDENCIAS = ("exacta", "prefijo", "palabras", "similar")
+_no_alfanumerico = re.compile(r"[\W_]+")
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y palabras separadas por un espacio ("Bogotá D.C." -> "bogota d c")"""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+    return _no_alfanumerico.sub(" ", sin_tildes).strip()
+
+def trigramas(clave):
+    """Trigramas de cada palabra con el relleno de pg_trgm ("  bo", " bog", ..., "ta ")"""
+    resultado = set()
+    for palabra in clave.split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class IndiceTexto:
+    """Índice de búsqueda por prefijo de palabra y similitud de trigramas
+
+    Cada entrada tiene tipo, id, nombre y dos campos de contexto (internados).
+    Las palabras normalizadas van en una lista ordenada para buscar prefijos
+    con bisect; los trigramas en listas invertidas (arrays de entradas). El
+    orden base de las entradas es (tipo, largo del nombre, nombre), así que
+    para prefijos de una o dos letras se guardan de antemano las mejores, en
+    total y por tipo (las de un tipo no caben siempre entre las del total).
+    """
+
+    def __init__(self, tipos, contexto):
+        self.tipos = tipos
+        self.contexto = contexto
+        self.entrada_tipo = array("b")
+        self.ids = array("i")
+        self.nombres = []
+        self.contextos = []
+        self.claves = []
+        self.palabras = []
+        self.palabra_entrada = array("i")
+        self.rango = array("i")
+        self.num_trigramas = array("H")
+        self.postings = {}
+        self.cortos = {}
+        self.versiones = None
+        self.loaded_at = None
+        self.load_seconds = None
+
+    def agregar(self, tipo, id_, nombre, *contexto):
+        self.entrada_tipo.append(tipo)
+        self.ids.append(id_)
+        self.nombres.append(sys.intern(nombre))
+        self.contextos.append(tuple(sys.intern(c) if c else None for c in contexto))
+        self.claves.append(normalizar_texto(nombre))
+
+    def construir(self):
+        orden = sorted(range(len(self.ids)), key=lambda e: (self.entrada_tipo[e], len(self.claves[e]), self.claves[e]))
+        self.rango = array("i", bytes(4 * len(orden)))
+        for pos, e in enumerate(orden):
+            self.rango[e] = pos
+
+        pares = sorted(
+            {(palabra, self.rango[e], e) for e, clave in enumerate(self.claves) for palabra in clave.split()}
+        )
+        self.palabras = [sys.intern(palabra) for palabra, _, _ in pares]
+        self.palabra_entrada = array("i", (e for _, _, e in pares))
+
+        postings = {}
+        for e, clave in enumerate(self.claves):
+            propios = trigramas(clave)
+            self.num_trigramas.append(min(len(propios), 65535))
+            for t in propios:
+                postings.setdefault(t, []).append(e)
+        self.postings = {t: array("i", entradas) for t, entradas in postings.items()}
+
+        # (tipo o None, prefijo) -> mejores entradas
+        cortos = {}
+        for e in orden:
+            prefijos = {p for palabra in self.claves[e].split() for p in (palabra[:1], palabra[:2])}
+            for prefijo in prefijos:
+                for clave in ((None, prefijo), (self.entrada_tipo[e], prefijo)):
+                    mejores = cortos.setdefault(clave, array("i"))
+                    if len(mejores) < BUSQUEDA_LIMIT_MAX:
+                        mejores.append(e)
+        self.cortos = cortos
+
+    def _rango_prefijo(self, token):
+        inicio = bisect_left(self.palabras, token)
+        return inicio, bisect_left(self.palabras, token + "\uffff", inicio)
+
+    def _por_prefijo(self, tokens, tipo=None):
+        """Entradas (del tipo, si se da) donde cada token es prefijo de alguna palabra"""
+        if len(tokens) == 1 and len(tokens[0]) <= 2:
+            return self.cortos.get((tipo, tokens[0]), ())
+        # Se recorre el token con menos palabras que empiecen por él
+        rangos = sorted((fin - inicio, inicio, fin, t) for t, (inicio, fin) in
+                        ((t, self._rango_prefijo(t)) for t in set(tokens)))
+        _, pos, fin, guia = rangos[0]
+        otros = [t for *_, t in rangos[1:]]
+        if tipo is None:
+            fin = min(fin, pos + BUSQUEDA_CANDIDATOS)
+        encontradas = {}
+        revisadas = 0
+        for i in range(pos, fin):
+            e = self.palabra_entrada[i]
+            if e in encontradas or (tipo is not None and self.entrada_tipo[e] != tipo):
+                continue
+            # Con tipo el tope cuenta solo las entradas de ese tipo
+            revisadas += 1
+            if revisadas > BUSQUEDA_CANDIDATOS:
+                break
+            if otros:
+                clave = " " + self.claves[e]
+                if not all(" " + t in clave for t in otros):
+                    continue
+            encontradas[e] = None
+        return encontradas
+
+    def _similares(self, clave, excluir, tipo=None):
+        """(entrada, similitud) por trigramas (del tipo, si se da)
+
+        Cuenta solo sobre las listas poco comunes; si se omitió alguna, la
+        similitud de los mejores candidatos se recalcula con sus trigramas.
+        """
+        buscados = trigramas(clave)
+        listas = sorted((self.postings[t] for t in buscados if t in self.postings), key=len)
+        usadas = [lista for lista in listas if len(lista) <= BUSQUEDA_CANDIDATOS] or listas[:1]
+        omitidas = len(buscados) - len(usadas)
+        cuentas = Counter(chain.from_iterable(usadas))
+        if tipo is not None:
+            cuentas = Counter({e: n for e, n in cuentas.items() if self.entrada_tipo[e] == tipo})
+        if omitidas:
+            cuentas = dict(cuentas.most_common(BUSQUEDA_RECALCULO))
+        resultado = []
+        for e, comunes in cuentas.items():
+            if e in excluir:
+                continue
+            if omitidas:
+                maximo = comunes + omitidas
+                if maximo / (len(buscados) + self.num_trigramas[e] - maximo) < SIMILITUD_MIN:
+                    continue
+                comunes = len(buscados & trigramas(self.claves[e]))
+            similitud = comunes / (len(buscados) + self.num_trigramas[e] - comunes)
+            if similitud >= SIMILITUD_MIN:
+                resultado.append((e, similitud))
+        return resultado
+
+    def buscar(self, consulta, limite=10, tipo=None):
+        """Filas ordenadas: exacta, prefijo del nombre, prefijos de palabras y luego similares"""
+        clave = normalizar_texto(consulta)
+        if not clave:
+            return []
+        puntajes = {}
+        for e in self._por_prefijo(clave.split(), tipo):
+            nombre = self.claves[e]
+            calidad = 0 if nombre == clave else 1 if nombre.startswith(clave) else 2
+            puntajes[e] = (calidad, 0.0, self.rango[e])
+        if len(puntajes) < limite and len(clave) >= 3:
+            for e, similitud in self._similares(clave, puntajes, tipo):
+                puntajes[e] = (3, -similitud, self.rango[e])
+        filas = []
+        for e, (calidad, similitud, _) in heapq.nsmallest(limite, puntajes.items(), key=lambda par: par[1]):
+            filas.append({
+                "tipo": self.tipos[self.entrada_tipo[e]],
+                "id": self.ids[e],
+                "nombre": self.nombres[e],
+                **dict(zip(self.contexto, self.contextos[e])),
+                "coincidencia": COINCIDENCIAS[calidad],
+                "similitud": round(-similitud, 3) if calidad == 3 else None,
+            })
+        return filas
+
+    def stats(self):
+        return {
+            "entradas": len(self.ids),
+            "palabras": len(self.palabras),
+            "trigramas": len(self.postings),
+            "postings": sum(len(lista) for lista in self.postings.values()),
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+
+SQL_BUSQUEDA_MUNDO = """
+SELECT 0 AS tipo, c.id, c.name, NULL AS country, NULL AS state FROM countries c
+UNION ALL
+SELECT 1, s.id, s.name, c.name, NULL FROM states s JOIN countries c ON c.id = s.country_id
+UNION ALL
+SELECT 2, ci.id, ci.name, c.name, s.name
+FROM cities ci
+JOIN states    s ON s.id = ci.state_id
+JOIN countries c ON c.id = s.country_id
+"""
+
+SQL_BUSQUEDA_ARTICULOS = "SELECT articulo_id, nombre, marca, categoria FROM articulo"
+
+
+def _filas_mundo():
+    for fila in postgres_stream(SQL_BUSQUEDA_MUNDO):
+        yield fila["tipo"], fila["id"], fila["name"], fila["country"], fila["state"]
+
+def _filas_articulos():
+    for fila in mysql_stream(SQL_BUSQUEDA_ARTICULOS, database="mariadb"):
+        yield 0, fila["articulo_id"], fila["nombre"], fila["marca"], fila["categoria"]
+
+# nombre -> (base, tablas, tipos, campos de contexto, filas)
+BUSQUEDAS = {
+    "mundo": ("postgres", TABLAS_MUNDO, ("country", "state", "city"), ("country", "state"), _filas_mundo),
+    "articulos": ("mariadb", ("articulo",), ("articulo",), ("marca", "categoria"), _filas_articulos),
+}
+
+_busqueda = {nombre: None for nombre in BUSQUEDAS}
+_busqueda_estado = {
+    nombre: {"loading": False, "error": None, "reloads": 0, "revisado": float("-inf")} for nombre in BUSQUEDAS
+}
+_busqueda_lock = threading.Lock()
+
+
+def _cargar_busqueda(nombre, forzar):
+    database, tablas, tipos, contexto, filas = BUSQUEDAS[nombre]
+    try:
+        todas = versiones_tablas(database)
+        versiones = [todas.get(t) for t in tablas] if todas is not None else None
+        actual = _busqueda[nombre]
+        if not forzar and actual is not None and versiones is not None and versiones == actual.versiones:
+            with _busqueda_lock:
+                _busqueda_estado[nombre]["loading"] = False
+            return
+        inicio = time.perf_counter()
+        nuevo = IndiceTexto(tipos, contexto)
+        for fila in filas():
+            nuevo.agregar(*fila)
+        nuevo.construir()
+        nuevo.versiones = versiones
+        nuevo.loaded_at = time.time()
+        nuevo.load_seconds = round(time.perf_counter() - inicio, 3)
+    except (psycopg2.Error, mysql.connector.Error, PoolTimeout) as err:
+        print(f"Error cargando índice de búsqueda {nombre}: {err}")
+        with _busqueda_lock:
+            _busqueda_estado[nombre].update(loading=False, error=str(err))
+        return
+    with _busqueda_lock:
+        _busqueda[nombre] = nuevo
+        estado = _busqueda_estado[nombre]
+        estado.update(loading=False, error=None, reloads=estado["reloads"] + 1)
+
+def recargar_busqueda(nombre, forzar=True, esperar=False):
+    """(Re)carga un índice de búsqueda en segundo plano (o aquí con esperar=True)
+
+    Con forzar=False solo lo reconstruye si cambiaron sus tablas.
+    """
+    with _busqueda_lock:
+        estado = _busqueda_estado[nombre]
+        if estado["loading"]:
+            return False
+        estado.update(loading=True, revisado=time.monotonic())
+    if esperar:
+        _cargar_busqueda(nombre, forzar)
+    else:
+        threading.Thread(
+            target=_cargar_busqueda, args=(nombre, forzar), name=f"busqueda-{nombre}", daemon=True
+        ).start()
+    return True
+
+def indice_busqueda(nombre):
+    """Índice vigente o None; dispara la carga (lazy) o la revisión periódica sin bloquear"""
+    indice = _busqueda[nombre]
+    estado = _busqueda_estado[nombre]
+    if indice is None:
+        if BUSQUEDA_INDEX_MODE == "lazy" and not estado["loading"]:
+            recargar_busqueda(nombre)
+    elif time.monotonic() - estado["revisado"] >= BUSQUEDA_REVISION and not estado["loading"]:
+        recargar_busqueda(nombre, forzar=False)
+    return indice
+
+def buscar(nombre, sql_respaldo, params_respaldo):
+    """Respuesta de una ruta /buscar: ?q=texto&limit=N[&tipo=...]
+
+    Sin índice (cargando o BUSQUEDA_INDEX=off) responde la base con un ILIKE
+    de prefijo, que no ignora tildes.
+    """
+    consulta = request.args.get("q", "").strip()
+    if not consulta:
+        return jsonify({"error": "q es obligatorio"}), 400
+    limit = request.args.get("limit", "10")
+    if not limit.isdigit() or not 1 <= int(limit) <= BUSQUEDA_LIMIT_MAX:
+        return jsonify({"error": f"limit debe estar entre 1 y {BUSQUEDA_LIMIT_MAX}"}), 400
+    limit = int(limit)
+    tipos = BUSQUEDAS[nombre][2]
+    tipo = request.args.get("tipo")
+    if tipo is not None and tipo not in tipos:
+        return jsonify({"error": f"tipo debe ser uno de: {', '.join(tipos)}"}), 400
+
+    indice = indice_busqueda(nombre)
+    if indice is not None:
+        filas = indice.buscar(consulta, limit, tipos.index(tipo) if tipo else None)
+    else:
+        database = BUSQUEDAS[nombre][0]
+        patron = consulta.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        params = params_respaldo(patron, tipos.index(tipo) if tipo else None, limit)
+        if database == "postgres":
+            filas, err = postgres_all(sql_respaldo, params)
+        else:
+            filas, err = query_mysql(sql_respaldo, params, database)
+        if err:
+            return jsonify({"error": "DB error", "detail": err}), 500
+        for fila in filas:
+            fila["tipo"] = tipos[fila["tipo"]]
+    respuesta = jsonify(filas)
+    respuesta.headers["Cache-Control"] = CACHE_BUSQUEDA
+    return respuesta
+
+def busqueda_stats(nombre):
+    indice = _busqueda[nombre]
+    return jsonify({
+        "mode": BUSQUEDA_INDEX_MODE,
+        "ready": indice is not None,
+        **{k: v for k, v in _busqueda_estado[nombre].items() if k != "revisado"},
+        **(indice.stats() if indice else {}),
+    }), 200
+
+def busqueda_recargar(nombre):
+    denegado = requiere_admin()
+    if denegado:
+        return denegado
+    iniciada = recargar_busqueda(nombre)
+    return jsonify({"reloading": True, "started": iniciada}), 202
+
+# BASE DE DATOS HOJA DE VIDA
+
+@app.route("/mundo/obtenerPaisesEstadosCiudades", methods=["GET"])
+@respuesta_condicional("postgres", TABLAS_MUNDO, CACHE_MUNDO)
+def obtener_paises_estados_ciudades():
+    # Paginación keyset: ?after=country,state,city[,city_id]&limit=N
+    # Sin limit se transmite todo desde un cursor de servidor (memoria constante)
+    formato = formato_solicitado()
+    if not formato:
+        return jsonify({"error": "format debe ser json, ndjson o columns"}), 400
+
+    where, params = "", []
+    after = request.args.get("after")
+    if after is not None:
+        campos = parse_after(after, (3, 4))
+        if campos is None:
+            return jsonify({"error": "after debe tener la forma country,state,city[,city_id]"}), 400
+        if len(campos) == 4:
+            if not campos[3].isdigit():
+                return jsonify({"error": "city_id de after debe ser numérico"}), 400
+            where = "WHERE c.name >= %s AND (c.name, s.name, ci.name, ci.id) > (%s, %s, %s, %s)"
+            campos[3] = int(campos[3])
+        else:
+            where = "WHERE c.name >= %s AND (c.name, s.name, ci.name) > (%s, %s, %s)"
+        # c.name >= ... es redundante pero permite usar el índice de countries(name)
+        params.extend([campos[0], *campos])
+
+    sql = f"""
+    SELECT
+        c.name AS country,
+        s.name AS state,
+        ci.name AS city,
+        ci.id AS city_id
+    FROM countries c
+    JOIN states   s  ON s.country_id = c.id
+    JOIN cities   ci ON ci.state_id  = s.id
+    {where}
+    ORDER BY c.name, s.name, ci.name, ci.id
+    """
+
+    limit = request.args.get("limit")
+    if limit is None:
+        filas, err = iniciar_stream(postgres_stream(sql, params))
+        if err:
+            return jsonify({"error": "DB error", "detail": err}), 500
+        return respuesta_filas(_sin_city_id(filas), formato, stream=True)
+
+    if not limit.isdigit() or not 1 <= int(limit) <= PAGE_MAX:
+        return jsonify({"error": f"limit debe estar entre 1 y {PAGE_MAX}"}), 400
+    limit = int(limit)
+    rows, err = postgres_all(sql + " LIMIT %s", (*params, limit + 1))
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        ultima = rows[-1]
+        # Va codificado (%XX) porque los nombres pueden tener caracteres fuera de latin-1
+        headers["X-Next-After"] = quote(format_after(
+            [ultima["country"], ultima["state"], ultima["city"], ultima["city_id"]]
+        ), safe="")
+    return respuesta_filas(_sin_city_id(rows), formato, headers=headers)
+
+def _sin_city_id(filas):
+    for fila in filas:
+        fila.pop("city_id", None)
+        yield fila
+
+@app.route("/mundo/obtenerPaisesEstadosCiudades/<string:country_name>", methods=["GET"])
+@respuesta_condicional("postgres", TABLAS_MUNDO, CACHE_MUNDO)
+def obtener_por_pais(country_name):
+    sql = """
+    SELECT
+        c.name AS country,
+        s.name AS state,
+        ci.name AS city
+    FROM countries c
+    JOIN states   s  ON s.country_id = c.id
+    JOIN cities   ci ON ci.state_id  = s.id
+    WHERE c.name ILIKE %s
+    ORDER BY s.name, ci.name;
+    """
+    indice = geo_index()
+    rows = indice.por_pais(country_name) if indice else None
+    if rows is not None:
+        return jsonify(rows), 200
+    rows, err = mundo_cache.get_or_load(("pais", country_name), lambda: postgres_all(sql, (country_name,)))
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return jsonify(rows), 200
+
+@app.route("/mundo/listarCiudadesRepetidasPais/<string:country_name>", methods=["GET"])
+@respuesta_condicional("postgres", TABLAS_MUNDO, CACHE_MUNDO)
+def listar_ciudades_repetidas_pais(country_name):
+    # Lista ciudades repetidas mostrando todos los estados donde aparecen
+    sql = """
+    SELECT
+        c.name AS country,
+        s.name AS state,
+        ci.name AS city
+    FROM countries c
+    JOIN states  s  ON s.country_id = c.id
+    JOIN cities  ci ON ci.state_id  = s.id
+    WHERE c.name ILIKE %s
+    AND ci.name IN (
+        SELECT ci2.name
+        FROM cities ci2
+        JOIN states s2 ON ci2.state_id = s2.id
+        JOIN countries c2 ON s2.country_id = c2.id
+        WHERE c2.name ILIKE %s
+        GROUP BY ci2.name
+        HAVING COUNT(*) > 1
+    )
+    ORDER BY ci.name, s.name;
+    """
+    indice = geo_index()
+    rows = indice.repetidas_pais(country_name) if indice else None
+    if rows is not None:
+        return jsonify(rows), 200
+    rows, err = mundo_cache.get_or_load(
+        ("repetidas", country_name), lambda: postgres_all(sql, (country_name, country_name,))
+    )
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return jsonify(rows), 200
+
+@app.route("/mundo/indice", methods=["GET"])
+def mundo_indice_stats():
+    """Estado del índice geográfico en memoria"""
+    indice = _geo_index
+    return jsonify({
+        "mode": GEO_INDEX_MODE,
+        "ready": indice is not None,
+        **_geo_estado,
+        **(indice.stats() if indice else {}),
+    }), 200
+
+@app.route("/mundo/indice/recargar", methods=["POST"])
+def mundo_indice_recargar():
+    """Recarga el índice en segundo plano y lo reemplaza al terminar"""
+    denegado = requiere_admin()
+    if denegado:
+        return denegado
+    iniciada = recargar_geo_index()
+    return jsonify({"recarga_iniciada": iniciada}), 202
+
+@app.route("/mundo/cache", methods=["GET"])
+def mundo_cache_stats():
+    """Contadores de la caché de consultas por país"""
+    return jsonify(mundo_cache.stats()), 200
+
+@app.route("/mundo/cache/invalidar", methods=["POST"])
+def mundo_cache_invalidar():
+    """Invalida la caché completa o solo un país ({"country": "..."})"""
+    denegado = requiere_admin()
+    if denegado:
+        return denegado
+    # Sin cuerpo se invalida todo; un cuerpo que no es objeto es un error
+    datos = request.get_json(silent=True)
+    if datos is None and not request.get_data():
+        datos = {}
+    if not isinstance(datos, dict) or not isinstance(datos.get("country", ""), str):
+        return jsonify({"error": 'el cuerpo debe ser un objeto {"country": "..."}'}), 400
+    country = datos.get("country")
+    if country:
+        pais = normalizar_pais(country)
+        eliminadas = mundo_cache.invalidate(lambda clave: normalizar_pais(clave[1]) == pais)
+    else:
+        eliminadas = mundo_cache.invalidate()
+    return jsonify({"invalidadas": eliminadas}), 200
+
+
+SQL_BUSCAR_MUNDO = """
+SELECT * FROM (
+    SELECT 0 AS tipo, c.id, c.name AS nombre, NULL AS country, NULL AS state
+    FROM countries c WHERE c.name ILIKE %s
+    UNION ALL
+    SELECT 1, s.id, s.name, c.name, NULL
+    FROM states s JOIN countries c ON c.id = s.country_id WHERE s.name ILIKE %s
+    UNION ALL
+    SELECT 2, ci.id, ci.name, c.name, s.name
+    FROM cities ci
+    JOIN states    s ON s.id = ci.state_id
+    JOIN countries c ON c.id = s.country_id
+    WHERE ci.name ILIKE %s
+) r
+WHERE %s IS NULL OR tipo = %s
+ORDER BY tipo, length(nombre), nombre
+LIMIT %s
+"""
+
+@app.route("/mundo/buscar", methods=["GET"])
+def buscar_mundo():
+    """Búsqueda typeahead de países, estados y ciudades (?q=bogo&limit=10&tipo=city)
+
+    No distingue mayúsculas ni tildes. Primero las coincidencias exactas, luego
+    prefijos del nombre, prefijos de cada palabra y al final nombres parecidos
+    (trigramas). A igual coincidencia: países, estados y ciudades, y nombres cortos primero.
+    """
+    return buscar("mundo", SQL_BUSCAR_MUNDO, lambda patron, tipo, limit: (patron, patron, patron, tipo, tipo, limit))
+
+@app.route("/mundo/buscar/indice", methods=["GET"])
+def buscar_mundo_indice():
+    return busqueda_stats("mundo")
+
+@app.route("/mundo/buscar/indice/recargar", methods=["POST"])
+def buscar_mundo_recargar():
+    return busqueda_recargar("mundo")
+
+
+_cambios_experiencia = {"ultimo_id": None, "vistos": set(), "persona": None, "revisado": float("-inf")}
+_cambios_lock = threading.Lock()
+
+def sincronizar_cambios_experiencia():
+    """Saca de la caché los reportes de personas cuya experiencia_laboral cambió
+
+    Revisa el registro que llenan los triggers como mucho cada
+    REPORTE_CAMBIOS_INTERVALO segundos; si no puede leerlo vacía la caché.
+    Un cambio en persona (documento editado o borrado) vacía toda la caché.
+    Como en el índice de precios, se relee la ventana de los últimos
+    VERSIONES_VENTANA cambio_id para no saltar los que confirman tarde.
+    """
+    with _cambios_lock:
+        ahora = time.monotonic()
+        if ahora - _cambios_experiencia["revisado"] < REPORTE_CAMBIOS_INTERVALO:
+            return
+        _cambios_experiencia["revisado"] = ahora
+        ultimo = _cambios_experiencia["ultimo_id"]
+        vistos = _cambios_experiencia["vistos"]
+        persona_aplicada = _cambios_experiencia["persona"]
+
+    # La versión de persona se lee antes de vaciar: lo que se cachee después es al menos así de nuevo
+    versiones = versiones_tablas("mysql")
+    persona = versiones.get("persona") if versiones else None
+    if ultimo is None or persona is None or persona != persona_aplicada:
+        rows, err = query_mysql("SELECT COALESCE(MAX(cambio_id), 0) AS ultimo FROM experiencia_cambios")
+        if not err:
+            ultimo = rows[0]["ultimo"]
+            rows, err = query_mysql(
+                "SELECT cambio_id FROM experiencia_cambios WHERE cambio_id > %s", (ultimo - VERSIONES_VENTANA,)
+            )
+        reporte_cache.invalidate()
+        with _cambios_lock:
+            if err or persona is None:
+                _cambios_experiencia.update(ultimo_id=None, vistos=set(), persona=None)
+            else:
+                vistos = {r["cambio_id"] for r in rows if r["cambio_id"] <= ultimo}
+                _cambios_experiencia.update(ultimo_id=ultimo, vistos=vistos, persona=persona)
+        return
+
+    piso = ultimo - VERSIONES_VENTANA
+    rows, err = query_mysql("SELECT COUNT(*) AS cambios FROM experiencia_cambios WHERE cambio_id > %s", (piso,))
+    if not err and rows[0]["cambios"] == len(vistos):
+        return
+    sql = """
+    SELECT c.cambio_id, p.numero_documento
+    FROM experiencia_cambios c
+    LEFT JOIN persona p ON p.persona_id = c.persona_id
+    WHERE c.cambio_id > %s
+    """
+    if not err:
+        rows, err = query_mysql(sql, (piso,))
+    if err:
+        reporte_cache.invalidate()
+        return
+    nuevos = [r for r in rows if r["cambio_id"] not in vistos]
+    if nuevos:
+        # Sin persona (ya borrada) no hay reporte que sacar: el cambio de persona vacía la caché
+        documentos = {clave_documento(r["numero_documento"]) for r in nuevos if r["numero_documento"] is not None}
+        reporte_cache.invalidate(lambda clave: clave[0] in documentos)
+        with _cambios_lock:
+            ultimo = max(ultimo, max(r["cambio_id"] for r in nuevos))
+            piso = ultimo - VERSIONES_VENTANA
+            vistos = {c for c in vistos if c > piso}
+            vistos.update(r["cambio_id"] for r in nuevos if r["cambio_id"] > piso)
+            _cambios_experiencia.update(ultimo_id=ultimo, vistos=vistos)
+
+def _version_aplicada_reportes():
+    """Cambios que ya aplicó la caché de reportes (con _cambios_lock tomado); None si no se sabe"""
+    if _cambios_experiencia["ultimo_id"] is None:
+        return None
+    return (f"experiencia:{_cambios_experiencia['ultimo_id']}.{len(_cambios_experiencia['vistos'])}"
+            f":{_cambios_experiencia['persona']}")
+
+def version_reportes():
+    """Versión de la caché de reportes para el ETag
+
+    Se sincroniza antes: así el ETag nunca es más nuevo que el reporte cacheado.
+    """
+    sincronizar_cambios_experiencia()
+    with _cambios_lock:
+        return _version_aplicada_reportes()
+
+
+CATEGORIAS_EXPERIENCIA = ("SERVIDOR PÚBLICO", "EMPLEADO DEL SECTOR PRIVADO", "TRABAJADOR INDEPENDIENTE")
+TOTAL_EXPERIENCIA = "TOTAL TIEMPO EXPERIENCIA"
+FECHA_MINIMA = date(1900, 1, 1)
+BATCH_MAX_DOCUMENTOS = int(os.getenv("BATCH_MAX_DOCUMENTOS", "1000"))
+
+
+def clave_documento(documento):
+    """Clave con la que compara numero_documento (utf8mb4_unicode_ci): sin mayúsculas, tildes ni espacios finales"""
+    descompuesto = unicodedata.normalize("NFKD", documento.rstrip(" "))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+def formatear_reporte(ocupacion, total_meses):
+    anios, meses = divmod(int(total_meses), 12)
+    return {
+        "ocupacion": ocupacion,
+        "años": anios,
+        "meses": meses,
+        "total_meses": int(total_meses),
+        "descripcion": f"{anios} años y {meses} meses",
+    }
+
+def categoria_experiencia(sector, empresa, cargo_contrato):
+    """Misma clasificación que el procedimiento reporte_tiempo_experiencia"""
+    if sector == "PUBLICA":
+        return "SERVIDOR PÚBLICO"
+    empresa = (empresa or "").lower()
+    cargo = (cargo_contrato or "").lower()
+    if "independient" in empresa or "freelan" in empresa or "independient" in cargo or "servicio" in cargo:
+        return "TRABAJADOR INDEPENDIENTE"
+    return "EMPLEADO DEL SECTOR PRIVADO"
+
+def meses_entre(ini, fin):
+    """Equivalente a TIMESTAMPDIFF(MONTH, ini, fin) para fechas"""
+    meses = (fin.year - ini.year) * 12 + fin.month - ini.month
+    return meses - 1 if fin.day < ini.day else meses
+
+def meses_colapsados(rangos):
+    """Ordena y barre los rangos fusionando solapados; suma los meses de cada isla"""
+    total = 0
+    isla_ini = isla_fin = None
+    for ini, fin in sorted(rangos):
+        if isla_fin is not None and isla_fin >= ini:
+            isla_fin = max(isla_fin, fin)
+            continue
+        if isla_fin is not None:
+            total += meses_entre(isla_ini, isla_fin)
+        isla_ini, isla_fin = ini, fin
+    if isla_fin is not None:
+        total += meses_entre(isla_ini, isla_fin)
+    return total
+
+def reporte_experiencia(experiencias, hoy=None):
+    """Reporte por categoría y total sin doble conteo a partir de filas de experiencia_laboral"""
+    hoy = hoy or date.today()
+    por_categoria = {c: [] for c in CATEGORIAS_EXPERIENCIA}
+    todos = []
+    for e in experiencias:
+        if e["fecha_ingreso"] is None:
+            continue
+        ini = max(e["fecha_ingreso"], FECHA_MINIMA)
+        fin = hoy if e["es_actual"] or e["fecha_retiro"] is None else min(e["fecha_retiro"], hoy)
+        if fin < ini:
+            continue
+        por_categoria[categoria_experiencia(e["sector"], e["empresa"], e["cargo_contrato"])].append((ini, fin))
+        todos.append((ini, fin))
+    reporte = [formatear_reporte(c, meses_colapsados(por_categoria[c])) for c in CATEGORIAS_EXPERIENCIA]
+    reporte.append(formatear_reporte(TOTAL_EXPERIENCIA, meses_colapsados(todos)))
+    return reporte
+
+# Api para formato Unico de hoja de Vida
+@app.route("/hoja_vida/reporte_tiempo_experiencia/<string:numero_documento>", methods=["GET"])
+@respuesta_condicional("mysql", None, CACHE_PRIVADO, por_dia=True, estado=version_reportes)
+def reporte_tiempo_experiencia(numero_documento):
+    # El procedimiento busca la persona y calcula el reporte en un solo viaje a la BD.
+    # La clave incluye la fecha porque los periodos actuales terminan "hoy".
+    sincronizar_cambios_experiencia()
+    clave = (clave_documento(numero_documento), date.today().isoformat())
+    resultado = reporte_cache.get(clave)
+
+    if resultado is None:
+        with _cambios_lock:
+            antes = _version_aplicada_reportes()
+        conjuntos, err = callproc_mysql("reporte_tiempo_experiencia", (numero_documento,))
+        if err:
+            return jsonify({"error": "DB error", "detail": err}), 500
+        if not conjuntos or not conjuntos[0]:
+            return jsonify({"error": f"No existe persona con documento {numero_documento}"}), 404
+
+        resultado = [formatear_reporte(r["ocupacion"], r["total_meses_calculados"]) for r in conjuntos[0]]
+        # Si la caché se sincronizó mientras se leía, esta lectura pudo quedar vieja: no se guarda
+        with _cambios_lock:
+            vigente = antes == _version_aplicada_reportes()
+        if vigente:
+            reporte_cache.set(clave, resultado)
+
+    return jsonify({"numero_documento": numero_documento, "reporte_experiencia": resultado}), 200
+
+
+@app.route("/hoja_vida/reporte_tiempo_experiencia/batch", methods=["POST"])
+def reporte_tiempo_experiencia_batch():
+    """Reportes de experiencia para muchos documentos con una sola consulta
+
+    Body: {"documentos": ["CC1001", ...]}. Responde NDJSON (o un arreglo JSON con
+    ?format=json) con una línea por documento, en orden de documento; los que no
+    existen van al final con "error".
+    """
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, dict):
+        return jsonify({"error": 'el cuerpo debe ser un objeto {"documentos": [...]}'}), 400
+    documentos = datos.get("documentos")
+    if not isinstance(documentos, list) or not all(isinstance(d, str) for d in documentos):
+        return jsonify({"error": "documentos debe ser una lista de strings"}), 400
+    documentos = list(dict.fromkeys(documentos))
+    if not documentos or len(documentos) > BATCH_MAX_DOCUMENTOS:
+        return jsonify({"error": f"Se permiten entre 1 y {BATCH_MAX_DOCUMENTOS} documentos"}), 400
+    formato = request.args.get("format", "ndjson")
+    if formato not in ("json", "ndjson"):
+        return jsonify({"error": "format debe ser json o ndjson"}), 400
+
+    marcadores = ", ".join(["%s"] * len(documentos))
+    sql = f"""
+    SELECT
+        p.numero_documento, e.sector, e.empresa, e.cargo_contrato,
+        e.fecha_ingreso, e.fecha_retiro, e.es_actual
+    FROM persona p
+    LEFT JOIN experiencia_laboral e ON e.persona_id = p.persona_id
+    WHERE p.numero_documento IN ({marcadores})
+    ORDER BY p.numero_documento
+    """
+    filas, err = iniciar_stream(mysql_stream(sql, documentos))
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+
+    def reportes():
+        # La base compara sin distinguir mayúsculas: "cc1001" encuentra a CC1001.
+        # Se responde con el documento tal como se pidió
+        hoy = date.today()
+        pendientes = {}
+        for documento in documentos:
+            pendientes.setdefault(clave_documento(documento), []).append(documento)
+        for documento, grupo in groupby(filas, key=lambda f: f["numero_documento"]):
+            reporte = reporte_experiencia(grupo, hoy)
+            for pedido in pendientes.pop(clave_documento(documento), []):
+                yield {"numero_documento": pedido, "reporte_experiencia": reporte}
+        for documento in documentos:
+            if clave_documento(documento) in pendientes:
+                yield {"numero_documento": documento, "error": f"No existe persona con documento {documento}"}
+
+    return respuesta_filas(reportes(), formato, stream=True)
+
+
+@app.route("/hoja_vida/reporte_tiempo_experiencia/cache", methods=["GET"])
+def reporte_cache_stats():
+    """Contadores de la caché de reportes de experiencia"""
+    return jsonify({**reporte_cache.stats(), "ultimo_cambio": _cambios_experiencia["ultimo_id"]}), 200
+
+
+# Tablas permitidas (evita SQL injection) con su llave primaria para la paginación keyset
+TABLAS_HOJA_VIDA = {
+    "persona": "persona_id",
+    "pais": "pais_id",
+    "estado": "estado_id",
+    "ciudad": "ciudad_id",
+    "distrito_militar": "distrito_id",
+    "libreta_militar": "libreta_id",
+    "idioma": "idioma_id",
+    "educacion_basica": "basica_id",
+    "educacion_superior": "superior_id",
+    "experiencia_laboral": "id_exp",
+}
+TABLAS_TIENDA = {
+    "cliente": "cliente_id",
+    "articulo": "articulo_id",
+    "historial_precio": "historial_id",
+    "factura": "factura_id",
+    "detalle_factura": "detalle_id",
+}
+
+columnas_cache = TTLCache(maxsize=64, ttl=300)
+
+def columnas_tabla(tabla, database):
+    """Columnas de la tabla (en caché) para validar ?fields="""
+    return columnas_cache.get_or_load(
+        (database, tabla),
+        lambda: _columnas_tabla(tabla, database),
+    )
+
+def _columnas_tabla(tabla, database):
+    rows, err = query_mysql(f"SHOW COLUMNS FROM `{tabla}`", (), database)
+    if err:
+        return None, err
+    return [r["Field"] for r in rows], None
+
+def leer_tabla(tabla, pk, database):
+    """Volcado de una tabla permitida con ?fields=, ?after_id=, ?limit= y ?format=json|ndjson
+
+    Sin limit se transmite completa desde un cursor sin buffer. Con limit se
+    devuelve una página y X-Next-After trae el after_id de la siguiente.
+    """
+    formato = formato_solicitado()
+    if not formato:
+        return jsonify({"error": "format debe ser json, ndjson o columns"}), 400
+
+    columnas, err = columnas_tabla(tabla, database)
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    fields = request.args.get("fields")
+    if fields:
+        pedidas = [f.strip() for f in fields.split(",") if f.strip()]
+        invalidas = [f for f in pedidas if f not in columnas]
+        if not pedidas or invalidas:
+            return jsonify({"error": "Campos no válidos", "campos": invalidas, "disponibles": columnas}), 400
+        pedidas = list(dict.fromkeys(pedidas))
+    else:
+        pedidas = columnas
+    # La llave primaria siempre se lee para ordenar y armar el cursor
+    seleccion = pedidas if pk in pedidas else [*pedidas, pk]
+    quitar_pk = pk not in pedidas
+
+    where, params = "", []
+    after_id = request.args.get("after_id")
+    if after_id is not None:
+        if not after_id.lstrip("-").isdigit():
+            return jsonify({"error": "after_id debe ser numérico"}), 400
+        where = f"WHERE `{pk}` > %s"
+        params.append(int(after_id))
+
+    sql = f"SELECT {', '.join(f'`{c}`' for c in seleccion)} FROM `{tabla}` {where} ORDER BY `{pk}`"
+
+    def proyectar(filas):
+        for fila in filas:
+            if quitar_pk:
+                fila.pop(pk, None)
+            yield fila
+
+    limit = request.args.get("limit")
+    if limit is None:
+        filas, err = iniciar_stream(mysql_stream(sql, params, database))
+        if err:
+            return jsonify({"error": "DB error", "detail": err}), 500
+        return respuesta_filas(proyectar(filas), formato, stream=True)
+
+    if not limit.isdigit() or not 1 <= int(limit) <= PAGE_MAX:
+        return jsonify({"error": f"limit debe estar entre 1 y {PAGE_MAX}"}), 400
+    limit = int(limit)
+    rows, err = query_mysql(sql + " LIMIT %s", (*params, limit + 1), database)
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-After"] = str(rows[-1][pk])
+    return respuesta_filas(proyectar(rows), formato, headers=headers)
+
+
+@app.route("/hoja_vida/tablas_persona/<string:name_tabla>", methods=["GET"])
+@respuesta_condicional("mysql", lambda name_tabla: [name_tabla], CACHE_PRIVADO)
+def tablas_persona(name_tabla):
+    if name_tabla not in TABLAS_HOJA_VIDA:
+        return jsonify({"error": "Tabla no permitida"}), 400
+    return leer_tabla(name_tabla, TABLAS_HOJA_VIDA[name_tabla], "mysql")
+
+
+# Hoja de vida completa: la arma el procedimiento hoja_vida_persona en un solo viaje
+TABLAS_HOJA_VIDA_PERSONA = tuple(TABLAS_HOJA_VIDA)
+SECCIONES_HOJA_VIDA = ("libreta_militar", "idiomas", "educacion_basica", "educacion_superior", "experiencia_laboral")
+GEO_CAMPOS_PERSONA = {
+    "pais_nacimiento_id": "pais", "estado_nacimiento_id": "estado", "ciudad_nacimiento_id": "ciudad",
+    "pais_residencia_id": "pais", "estado_residencia_id": "estado", "ciudad_residencia_id": "ciudad",
+}
+GEO_TABLAS = {"pais": "pais_id", "estado": "estado_id", "ciudad": "ciudad_id"}
+
+# Nombres de países, estados y ciudades de hojaVida por (tabla, id); se vacía
+# cuando cambia la versión de alguna de las tres tablas
+geo_nombres_cache = TTLCache(
+    maxsize=int(os.getenv("GEO_NOMBRES_CACHE_SIZE", "20000")),
+    ttl=float(os.getenv("GEO_NOMBRES_CACHE_TTL", "3600")),
+)
+_geo_nombres_version = {"versiones": None}
+
+def nombres_geografia(claves):
+    """{(tabla, id): nombre} para las claves pedidas; las que faltan en la caché se leen en una sola consulta"""
+    versiones = versiones_tablas("mysql")
+    if versiones is not None:
+        actuales = tuple(versiones.get(t) for t in GEO_TABLAS)
+        if actuales != _geo_nombres_version["versiones"]:
+            geo_nombres_cache.invalidate()
+            _geo_nombres_version["versiones"] = actuales
+
+    nombres, faltan = {}, []
+    for clave in dict.fromkeys(claves):
+        nombre = geo_nombres_cache.get(clave)
+        if nombre is None:
+            faltan.append(clave)
+        else:
+            nombres[clave] = nombre
+    if not faltan:
+        return nombres, None
+
+    partes, params = [], []
+    for tabla, pk in GEO_TABLAS.items():
+        ids = [i for t, i in faltan if t == tabla]
+        if ids:
+            partes.append(
+                f"SELECT '{tabla}' AS tabla, {pk} AS id, nombre FROM {tabla} "
+                f"WHERE {pk} IN ({', '.join(['%s'] * len(ids))})"
+            )
+            params.extend(ids)
+    rows, err = query_mysql(" UNION ALL ".join(partes), params)
+    if err:
+        return None, err
+    for r in rows:
+        clave = (r["tabla"], r["id"])
+        geo_nombres_cache.set(clave, r["nombre"])
+        nombres[clave] = r["nombre"]
+    return nombres, None
+
+def armar_hoja_vida(conjuntos, nombres, hoy=None):
+    """Documento anidado a partir de los result sets de hoja_vida_persona"""
+    persona = dict(conjuntos[0][0])
+    for campo, tabla in GEO_CAMPOS_PERSONA.items():
+        persona[campo.removesuffix("_id")] = nombres.get((tabla, persona[campo]))
+    libreta, idiomas, basica, superior, experiencia = conjuntos[1:6]
+    for e in superior:
+        e["graduado"] = None if e["graduado"] is None else bool(e["graduado"])
+    for e in experiencia:
+        e["es_actual"] = bool(e["es_actual"])
+    return {
+        "persona": persona,
+        "libreta_militar": libreta[0] if libreta else None,
+        "idiomas": idiomas,
+        "educacion_basica": basica,
+        "educacion_superior": superior,
+        "experiencia_laboral": experiencia,
+        "reporte_experiencia": reporte_experiencia(experiencia, hoy),
+    }
+
+
+@app.route("/hoja_vida/persona/<string:numero_documento>", methods=["GET"])
+@respuesta_condicional("mysql", TABLAS_HOJA_VIDA_PERSONA, CACHE_PRIVADO, por_dia=True)
+def hoja_vida_persona(numero_documento):
+    """Hoja de vida completa de una persona en una sola respuesta
+
+    Persona (con los nombres de su geografía de nacimiento y residencia),
+    libreta militar, idiomas, educación, experiencia laboral y el reporte de
+    tiempo de experiencia. Un CALL trae todas las tablas y los nombres salen
+    de geo_nombres_cache (una consulta más solo para los que no estén).
+    """
+    conjuntos, err = callproc_mysql("hoja_vida_persona", (numero_documento,))
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    if not conjuntos or not conjuntos[0]:
+        return jsonify({"error": f"No existe persona con documento {numero_documento}"}), 404
+    if len(conjuntos) < 1 + len(SECCIONES_HOJA_VIDA):
+        return jsonify({"error": "DB error", "detail": "hoja_vida_persona devolvió result sets incompletos"}), 500
+
+    persona = conjuntos[0][0]
+    nombres, err = nombres_geografia((tabla, persona[campo]) for campo, tabla in GEO_CAMPOS_PERSONA.items())
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return jsonify({"numero_documento": numero_documento, **armar_hoja_vida(conjuntos, nombres)}), 200
+
+
+@app.route("/hoja_vida/persona/cache", methods=["GET"])
+def hoja_vida_geo_cache_stats():
+    """Contadores de la caché de nombres geográficos de la hoja de vida"""
+    return jsonify(geo_nombres_cache.stats()), 200
+
+
+
+    # BASE DE DATOS FACTURA
+
+@app.route("/factura_db/historial_precio/<string:producto_name>", methods=["GET"])
+@respuesta_condicional("mariadb", ("articulo", "historial_precio"), CACHE_PRECIOS)
+def historial_precio(producto_name):
+    sql = """
+    SELECT 
+        a.nombre AS articulo,
+        h.precio,
+        h.fecha_inicio,
+        h.fecha_fin
+    FROM historial_precio h
+    JOIN articulo a ON h.articulo_id = a.articulo_id
+    WHERE a.nombre = %s 
+    ORDER BY h.fecha_inicio
+    """
+    rows, err = query_mysql(sql, (producto_name,), "mariadb")
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return jsonify(rows), 200
+
+
+# Índice de precios por fecha: startup, lazy (primer uso) u off
+PRECIOS_INDEX_MODE = os.getenv("PRECIOS_INDEX", "lazy").lower()
+PRECIOS_CAMBIOS_INTERVALO = float(os.getenv("PRECIOS_CAMBIOS_INTERVALO", "2"))
+PRECIOS_BATCH_MAX = int(os.getenv("PRECIOS_BATCH_MAX", "10000"))
+
+# fecha_fin NULL = vigente sin fin
+FIN_ABIERTO = date.max.toordinal()
+
+
+class HistorialPrecios:
+    """Línea de tiempo de precios de un artículo para búsquedas con bisect
+
+    Los intervalos se convierten en segmentos disjuntos ordenados (días como
+    ordinales en arrays). Si dos intervalos se solapan gana el que empezó más
+    tarde (a igual inicio, el de mayor historial_id); los huecos quedan sin
+    precio. Solapamientos, huecos y fechas invertidas quedan en anomalias.
+    """
+
+    __slots__ = ("inicios", "fines", "precios", "historial_ids", "anomalias")
+
+    def __init__(self, articulo_id, intervalos):
+        # intervalos: filas con historial_id, precio, fecha_inicio, fecha_fin
+        self.inicios = array("i")
+        self.fines = array("i")
+        self.precios = []
+        self.historial_ids = array("i")
+        self.anomalias = []
+
+        validos = []
+        for fila in sorted(intervalos, key=lambda f: (f["fecha_inicio"], f["historial_id"])):
+            ini = fila["fecha_inicio"].toordinal()
+            fin = fila["fecha_fin"].toordinal() if fila["fecha_fin"] else FIN_ABIERTO
+            if fin < ini:
+                self._anomalia(articulo_id, "fin_antes_de_inicio", [fila["historial_id"]], ini, fin)
+                continue
+            validos.append((ini, fin, fila["historial_id"], fila["precio"]))
+
+        # Solapamientos: cada intervalo contra el que llega más lejos de los anteriores
+        mayor_fin, mayor_id = None, None
+        for ini, fin, historial_id, _ in validos:
+            if mayor_fin is not None and ini <= mayor_fin:
+                self._anomalia(articulo_id, "solapamiento", [mayor_id, historial_id], ini, min(fin, mayor_fin))
+            if mayor_fin is None or fin > mayor_fin:
+                mayor_fin, mayor_id = fin, historial_id
+
+        # Barrido: en cada frontera gana el intervalo activo de inicio más reciente
+        fronteras = sorted({ini for ini, *_ in validos} | {fin + 1 for _, fin, *_ in validos})
+        activos, siguiente = [], 0
+        for pos, dia in enumerate(fronteras[:-1]):
+            while siguiente < len(validos) and validos[siguiente][0] == dia:
+                ini, fin, historial_id, precio = validos[siguiente]
+                heapq.heappush(activos, (-ini, -historial_id, fin, precio))
+                siguiente += 1
+            while activos and activos[0][2] < dia:
+                heapq.heappop(activos)
+            if not activos:
+                continue
+            _, menos_id, _, precio = activos[0]
+            hasta = fronteras[pos + 1] - 1
+            if self.historial_ids and self.historial_ids[-1] == -menos_id and self.fines[-1] == dia - 1:
+                self.fines[-1] = hasta
+                continue
+            if self.fines and self.fines[-1] < dia - 1:
+                self._anomalia(articulo_id, "hueco", [self.historial_ids[-1], -menos_id], self.fines[-1] + 1, dia - 1)
+            self.inicios.append(dia)
+            self.fines.append(hasta)
+            self.precios.append(precio)
+            self.historial_ids.append(-menos_id)
+
+    def _anomalia(self, articulo_id, tipo, historial_ids, desde, hasta):
+        self.anomalias.append({
+            "articulo_id": articulo_id,
+            "tipo": tipo,
+            "historial_ids": historial_ids,
+            "desde": date.fromordinal(desde).isoformat(),
+            "hasta": date.fromordinal(hasta).isoformat() if hasta < FIN_ABIERTO else None,
+        })
+
+    def precio(self, dia):
+        """(precio, historial_id) vigente el día (ordinal), o None"""
+        i = bisect_right(self.inicios, dia) - 1
+        if i < 0 or dia > self.fines[i]:
+            return None
+        return self.precios[i], self.historial_ids[i]
+
+
+class IndicePrecios:
+    """Precios por artículo y fecha en memoria, actualizado con historial_precio_cambios
+
+    Cada artículo es un HistorialPrecios independiente: una actualización
+    reemplaza solo los artículos que cambiaron (el cambio de referencia en el
+    dict es atómico para las peticiones en curso).
+    """
+
+    SQL = """
+    SELECT articulo_id, historial_id, precio, fecha_inicio, fecha_fin
+    FROM historial_precio
+    {where}
+    ORDER BY articulo_id
+    """
+
+    def __init__(self):
+        self.articulos = {}
+        self.ultimo_cambio = None
+        self.cambios_vistos = set()
+        self.actualizaciones = 0
+        self.loaded_at = None
+        self.load_seconds = None
+
+    @classmethod
+    def load(cls):
+        """Carga todo historial_precio (los cambios iniciales se leen antes, así nada se pierde)"""
+        inicio = time.perf_counter()
+        rows, err = query_mysql(
+            "SELECT COALESCE(MAX(cambio_id), 0) AS ultimo FROM historial_precio_cambios", (), "mariadb"
+        )
+        if err:
+            raise RuntimeError(err)
+        indice = cls()
+        indice.ultimo_cambio = rows[0]["ultimo"]
+        rows, err = query_mysql(
+            "SELECT cambio_id FROM historial_precio_cambios WHERE cambio_id > %s",
+            (indice.ultimo_cambio - VERSIONES_VENTANA,), "mariadb",
+        )
+        if err:
+            raise RuntimeError(err)
+        indice.cambios_vistos = {r["cambio_id"] for r in rows if r["cambio_id"] <= indice.ultimo_cambio}
+        filas = mysql_stream(cls.SQL.format(where=""), (), "mariadb")
+        indice._agregar(filas)
+        indice.loaded_at = time.time()
+        indice.load_seconds = round(time.perf_counter() - inicio, 3)
+        return indice
+
+    @classmethod
+    def de_articulos(cls, articulo_ids):
+        """Índice temporal solo con los artículos pedidos (una consulta); devuelve (índice, err)"""
+        if not articulo_ids:
+            return cls(), None
+        marcadores = ", ".join(["%s"] * len(articulo_ids))
+        rows, err = query_mysql(
+            cls.SQL.format(where=f"WHERE articulo_id IN ({marcadores})"), tuple(articulo_ids), "mariadb"
+        )
+        if err:
+            return None, err
+        indice = cls()
+        indice._agregar(rows)
+        return indice, None
+
+    def _agregar(self, filas):
+        for articulo_id, intervalos in groupby(filas, key=lambda f: f["articulo_id"]):
+            self.articulos[articulo_id] = HistorialPrecios(articulo_id, list(intervalos))
+
+    def actualizar(self, articulo_ids, filas):
+        """Reemplaza los artículos indicados; los que ya no tienen filas se eliminan"""
+        nuevos = {}
+        for articulo_id, intervalos in groupby(filas, key=lambda f: f["articulo_id"]):
+            nuevos[articulo_id] = HistorialPrecios(articulo_id, list(intervalos))
+        for articulo_id in articulo_ids:
+            if articulo_id in nuevos:
+                self.articulos[articulo_id] = nuevos[articulo_id]
+            else:
+                self.articulos.pop(articulo_id, None)
+        self.actualizaciones += 1
+
+    def precio(self, articulo_id, dia):
+        historial = self.articulos.get(articulo_id)
+        return historial.precio(dia.toordinal()) if historial else None
+
+    def anomalias(self):
+        return [a for h in list(self.articulos.values()) for a in h.anomalias]
+
+    def stats(self):
+        historiales = list(self.articulos.values())
+        return {
+            "articulos": len(historiales),
+            "segmentos": sum(len(h.inicios) for h in historiales),
+            "anomalias": sum(len(h.anomalias) for h in historiales),
+            "ultimo_cambio": self.ultimo_cambio,
+            "actualizaciones": self.actualizaciones,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+
+_indice_precios = None
+_precios_estado = {"loading": False, "error": None, "reloads": 0, "revisado": float("-inf")}
+_precios_lock = threading.Lock()
+
+
+def _cargar_indice_precios():
+    global _indice_precios
+    try:
+        nuevo = IndicePrecios.load()
+    except (RuntimeError, mysql.connector.Error, PoolTimeout) as err:
+        print(f"Error cargando índice de precios: {err}")
+        with _precios_lock:
+            _precios_estado.update(loading=False, error=str(err))
+        return
+    with _precios_lock:
+        _indice_precios = nuevo
+        _precios_estado.update(loading=False, error=None, reloads=_precios_estado["reloads"] + 1)
+
+def recargar_indice_precios(esperar=False):
+    """Lanza la (re)carga completa en segundo plano (o aquí con esperar=True); False si ya hay una en curso"""
+    with _precios_lock:
+        if _precios_estado["loading"]:
+            return False
+        _precios_estado["loading"] = True
+    if esperar:
+        _cargar_indice_precios()
+    else:
+        threading.Thread(target=_cargar_indice_precios, name="indice-precios", daemon=True).start()
+    return True
+
+def sincronizar_precios(indice):
+    """Recarga los artículos con cambios en historial_precio_cambios
+
+    Revisa el registro como mucho cada PRECIOS_CAMBIOS_INTERVALO segundos; si
+    no puede leerlo deja el índice como está y lo intenta en la próxima petición.
+    Los cambio_id pueden confirmarse fuera de orden: se relee la ventana de los
+    últimos VERSIONES_VENTANA ids y se aplican los que aún no se habían visto.
+    """
+    with _precios_lock:
+        ahora = time.monotonic()
+        if ahora - _precios_estado["revisado"] < PRECIOS_CAMBIOS_INTERVALO:
+            return
+        _precios_estado["revisado"] = ahora
+
+    piso = indice.ultimo_cambio - VERSIONES_VENTANA
+    # Si la ventana tiene tantos cambios como los ya vistos no hay nada nuevo (sin traer las filas)
+    rows, err = query_mysql(
+        "SELECT COUNT(*) AS cambios FROM historial_precio_cambios WHERE cambio_id > %s", (piso,), "mariadb"
+    )
+    if err or rows[0]["cambios"] == len(indice.cambios_vistos):
+        return
+    sql = "SELECT cambio_id, articulo_id FROM historial_precio_cambios WHERE cambio_id > %s"
+    rows, err = query_mysql(sql, (piso,), "mariadb")
+    if err:
+        return
+    nuevos = [r for r in rows if r["cambio_id"] not in indice.cambios_vistos]
+    if not nuevos:
+        return
+    articulo_ids = sorted({r["articulo_id"] for r in nuevos})
+    marcadores = ", ".join(["%s"] * len(articulo_ids))
+    filas, err = query_mysql(
+        IndicePrecios.SQL.format(where=f"WHERE articulo_id IN ({marcadores})"), tuple(articulo_ids), "mariadb"
+    )
+    if err:
+        return
+    with _precios_lock:
+        indice.actualizar(articulo_ids, filas)
+        indice.ultimo_cambio = max(indice.ultimo_cambio, max(r["cambio_id"] for r in nuevos))
+        piso = indice.ultimo_cambio - VERSIONES_VENTANA
+        indice.cambios_vistos = {c for c in indice.cambios_vistos if c > piso}
+        indice.cambios_vistos.update(r["cambio_id"] for r in nuevos if r["cambio_id"] > piso)
+
+def indice_precios():
+    """Índice vigente y sincronizado, o None si aún no está listo (en modo lazy dispara la carga)"""
+    if _indice_precios is None:
+        if PRECIOS_INDEX_MODE == "lazy" and not _precios_estado["loading"]:
+            recargar_indice_precios()
+        return None
+    sincronizar_precios(_indice_precios)
+    return _indice_precios
+
+def version_precios():
+    """Versión del ETag de las rutas de precios: el estado que ya aplicó el índice
+
+    Sin índice las rutas leen historial_precio directo y vale la versión de la tabla.
+    """
+    indice = indice_precios()
+    if indice is None:
+        versiones = versiones_tablas("mariadb")
+        return f"tabla:{versiones['historial_precio']}" if versiones and "historial_precio" in versiones else None
+    with _precios_lock:
+        return f"indice:{indice.ultimo_cambio}.{len(indice.cambios_vistos)}"
+
+def resolver_precios(consultas):
+    """Filas {articulo_id, fecha, precio, historial_id} para pares (articulo_id, fecha)
+
+    Usa el índice en memoria; si aún no está listo arma uno temporal con los
+    artículos pedidos (una sola consulta). Devuelve (filas, err).
+    """
+    indice = indice_precios()
+    if indice is None:
+        indice, err = IndicePrecios.de_articulos(sorted({a for a, _ in consultas}))
+        if err:
+            return None, err
+    filas = []
+    for articulo_id, fecha in consultas:
+        encontrado = indice.precio(articulo_id, fecha)
+        filas.append({
+            "articulo_id": articulo_id,
+            "fecha": fecha.isoformat(),
+            "precio": encontrado[0] if encontrado else None,
+            "historial_id": encontrado[1] if encontrado else None,
+        })
+    return filas, None
+
+def parse_fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
+
+@app.route("/factura_db/precio", methods=["GET"])
+@respuesta_condicional("mariadb", None, CACHE_PRECIOS, por_dia=True, estado=version_precios)
+def consultar_precio():
+    """Precio vigente de uno o varios artículos en una fecha
+
+    ?articulo_id=4&articulo_id=1&fecha=2024-07-01 (fecha por defecto: hoy).
+    """
+    ids = request.args.getlist("articulo_id")
+    if not ids or not all(i.isdigit() for i in ids):
+        return jsonify({"error": "articulo_id es obligatorio y numérico"}), 400
+    fecha = parse_fecha(request.args.get("fecha", date.today().isoformat()))
+    if fecha is None:
+        return jsonify({"error": "fecha debe tener la forma AAAA-MM-DD"}), 400
+    formato = formato_solicitado()
+    if not formato:
+        return jsonify({"error": "format debe ser json, ndjson o columns"}), 400
+    filas, err = resolver_precios([(int(i), fecha) for i in ids])
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return respuesta_filas(filas, formato)
+
+@app.route("/factura_db/precio/batch", methods=["POST"])
+def consultar_precios_batch():
+    """Precios para muchos pares artículo/fecha
+
+    Body: {"consultas": [{"articulo_id": 4, "fecha": "2024-07-01"}, ...]}, o
+    {"articulo_ids": [...], "fecha": "2024-07-01"}. Responde en el mismo orden.
+    """
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, dict):
+        return jsonify({"error": "el cuerpo debe ser un objeto con consultas o articulo_ids"}), 400
+    if "consultas" in datos:
+        consultas = datos["consultas"]
+        if not isinstance(consultas, list) or not all(isinstance(c, dict) for c in consultas):
+            return jsonify({"error": "consultas debe ser una lista de objetos"}), 400
+        pares = [(c.get("articulo_id"), parse_fecha(c.get("fecha"))) for c in consultas]
+    else:
+        ids = datos.get("articulo_ids")
+        if not isinstance(ids, list):
+            return jsonify({"error": "se requiere consultas o articulo_ids"}), 400
+        fecha = parse_fecha(datos.get("fecha", date.today().isoformat()))
+        pares = [(i, fecha) for i in ids]
+    if not pares or len(pares) > PRECIOS_BATCH_MAX:
+        return jsonify({"error": f"Se permiten entre 1 y {PRECIOS_BATCH_MAX} consultas"}), 400
+    if not all(isinstance(a, int) and not isinstance(a, bool) and f for a, f in pares):
+        return jsonify({"error": "cada consulta necesita articulo_id entero y fecha AAAA-MM-DD"}), 400
+    formato = formato_solicitado()
+    if not formato:
+        return jsonify({"error": "format debe ser json, ndjson o columns"}), 400
+
+    filas, err = resolver_precios(pares)
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    return respuesta_filas(filas, formato)
+
+@app.route("/factura_db/precio/anomalias", methods=["GET"])
+@respuesta_condicional("mariadb", None, CACHE_PRECIOS, estado=version_precios)
+def anomalias_precio():
+    """Solapamientos, huecos y fechas invertidas en historial_precio"""
+    indice = indice_precios()
+    if indice is None:
+        rows, err = query_mysql(IndicePrecios.SQL.format(where=""), (), "mariadb")
+        if err:
+            return jsonify({"error": "DB error", "detail": err}), 500
+        indice = IndicePrecios()
+        indice._agregar(rows)
+    return jsonify(indice.anomalias()), 200
+
+@app.route("/factura_db/precio/indice", methods=["GET"])
+def precio_indice_stats():
+    indice = _indice_precios
+    return jsonify({
+        "mode": PRECIOS_INDEX_MODE,
+        "ready": indice is not None,
+        **{k: v for k, v in _precios_estado.items() if k != "revisado"},
+        **(indice.stats() if indice else {}),
+    }), 200
+
+@app.route("/factura_db/precio/indice/recargar", methods=["POST"])
+def precio_indice_recargar():
+    denegado = requiere_admin()
+    if denegado:
+        return denegado
+    iniciada = recargar_indice_precios()
+    return jsonify({"reloading": True, "started": iniciada}), 202
+
+
+@app.route("/factura_db/articulos/buscar", methods=["GET"])
+def buscar_articulos():
+    """Búsqueda typeahead de artículos por nombre (?q=ipho&limit=10), igual que /mundo/buscar"""
+    return buscar(
+        "articulos",
+        "SELECT 0 AS tipo, articulo_id AS id, nombre, marca, categoria FROM articulo "
+        "WHERE nombre LIKE %s ORDER BY CHAR_LENGTH(nombre), nombre LIMIT %s",
+        lambda patron, tipo, limit: (patron, limit),
+    )
+
+@app.route("/factura_db/articulos/buscar/indice", methods=["GET"])
+def buscar_articulos_indice():
+    return busqueda_stats("articulos")
+
+@app.route("/factura_db/articulos/buscar/indice/recargar", methods=["POST"])
+def buscar_articulos_recargar():
+    return busqueda_recargar("articulos")
+
+
+# Rollups de ventas: se ponen al día como mucho cada ROLLUP_INTERVALO segundos al consultarlos
+ROLLUP_INTERVALO = float(os.getenv("ROLLUP_INTERVALO", "30"))
+ROLLUP_LOTE = int(os.getenv("ROLLUP_LOTE", "50000"))
+CACHE_VENTAS = os.getenv("API_CACHE_VENTAS", "private, max-age=30")
+
+# Cada rollup: (INSERT ... SELECT que suma los cambios del lote en rollup_lote,
+# DELETE de las claves del lote que quedaron en cero)
+SQL_ROLLUPS = {
+    "ventas_dia": ("""
+    INSERT INTO ventas_dia (dia, facturas, lineas, unidades, ingresos)
+    SELECT c.dia, SUM(c.facturas), SUM(c.lineas), SUM(c.unidades), SUM(c.ingresos)
+    FROM rollup_lote l
+    JOIN rollup_cambios c ON c.cambio_id = l.cambio_id
+    GROUP BY c.dia
+    ON DUPLICATE KEY UPDATE
+        facturas = facturas + VALUES(facturas),
+        lineas = lineas + VALUES(lineas),
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos)
+    """, """
+    DELETE v FROM ventas_dia v
+    JOIN (SELECT DISTINCT c.dia FROM rollup_lote l JOIN rollup_cambios c ON c.cambio_id = l.cambio_id) k
+      ON k.dia = v.dia
+    WHERE v.facturas = 0 AND v.lineas = 0 AND v.unidades = 0 AND v.ingresos = 0
+    """),
+    "ventas_articulo_mes": ("""
+    INSERT INTO ventas_articulo_mes (mes, articulo_id, lineas, unidades, ingresos)
+    SELECT DATE_FORMAT(c.dia, '%Y-%m-01'), c.articulo_id, SUM(c.lineas), SUM(c.unidades), SUM(c.ingresos)
+    FROM rollup_lote l
+    JOIN rollup_cambios c ON c.cambio_id = l.cambio_id
+    WHERE c.articulo_id IS NOT NULL
+    GROUP BY DATE_FORMAT(c.dia, '%Y-%m-01'), c.articulo_id
+    ON DUPLICATE KEY UPDATE
+        lineas = lineas + VALUES(lineas),
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos)
+    """, """
+    DELETE v FROM ventas_articulo_mes v
+    JOIN (
+        SELECT DISTINCT DATE_FORMAT(c.dia, '%Y-%m-01') AS mes, c.articulo_id
+        FROM rollup_lote l JOIN rollup_cambios c ON c.cambio_id = l.cambio_id
+        WHERE c.articulo_id IS NOT NULL
+    ) k ON k.mes = v.mes AND k.articulo_id = v.articulo_id
+    WHERE v.lineas = 0 AND v.unidades = 0 AND v.ingresos = 0
+    """),
+    "ventas_cliente_mes": ("""
+    INSERT INTO ventas_cliente_mes (mes, cliente_id, facturas, unidades, ingresos)
+    SELECT DATE_FORMAT(c.dia, '%Y-%m-01'), c.cliente_id, SUM(c.facturas), SUM(c.unidades), SUM(c.ingresos)
+    FROM rollup_lote l
+    JOIN rollup_cambios c ON c.cambio_id = l.cambio_id
+    GROUP BY DATE_FORMAT(c.dia, '%Y-%m-01'), c.cliente_id
+    ON DUPLICATE KEY UPDATE
+        facturas = facturas + VALUES(facturas),
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos)
+    """, """
+    DELETE v FROM ventas_cliente_mes v
+    JOIN (
+        SELECT DISTINCT DATE_FORMAT(c.dia, '%Y-%m-01') AS mes, c.cliente_id
+        FROM rollup_lote l JOIN rollup_cambios c ON c.cambio_id = l.cambio_id
+    ) k ON k.mes = v.mes AND k.cliente_id = v.cliente_id
+    WHERE v.facturas = 0 AND v.unidades = 0 AND v.ingresos = 0
+    """),
+}
+
+# Cada rollup recalculado completo desde factura/detalle_factura (para reconstruir)
+SQL_ROLLUPS_RECONSTRUIR = {
+    "ventas_dia": """
+    INSERT INTO ventas_dia (dia, facturas, lineas, unidades, ingresos)
+    SELECT DATE(f.fecha_factura), COUNT(DISTINCT f.factura_id), COUNT(d.detalle_id),
+           COALESCE(SUM(d.cantidad), 0), COALESCE(SUM(d.subtotal), 0)
+    FROM factura f
+    LEFT JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE(f.fecha_factura)
+    """,
+    "ventas_articulo_mes": """
+    INSERT INTO ventas_articulo_mes (mes, articulo_id, lineas, unidades, ingresos)
+    SELECT DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), d.articulo_id, COUNT(*),
+           SUM(d.cantidad), SUM(d.subtotal)
+    FROM factura f
+    JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), d.articulo_id
+    """,
+    "ventas_cliente_mes": """
+    INSERT INTO ventas_cliente_mes (mes, cliente_id, facturas, unidades, ingresos)
+    SELECT DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), f.cliente_id, COUNT(DISTINCT f.factura_id),
+           COALESCE(SUM(d.cantidad), 0), COALESCE(SUM(d.subtotal), 0)
+    FROM factura f
+    LEFT JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), f.cliente_id
+    """,
+}
+
+# Para verificar: (agregación sobre las tablas crudas, cambios aún en la cola, rollup), con la misma clave
+SQL_ROLLUPS_CRUDO = {
+    "ventas_dia": ("""
+    SELECT DATE(f.fecha_factura) AS clave, COUNT(DISTINCT f.factura_id) AS facturas, COUNT(d.detalle_id) AS lineas,
+           COALESCE(SUM(d.cantidad), 0) AS unidades, COALESCE(SUM(d.subtotal), 0) AS ingresos
+    FROM factura f
+    LEFT JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE(f.fecha_factura)
+    """, """
+    SELECT dia AS clave, SUM(facturas) AS facturas, SUM(lineas) AS lineas,
+           SUM(unidades) AS unidades, SUM(ingresos) AS ingresos
+    FROM rollup_cambios
+    GROUP BY dia
+    """, "SELECT dia AS clave, facturas, lineas, unidades, ingresos FROM ventas_dia"),
+    "ventas_articulo_mes": ("""
+    SELECT CONCAT(DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), '/', d.articulo_id) AS clave,
+           COUNT(*) AS lineas, SUM(d.cantidad) AS unidades, SUM(d.subtotal) AS ingresos
+    FROM factura f
+    JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), d.articulo_id
+    """, """
+    SELECT CONCAT(DATE_FORMAT(dia, '%Y-%m-01'), '/', articulo_id) AS clave,
+           SUM(lineas) AS lineas, SUM(unidades) AS unidades, SUM(ingresos) AS ingresos
+    FROM rollup_cambios
+    WHERE articulo_id IS NOT NULL
+    GROUP BY DATE_FORMAT(dia, '%Y-%m-01'), articulo_id
+    """, "SELECT CONCAT(mes, '/', articulo_id) AS clave, lineas, unidades, ingresos FROM ventas_articulo_mes"),
+    "ventas_cliente_mes": ("""
+    SELECT CONCAT(DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), '/', f.cliente_id) AS clave,
+           COUNT(DISTINCT f.factura_id) AS facturas,
+           COALESCE(SUM(d.cantidad), 0) AS unidades, COALESCE(SUM(d.subtotal), 0) AS ingresos
+    FROM factura f
+    LEFT JOIN detalle_factura d ON d.factura_id = f.factura_id
+    GROUP BY DATE_FORMAT(f.fecha_factura, '%Y-%m-01'), f.cliente_id
+    """, """
+    SELECT CONCAT(DATE_FORMAT(dia, '%Y-%m-01'), '/', cliente_id) AS clave,
+           SUM(facturas) AS facturas, SUM(unidades) AS unidades, SUM(ingresos) AS ingresos
+    FROM rollup_cambios
+    GROUP BY DATE_FORMAT(dia, '%Y-%m-01'), cliente_id
+    """, "SELECT CONCAT(mes, '/', cliente_id) AS clave, facturas, unidades, ingresos FROM ventas_cliente_mes"),
+}
+
+_rollups_estado = {"revisado": float("-inf"), "error": None, "pendientes": None}
+_rollups_lock = threading.Lock()
+ROLLUP_IDS_POR_INSERT = 1000
+
+
+def _ejecutar(cursor, sql, params=()):
+    inicio = ejecutar_sql(cursor, "mariadb", sql, params)
+    registrar_sql("mariadb", sql, params, max(cursor.rowcount, 0), time.perf_counter() - inicio)
+
+def actualizar_rollups(reconstruir=False):
+    """Aplica a los rollups los cambios encolados en rollup_cambios
+
+    Los triggers de factura y detalle_factura encolan lo que cada INSERT,
+    UPDATE o DELETE suma o resta a su día, cliente y artículo. Procesa en
+    lotes de ROLLUP_LOTE cambios; cada lote es una transacción que toma sus
+    filas de la cola con FOR UPDATE SKIP LOCKED, las suma a los rollups,
+    borra las claves que quedaron en cero y saca el lote de la cola: dos
+    corridas a la vez se reparten la cola sin contar dos veces, y un cambio
+    que aún no confirma (su fila sigue bloqueada) queda para la próxima.
+    Con reconstruir=True recalcula los rollups desde las tablas crudas y
+    vacía la cola en una sola transacción. Devuelve (cambios procesados, err);
+    al reconstruir, las facturas contadas.
+    """
+    procesadas = 0
+    try:
+        with get_mariadb_connection(STATEMENT_TIMEOUT_LARGO) as conn:
+            cursor = conn.cursor()
+            if reconstruir:
+                # Las lecturas del INSERT ... SELECT bloquean factura y detalle_factura
+                # hasta el commit, así ningún cambio queda contado dos veces ni perdido
+                conn.start_transaction()
+                for tabla in SQL_ROLLUPS:
+                    _ejecutar(cursor, f"DELETE FROM {tabla}")
+                for sql in SQL_ROLLUPS_RECONSTRUIR.values():
+                    _ejecutar(cursor, sql)
+                _ejecutar(cursor, "DELETE FROM rollup_cambios")
+                _ejecutar(cursor, "SELECT COALESCE(SUM(facturas), 0) FROM ventas_dia")
+                procesadas = int(cursor.fetchone()[0])
+                conn.commit()
+            else:
+                _ejecutar(cursor, "CREATE TEMPORARY TABLE IF NOT EXISTS rollup_lote (cambio_id BIGINT NOT NULL PRIMARY KEY)")
+                while True:
+                    conn.start_transaction()
+                    _ejecutar(
+                        cursor,
+                        "SELECT cambio_id FROM rollup_cambios ORDER BY cambio_id LIMIT %s FOR UPDATE SKIP LOCKED",
+                        (ROLLUP_LOTE,),
+                    )
+                    cambio_ids = [fila[0] for fila in cursor.fetchall()]
+                    if not cambio_ids:
+                        conn.commit()
+                        break
+                    _ejecutar(cursor, "DELETE FROM rollup_lote")
+                    for inicio in range(0, len(cambio_ids), ROLLUP_IDS_POR_INSERT):
+                        parte = cambio_ids[inicio:inicio + ROLLUP_IDS_POR_INSERT]
+                        sql = "INSERT INTO rollup_lote (cambio_id) VALUES " + ", ".join(["(%s)"] * len(parte))
+                        _ejecutar(cursor, sql, parte)
+                    for sql_sumar, sql_vacios in SQL_ROLLUPS.values():
+                        _ejecutar(cursor, sql_sumar)
+                        _ejecutar(cursor, sql_vacios)
+                    _ejecutar(cursor, "DELETE c FROM rollup_cambios c JOIN rollup_lote l ON l.cambio_id = c.cambio_id")
+                    conn.commit()
+                    procesadas += len(cambio_ids)
+                _ejecutar(cursor, "DROP TEMPORARY TABLE IF EXISTS rollup_lote")
+            _ejecutar(cursor, "SELECT COUNT(*) FROM rollup_cambios")
+            _rollups_estado["pendientes"] = cursor.fetchone()[0]
+            cursor.close()
+    except (mysql.connector.Error, PoolTimeout) as err:
+        _rollups_estado["error"] = str(err)
+        return procesadas, str(err)
+    _rollups_estado["error"] = None
+    return procesadas, None
+
+def sincronizar_rollups():
+    """Pone al día los rollups como mucho cada ROLLUP_INTERVALO segundos"""
+    with _rollups_lock:
+        ahora = time.monotonic()
+        if ahora - _rollups_estado["revisado"] < ROLLUP_INTERVALO:
+            return
+        _rollups_estado["revisado"] = ahora
+    _, err = actualizar_rollups()
+    if err:
+        print(f"Error actualizando rollups de ventas: {err}")
+
+def _totales_rollup(filas):
+    """{clave: {columna: Decimal}} para comparar sin importar si el driver devolvió int o Decimal"""
+    return {str(f.pop("clave")): {c: Decimal(v) for c, v in f.items()} for f in filas}
+
+def verificar_rollups():
+    """Compara cada rollup con la misma agregación sobre factura/detalle_factura
+
+    Todo se lee en una transacción con snapshot consistente, así una
+    actualización concurrente no aparece como diferencia. Lo esperado es la
+    agregación cruda menos los cambios que siguen en rollup_cambios.
+    Devuelve (reporte, err); el reporte lista por rollup las claves con
+    valores distintos.
+    """
+    try:
+        with get_mariadb_connection(STATEMENT_TIMEOUT_LARGO) as conn:
+            conn.start_transaction(consistent_snapshot=True, readonly=True)
+            cursor = conn.cursor(dictionary=True)
+            _ejecutar(cursor, "SELECT COUNT(*) AS pendientes FROM rollup_cambios")
+            reporte = {"pendientes": cursor.fetchone()["pendientes"], "ok": True, "diferencias": {}}
+            for tabla, (sql_crudo, sql_pendientes, sql_rollup) in SQL_ROLLUPS_CRUDO.items():
+                _ejecutar(cursor, sql_crudo)
+                esperado = _totales_rollup(cursor.fetchall())
+                _ejecutar(cursor, sql_pendientes)
+                for clave, pendiente in _totales_rollup(cursor.fetchall()).items():
+                    fila = esperado.setdefault(clave, dict.fromkeys(pendiente, Decimal(0)))
+                    for columna, valor in pendiente.items():
+                        fila[columna] -= valor
+                # Una clave que se queda en cero no tiene fila en el rollup
+                esperado = {clave: fila for clave, fila in esperado.items() if any(fila.values())}
+                _ejecutar(cursor, sql_rollup)
+                actual = _totales_rollup(cursor.fetchall())
+                diferencias = [
+                    {"clave": clave, "esperado": esperado.get(clave), "rollup": actual.get(clave)}
+                    for clave in sorted(esperado.keys() | actual.keys())
+                    if esperado.get(clave) != actual.get(clave)
+                ]
+                if diferencias:
+                    reporte["ok"] = False
+                    reporte["diferencias"][tabla] = diferencias[:100]
+            cursor.close()
+            return reporte, None
+    except (mysql.connector.Error, PoolTimeout) as err:
+        return None, str(err)
+
+
+# dimensión -> (SQL, usa rango de meses, ordena por ingresos con límite)
+DIMENSIONES_VENTAS = {
+    "dia": ("""
+    SELECT DATE_FORMAT(dia, '%Y-%m-%d') AS dia, facturas, lineas, unidades, ingresos
+    FROM ventas_dia
+    WHERE dia BETWEEN %s AND %s
+    ORDER BY dia
+    """, False, False),
+    "mes": ("""
+    SELECT DATE_FORMAT(dia, '%Y-%m') AS mes, CAST(SUM(facturas) AS SIGNED) AS facturas,
+           CAST(SUM(lineas) AS SIGNED) AS lineas, CAST(SUM(unidades) AS SIGNED) AS unidades,
+           SUM(ingresos) AS ingresos
+    FROM ventas_dia
+    WHERE dia BETWEEN %s AND %s
+    GROUP BY DATE_FORMAT(dia, '%Y-%m')
+    ORDER BY mes
+    """, False, False),
+    "articulo": ("""
+    SELECT v.articulo_id, a.nombre, a.categoria, a.marca,
+           CAST(SUM(v.lineas) AS SIGNED) AS lineas, CAST(SUM(v.unidades) AS SIGNED) AS unidades,
+           SUM(v.ingresos) AS ingresos
+    FROM ventas_articulo_mes v
+    JOIN articulo a ON a.articulo_id = v.articulo_id
+    WHERE v.mes BETWEEN %s AND %s
+    GROUP BY v.articulo_id, a.nombre, a.categoria, a.marca
+    ORDER BY ingresos DESC, v.articulo_id
+    LIMIT %s
+    """, True, True),
+    "categoria": ("""
+    SELECT a.categoria, COUNT(DISTINCT v.articulo_id) AS articulos,
+           CAST(SUM(v.lineas) AS SIGNED) AS lineas, CAST(SUM(v.unidades) AS SIGNED) AS unidades,
+           SUM(v.ingresos) AS ingresos
+    FROM ventas_articulo_mes v
+    JOIN articulo a ON a.articulo_id = v.articulo_id
+    WHERE v.mes BETWEEN %s AND %s
+    GROUP BY a.categoria
+    ORDER BY ingresos DESC, a.categoria
+    LIMIT %s
+    """, True, True),
+    "marca": ("""
+    SELECT a.marca, COUNT(DISTINCT v.articulo_id) AS articulos,
+           CAST(SUM(v.lineas) AS SIGNED) AS lineas, CAST(SUM(v.unidades) AS SIGNED) AS unidades,
+           SUM(v.ingresos) AS ingresos
+    FROM ventas_articulo_mes v
+    JOIN articulo a ON a.articulo_id = v.articulo_id
+    WHERE v.mes BETWEEN %s AND %s
+    GROUP BY a.marca
+    ORDER BY ingresos DESC, a.marca
+    LIMIT %s
+    """, True, True),
+    "cliente": ("""
+    SELECT v.cliente_id, c.nombre, c.apellido,
+           CAST(SUM(v.facturas) AS SIGNED) AS facturas, CAST(SUM(v.unidades) AS SIGNED) AS unidades,
+           SUM(v.ingresos) AS ingresos
+    FROM ventas_cliente_mes v
+    JOIN cliente c ON c.cliente_id = v.cliente_id
+    WHERE v.mes BETWEEN %s AND %s
+    GROUP BY v.cliente_id, c.nombre, c.apellido
+    ORDER BY ingresos DESC, v.cliente_id
+    LIMIT %s
+    """, True, True),
+}
+
+@app.route("/factura_db/ventas/<string:dimension>", methods=["GET"])
+def ventas(dimension):
+    """Ventas agregadas por dia, mes, articulo, categoria, marca o cliente
+
+    ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD filtra por fecha de factura; para
+    articulo, categoria, marca y cliente el filtro es por meses completos.
+    ?limit=N (por defecto 100) acota los rankings.
+    """
+    if dimension not in DIMENSIONES_VENTAS:
+        return jsonify({"error": f"dimension debe ser una de: {', '.join(DIMENSIONES_VENTAS)}"}), 400
+    sql, por_mes, con_limite = DIMENSIONES_VENTAS[dimension]
+    desde = parse_fecha(request.args.get("desde", "0001-01-01"))
+    hasta = parse_fecha(request.args.get("hasta", "9999-12-31"))
+    if desde is None or hasta is None:
+        return jsonify({"error": "desde y hasta deben tener la forma AAAA-MM-DD"}), 400
+    if por_mes:
+        desde = desde.replace(day=1)
+    params = [desde, hasta]
+    if con_limite:
+        limit = request.args.get("limit", "100")
+        if not limit.isdigit() or not 1 <= int(limit) <= PAGE_MAX:
+            return jsonify({"error": f"limit debe estar entre 1 y {PAGE_MAX}"}), 400
+        params.append(int(limit))
+    formato = formato_solicitado()
+    if not formato:
+        return jsonify({"error": "format debe ser json, ndjson o columns"}), 400
+
+    sincronizar_rollups()
+    rows, err = query_mysql(sql, params, "mariadb")
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+    respuesta = respuesta_filas(rows, formato)
+    respuesta.headers["Cache-Control"] = CACHE_VENTAS
+    if _rollups_estado["pendientes"] is not None:
+        respuesta.headers["X-Rollup-Pendientes"] = str(_rollups_estado["pendientes"])
+    return respuesta
+
+@app.cli.group()
+def rollups():
+    """Rollups de ventas de tienda"""
+
+@rollups.command("actualizar")
+def rollups_actualizar():
+    """Aplica a los rollups los cambios encolados"""
+    procesadas, err = actualizar_rollups()
+    if err:
+        raise click.ClickException(err)
+    click.echo(f"{procesadas} cambios aplicados ({_rollups_estado['pendientes']} pendientes)")
+
+@rollups.command("reconstruir")
+def rollups_reconstruir():
+    """Vacía y recalcula los rollups desde factura/detalle_factura"""
+    inicio = time.perf_counter()
+    procesadas, err = actualizar_rollups(reconstruir=True)
+    if err:
+        raise click.ClickException(err)
+    click.echo(f"Rollups reconstruidos con {procesadas} facturas en {time.perf_counter() - inicio:.1f}s")
+
+@rollups.command("verificar")
+def rollups_verificar():
+    """Compara los rollups con las tablas crudas; sale con 1 si hay diferencias"""
+    reporte, err = verificar_rollups()
+    if err:
+        raise click.ClickException(err)
+    if reporte["ok"]:
+        click.echo(f"Rollups consistentes ({reporte['pendientes']} cambios pendientes sin aplicar)")
+        return
+    for tabla, diferencias in reporte["diferencias"].items():
+        click.echo(f"{tabla}: {len(diferencias)} diferencias")
+        for d in diferencias[:10]:
+            click.echo(f"  {d['clave']}: esperado={d['esperado']} rollup={d['rollup']}")
+    raise SystemExit(1)
+
+
+# Ingesta masiva de facturas
+FACTURAS_LOTE = int(os.getenv("FACTURAS_LOTE", "500"))
+FACTURAS_BULK_MAX = int(os.getenv("FACTURAS_BULK_MAX", "50000"))
+DETALLE_FILAS_POR_INSERT = 1000
+CENTAVOS = Decimal("0.01")
+
+
+def _leer_facturas(facturas=None):
+    """Facturas del cuerpo: la lista ya leída del JSON o NDJSON (una por línea, leído por partes)
+
+    Una línea NDJSON que no es JSON válido llega como None y _validar_factura
+    la rechaza en su propia fila de resultado.
+    """
+    if facturas is not None:
+        yield from facturas
+        return
+    for linea in request.stream:
+        if linea.strip():
+            try:
+                yield app.json.loads(linea)
+            except ValueError:
+                yield None
+
+def _validar_factura(factura):
+    """(cliente_id, fecha, [(articulo_id, cantidad)]) o un mensaje de error"""
+    if not isinstance(factura, dict):
+        return "la factura debe ser un objeto JSON"
+    cliente_id = factura.get("cliente_id")
+    if not isinstance(cliente_id, int) or isinstance(cliente_id, bool):
+        return "cliente_id debe ser entero"
+    fecha = factura.get("fecha")
+    try:
+        fecha = datetime.fromisoformat(fecha) if fecha else datetime.now().replace(microsecond=0)
+    except (TypeError, ValueError):
+        return "fecha debe ser AAAA-MM-DD o AAAA-MM-DDTHH:MM:SS"
+    lineas = factura.get("lineas")
+    if not isinstance(lineas, list) or not lineas:
+        return "lineas debe ser una lista no vacía"
+    pares = []
+    for linea in lineas:
+        articulo_id = linea.get("articulo_id") if isinstance(linea, dict) else None
+        cantidad = linea.get("cantidad") if isinstance(linea, dict) else None
+        if not isinstance(articulo_id, int) or isinstance(articulo_id, bool):
+            return "cada línea necesita articulo_id entero"
+        if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0:
+            return "cada línea necesita cantidad entera positiva"
+        pares.append((articulo_id, cantidad))
+    return cliente_id, fecha, pares
+
+def _insertar_lote(lote):
+    """Inserta un lote de facturas válidas en una transacción; (factura_ids, err)
+
+    lote: [(cliente_id, fecha, total, [(articulo_id, cantidad, precio, subtotal)])].
+    Los ids salen de INSERT ... RETURNING en el mismo orden de los VALUES.
+    Con @api_escritura_masiva los triggers de versión no registran cada fila:
+    el lote deja un solo cambio por tabla en version_cambios.
+    """
+    try:
+        with get_mariadb_connection() as conn:
+            cursor = conn.cursor()
+            conn.start_transaction()
+            cursor.execute("SET @api_escritura_masiva = 1")
+            try:
+                factura_ids = _insertar_facturas(cursor, lote)
+                cursor.execute("INSERT INTO version_cambios (tabla) VALUES ('factura'), ('detalle_factura')")
+                conn.commit()
+            finally:
+                # La conexión vuelve al pool: la variable no puede quedar puesta
+                cursor.execute("SET @api_escritura_masiva = NULL")
+            cursor.close()
+            return factura_ids, None
+    except (mysql.connector.Error, PoolTimeout) as err:
+        return None, str(err)
+
+def _insertar_facturas(cursor, lote):
+    """INSERT de las facturas y sus líneas dentro de la transacción abierta; factura_ids"""
+    sql = (
+        "INSERT INTO factura (cliente_id, fecha_factura, total) VALUES "
+        + ", ".join(["(%s, %s, %s)"] * len(lote))
+        + " RETURNING factura_id"
+    )
+    params = [v for cliente_id, fecha, total, _ in lote for v in (cliente_id, fecha, total)]
+    _ejecutar(cursor, sql, params)
+    factura_ids = [fila[0] for fila in cursor.fetchall()]
+
+    detalle = [
+        (factura_id, *linea)
+        for factura_id, (_, _, _, lineas) in zip(factura_ids, lote)
+        for linea in lineas
+    ]
+    for inicio in range(0, len(detalle), DETALLE_FILAS_POR_INSERT):
+        parte = detalle[inicio:inicio + DETALLE_FILAS_POR_INSERT]
+        sql = (
+            "INSERT INTO detalle_factura (factura_id, articulo_id, cantidad, precio_unitario, subtotal) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s)"] * len(parte))
+        )
+        _ejecutar(cursor, sql, [v for fila in parte for v in fila])
+    return factura_ids
+
+def _procesar_lote(facturas, inicio):
+    """Valida, pone precios e inserta un lote; devuelve una fila de resultado por factura
+
+    Las facturas mal formadas (no objetos, líneas NDJSON ilegibles) salen como
+    filas con error, igual que las que no pasan la validación.
+    """
+    resultados = [None] * len(facturas)
+    validas = {}
+    for pos, factura in enumerate(facturas):
+        validada = _validar_factura(factura)
+        if isinstance(validada, str):
+            resultados[pos] = validada
+        else:
+            validas[pos] = validada
+
+    clientes = sorted({cliente_id for cliente_id, _, _ in validas.values()})
+    existentes = set()
+    if clientes:
+        marcadores = ", ".join(["%s"] * len(clientes))
+        rows, err = query_mysql(
+            f"SELECT cliente_id FROM cliente WHERE cliente_id IN ({marcadores})", clientes, "mariadb"
+        )
+        if err:
+            return [_resultado(f, inicio + pos, error=f"DB error: {err}") for pos, f in enumerate(facturas)]
+        existentes = {r["cliente_id"] for r in rows}
+
+    consultas = [(a, fecha.date()) for _, fecha, pares in validas.values() for a, _ in pares]
+    precios, err = resolver_precios(consultas) if consultas else ([], None)
+    if err:
+        return [_resultado(f, inicio + pos, error=f"DB error: {err}") for pos, f in enumerate(facturas)]
+    precios = iter(precios)
+
+    lote, posiciones = [], []
+    for pos, (cliente_id, fecha, pares) in validas.items():
+        lineas, total, error = [], Decimal(0), None
+        for articulo_id, cantidad in pares:
+            precio = next(precios)["precio"]
+            if precio is None and error is None:
+                error = f"articulo {articulo_id} sin precio vigente el {fecha.date().isoformat()}"
+            if precio is not None:
+                precio = Decimal(str(precio))
+                subtotal = (precio * cantidad).quantize(CENTAVOS, ROUND_HALF_UP)
+                lineas.append((articulo_id, cantidad, precio, subtotal))
+                total += subtotal
+        if cliente_id not in existentes:
+            error = f"no existe cliente {cliente_id}"
+        if error:
+            resultados[pos] = error
+            continue
+        lote.append((cliente_id, fecha, total, lineas))
+        posiciones.append(pos)
+
+    if lote:
+        factura_ids, err = _insertar_lote(lote)
+        for pos, (_, _, total, lineas) in zip(posiciones, lote):
+            if err:
+                resultados[pos] = f"DB error: {err}"
+            else:
+                resultados[pos] = (factura_ids.pop(0), total, len(lineas))
+
+    filas = []
+    for pos, factura in enumerate(facturas):
+        resultado = resultados[pos]
+        if isinstance(resultado, str):
+            filas.append(_resultado(factura, inicio + pos, error=resultado))
+        else:
+            factura_id, total, lineas = resultado
+            filas.append(_resultado(factura, inicio + pos, factura_id=factura_id, total=total, lineas=lineas))
+    return filas
+
+def _resultado(factura, indice, **campos):
+    fila = {"indice": indice, "ok": "error" not in campos}
+    if isinstance(factura, dict) and "ref" in factura:
+        fila["ref"] = factura["ref"]
+    fila.update(campos)
+    return fila
+
+@app.route("/factura_db/facturas/bulk", methods=["POST"])
+def facturas_bulk():
+    """Ingesta masiva de facturas
+
+    Body JSON {"facturas": [{"cliente_id": 1, "fecha": "2024-07-01T10:00:00",
+    "lineas": [{"articulo_id": 4, "cantidad": 2}], "ref": "opcional"}, ...]} o
+    NDJSON (Content-Type application/x-ndjson, una factura por línea).
+    precio_unitario sale del historial de precios en la fecha de la factura;
+    subtotal y total se calculan. Cada lote de FACTURAS_LOTE facturas (o
+    ?lote=N) es una transacción con INSERT de varias filas. Responde NDJSON: una línea por
+    factura (en el orden recibido) y una línea final con el resumen.
+    """
+    denegado = requiere_admin()
+    if denegado:
+        return denegado
+    if request.mimetype not in ("application/json", "application/x-ndjson"):
+        return jsonify({"error": "Content-Type debe ser application/json o application/x-ndjson"}), 415
+    tam_lote = request.args.get("lote", str(FACTURAS_LOTE))
+    if not tam_lote.isdigit() or not 1 <= int(tam_lote) <= FACTURAS_LOTE * 10:
+        return jsonify({"error": f"lote debe estar entre 1 y {FACTURAS_LOTE * 10}"}), 400
+    tam_lote = int(tam_lote)
+    # El JSON se revisa antes de empezar la respuesta: después ya salió el 200
+    lista = None
+    if request.mimetype == "application/json":
+        datos = request.get_json(silent=True)
+        lista = datos.get("facturas") if isinstance(datos, dict) else None
+        if not isinstance(lista, list):
+            return jsonify({"error": 'el cuerpo debe ser un objeto {"facturas": [...]}'}), 400
+
+    def procesar():
+        inicio = time.perf_counter()
+        resumen = {"recibidas": 0, "insertadas": 0, "rechazadas": 0}
+        facturas = _leer_facturas(lista)
+        while True:
+            lote = []
+            for factura in facturas:
+                lote.append(factura)
+                if len(lote) >= tam_lote:
+                    break
+            if not lote:
+                break
+            if resumen["recibidas"] + len(lote) > FACTURAS_BULK_MAX:
+                yield {"error": f"Se permiten hasta {FACTURAS_BULK_MAX} facturas por petición"}
+                break
+            for fila in _procesar_lote(lote, resumen["recibidas"]):
+                resumen["insertadas" if fila["ok"] else "rechazadas"] += 1
+                yield fila
+            resumen["recibidas"] += len(lote)
+        resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+        yield {"resumen": resumen}
+
+    return respuesta_filas(procesar(), "ndjson", stream=True)
+
+
+@app.route("/factura_db/tabla_productos/<string:name_tabla>", methods=["GET"])
+@respuesta_condicional("mariadb", lambda name_tabla: [name_tabla], CACHE_PRIVADO)
+def tabla_productos(name_tabla):
+    if name_tabla not in TABLAS_TIENDA:
+        return jsonify({"error": "Tabla no permitida"}), 400
+    return leer_tabla(name_tabla, TABLAS_TIENDA[name_tabla], "mariadb")
+
+
+# Exportación masiva: CSV (COPY en Postgres, cursor sin buffer en MySQL/MariaDB)
+# y, si pyarrow está instalado, Parquet o Arrow IPC armados por lotes
+EXPORT_LOTE = int(os.getenv("API_EXPORT_LOTE", "50000"))
+EXPORT_BLOQUE_BYTES = int(os.getenv("API_EXPORT_BLOQUE_BYTES", str(8 * 1024 * 1024)))
+EXPORT_COLA = int(os.getenv("API_EXPORT_COLA", "16"))
+EXPORT_FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+exportaciones_recientes = deque(maxlen=50)
+
+
+def esquema_tabla(tabla, database):
+    """[(columna, tipo SQL)] de la tabla, en caché"""
+    return columnas_cache.get_or_load(
+        (database, tabla, "tipos"),
+        lambda: _esquema_tabla(tabla, database),
+    )
+
+def _esquema_tabla(tabla, database):
+    if database == "postgres":
+        rows, err = postgres_all(
+            """
+            SELECT column_name AS "Field",
+                   CASE WHEN data_type = 'numeric' AND numeric_precision IS NOT NULL
+                        THEN format('numeric(%%s,%%s)', numeric_precision, numeric_scale)
+                        ELSE data_type END AS "Type"
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+            """,
+            (tabla,),
+        )
+    else:
+        rows, err = query_mysql(f"SHOW COLUMNS FROM `{tabla}`", (), database)
+    if err:
+        return None, err
+    return [(r["Field"], r["Type"]) for r in rows], None
+
+def _tipo_arrow(tipo):
+    """Tipo de Arrow para un tipo de MySQL/MariaDB o Postgres; lo desconocido queda como texto"""
+    base = tipo.lower().split("(")[0].replace(" unsigned", "").strip()
+    if base in ("tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year"):
+        return pyarrow.int64()
+    if base in ("decimal", "numeric"):
+        medida = re.search(r"\((\d+),\s*(\d+)\)", tipo)
+        if medida and int(medida.group(1)) <= 38:
+            return pyarrow.decimal128(int(medida.group(1)), int(medida.group(2)))
+        return pyarrow.string()
+    if base in ("float", "double", "real", "double precision"):
+        return pyarrow.float64()
+    if base == "date":
+        return pyarrow.date32()
+    if base in ("datetime", "timestamp", "timestamp without time zone"):
+        return pyarrow.timestamp("us")
+    if base in ("boolean", "bool"):
+        return pyarrow.bool_()
+    if base in ("blob", "tinyblob", "mediumblob", "longblob", "binary", "varbinary", "bytea"):
+        return pyarrow.binary()
+    return pyarrow.string()
+
+def campos_export(tabla, database):
+    """Columnas pedidas en ?fields= (o todas) con su tipo; (campos, respuesta de error)"""
+    esquema, err = esquema_tabla(tabla, database)
+    if err:
+        return None, (jsonify({"error": "DB error", "detail": err}), 500)
+    tipos = dict(esquema)
+    fields = request.args.get("fields")
+    if not fields:
+        return esquema, None
+    pedidas = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    invalidas = [f for f in pedidas if f not in tipos]
+    if not pedidas or invalidas:
+        return None, (jsonify({"error": "Campos no válidos", "campos": invalidas, "disponibles": list(tipos)}), 400)
+    return [(c, tipos[c]) for c in pedidas], None
+
+
+class _FinCopia:
+    def __init__(self, error=None, filas=0):
+        self.error = error
+        self.filas = filas
+
+
+class _CopiaCancelada(Exception):
+    """El cliente dejó de leer: el hilo del COPY debe terminar"""
+
+
+def _poner(cola, item, cancelado):
+    """put en la cola acotada sin quedar bloqueado si se cancela la exportación"""
+    while not cancelado.is_set():
+        try:
+            cola.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            pass
+    raise _CopiaCancelada()
+
+
+class _CanalCopia:
+    """Destino de copy_expert: junta las filas en bloques de ~64KB y los pasa a la cola"""
+
+    def __init__(self, cola, cancelado):
+        self._cola = cola
+        self._cancelado = cancelado
+        self._buffer = bytearray()
+
+    def write(self, datos):
+        self._buffer += datos.encode() if isinstance(datos, str) else datos
+        if len(self._buffer) >= STREAM_CHUNK_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            _poner(self._cola, bytes(self._buffer), self._cancelado)
+            self._buffer = bytearray()
+
+
+def postgres_copy(sql):
+    """Bloques de bytes de un COPY ... TO STDOUT
+
+    copy_expert bloquea hasta terminar, así que corre en un hilo que entrega
+    los bloques por una cola acotada (EXPORT_COLA bloques en memoria como
+    máximo). Si el cliente corta, se cancela el COPY y la conexión se descarta.
+    """
+    with get_db_connection(STATEMENT_TIMEOUT_LARGO) as conn:
+        cola = queue.Queue(maxsize=EXPORT_COLA)
+        cancelado = threading.Event()
+
+        def copiar():
+            canal, fin = _CanalCopia(cola, cancelado), _FinCopia()
+            try:
+                with conn.cursor() as cur:
+                    cur.copy_expert(sql, canal)
+                    fin.filas = cur.rowcount
+                canal.flush()
+            except _CopiaCancelada:
+                return
+            except Exception as err:
+                fin.error = err
+            try:
+                _poner(cola, fin, cancelado)
+            except _CopiaCancelada:
+                pass
+
+        notificar_sql("postgres", sql)
+        inicio = time.perf_counter()
+        hilo = threading.Thread(target=copiar, name="export-copy", daemon=True)
+        hilo.start()
+        fin = None
+        try:
+            while True:
+                antes = time.perf_counter()
+                bloque = cola.get()
+                sumar_fase("postgres", "lectura", time.perf_counter() - antes)
+                if isinstance(bloque, _FinCopia):
+                    fin = bloque
+                    break
+                yield bloque
+        finally:
+            if fin is None:
+                cancelado.set()
+                try:
+                    conn.cancel()
+                except psycopg2.Error:
+                    pass
+            hilo.join()
+            if fin is None or fin.error is not None:
+                # Un COPY cortado a medias deja la conexión inservible
+                conn.close()
+            registrar_sql("postgres", sql, (), fin.filas if fin else 0, time.perf_counter() - inicio)
+        if fin.error is not None:
+            raise fin.error
+
+
+class _LectorBloques(io.RawIOBase):
+    """Archivo de solo lectura sobre un iterador de bloques de bytes (para pyarrow.csv)"""
+
+    def __init__(self, bloques):
+        self._bloques = bloques
+        self._resto = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while not self._resto:
+            self._resto = next(self._bloques, b"")
+            if not self._resto:
+                return 0
+        n = min(len(destino), len(self._resto))
+        destino[:n] = self._resto[:n]
+        self._resto = self._resto[n:]
+        return n
+
+
+class _Buzon(io.RawIOBase):
+    """Archivo de escritura que guarda lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos, self._partes = b"".join(self._partes), []
+        return datos
+
+
+def _csv_bytes(columnas, filas):
+    """CSV con encabezado en bloques de ~64KB"""
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+    escritor.writerow(columnas)
+    for fila in filas:
+        escritor.writerow(fila)
+        if salida.tell() >= STREAM_CHUNK_BYTES:
+            yield salida.getvalue().encode()
+            salida.seek(0)
+            salida.truncate()
+    if salida.tell():
+        yield salida.getvalue().encode()
+
+def _arreglo_arrow(valores, tipo):
+    if pyarrow.types.is_string(tipo):
+        valores = [v if v is None or isinstance(v, str) else str(v) for v in valores]
+    return pyarrow.array(valores, type=tipo)
+
+def _lotes_filas(filas, esquema):
+    """RecordBatches de EXPORT_LOTE filas (tuplas) con el esquema dado"""
+    while True:
+        lote = list(islice(filas, EXPORT_LOTE))
+        if not lote:
+            return
+        yield pyarrow.RecordBatch.from_arrays(
+            [_arreglo_arrow(list(v), campo.type) for v, campo in zip(zip(*lote), esquema)], schema=esquema
+        )
+
+def _lotes_csv(bloques, esquema):
+    """RecordBatches leídos del CSV de un COPY, de a EXPORT_BLOQUE_BYTES"""
+    lector = pyarrow.csv.open_csv(
+        _LectorBloques(bloques),
+        read_options=pyarrow.csv.ReadOptions(block_size=EXPORT_BLOQUE_BYTES, use_threads=False),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types=esquema,
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+    yield from lector
+
+def _arrow_bytes(formato, esquema, lotes):
+    """Escribe los lotes como Parquet (un row group por lote) o Arrow IPC y entrega los bytes"""
+    buzon = _Buzon()
+    if formato == "parquet":
+        escritor = pyarrow.parquet.ParquetWriter(buzon, esquema)
+    else:
+        escritor = pyarrow.ipc.new_stream(buzon, esquema)
+    try:
+        for lote in lotes:
+            escritor.write_batch(lote)
+            yield buzon.vaciar()
+    finally:
+        escritor.close()
+    yield buzon.vaciar()
+
+def _medir_export(bloques, inicio, backend, base, tabla, formato):
+    """Cuenta los bytes enviados y registra el throughput (MB/s) al terminar"""
+    enviados, completa = 0, False
+    try:
+        for bloque in bloques:
+            if bloque:
+                enviados += len(bloque)
+                yield bloque
+        completa = True
+    finally:
+        segundos = time.perf_counter() - inicio
+        METRICA_EXPORT_BYTES.sumar(backend, formato, valor=enviados)
+        METRICA_EXPORT_SEGUNDOS.sumar(backend, formato, valor=round(segundos, 6))
+        exportaciones_recientes.append({
+            "db": base,
+            "table": tabla,
+            "format": formato,
+            "bytes": enviados,
+            "seconds": round(segundos, 3),
+            "mb_s": round(enviados / 1e6 / segundos, 2) if segundos else None,
+            "completed": completa,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+
+def exportar(base, tabla, database):
+    """Exporta una tabla permitida completa como CSV, Parquet o Arrow IPC (?format=, ?fields=)"""
+    inicio = time.perf_counter()
+    formato = request.args.get("format", "csv")
+    if formato not in EXPORT_FORMATOS:
+        return jsonify({"error": "format debe ser csv, parquet o arrow"}), 400
+    if formato != "csv" and pyarrow is None:
+        return jsonify({"error": f"El formato {formato} requiere pyarrow instalado en la API"}), 501
+    campos, error = campos_export(tabla, database)
+    if error:
+        return error
+    columnas = [c for c, _ in campos]
+    if formato != "csv":
+        esquema = pyarrow.schema([(c, _tipo_arrow(t)) for c, t in campos])
+
+    if database == "postgres":
+        lista = ", ".join(f'"{c}"' for c in columnas)
+        filas, err = iniciar_stream(postgres_copy(
+            f'COPY "{tabla}" ({lista}) TO STDOUT WITH (FORMAT csv, HEADER true)'
+        ))
+    else:
+        sql = f"SELECT {', '.join(f'`{c}`' for c in columnas)} FROM `{tabla}`"
+        filas, err = iniciar_stream(mysql_stream(sql, (), database, diccionario=False))
+    if err:
+        return jsonify({"error": "DB error", "detail": err}), 500
+
+    # En Postgres filas ya son bloques de CSV; en MySQL/MariaDB, tuplas
+    if database == "postgres":
+        cuerpo = filas if formato == "csv" else _arrow_bytes(formato, esquema, _lotes_csv(filas, esquema))
+    elif formato == "csv":
+        cuerpo = _csv_bytes(columnas, filas)
+    else:
+        cuerpo = _arrow_bytes(formato, esquema, _lotes_filas(filas, esquema))
+
+    mimetype, extension = EXPORT_FORMATOS[formato]
+    return Response(
+        stream_with_context(_medir_export(cuerpo, inicio, database, base, tabla, formato)),
+        status=200,
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{tabla}.{extension}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@app.route("/export/mundo/<string:tabla>", methods=["GET"])
+def exportar_mundo(tabla):
+    if tabla not in TABLAS_MUNDO:
+        return jsonify({"error": "Tabla no permitida"}), 400
+    return exportar("mundo", tabla, "postgres")
+
+@app.route("/export/hoja_vida/<string:tabla>", methods=["GET"])
+def exportar_hoja_vida(tabla):
+    if tabla not in TABLAS_HOJA_VIDA:
+        return jsonify({"error": "Tabla no permitida"}), 400
+    return exportar("hoja_vida", tabla, "mysql")
+
+@app.route("/export/factura_db/<string:tabla>", methods=["GET"])
+def exportar_tienda(tabla):
+    if tabla not in TABLAS_TIENDA:
+        return jsonify({"error": "Tabla no permitida"}), 400
+    return exportar("factura_db", tabla, "mariadb")
+
+@app.route("/export/stats", methods=["GET"])
+def exportar_stats():
+    """Últimas exportaciones con su throughput en MB/s"""
+    return jsonify({"pyarrow": pyarrow is not None, "recent": list(exportaciones_recientes)}), 200
+
+
+
+@app.route("/pools", methods=["GET"])
+def pools():
+    """Estadísticas de los pools de conexiones por backend"""
+    return jsonify({nombre: pool.stats() for nombre, pool in POOLS.items()}), 200
+
+
+def respuesta_saturada(detalle):
+    respuesta = jsonify({"error": "Servicio saturado", "detail": detalle})
+    respuesta.status_code = 503
+    respuesta.headers["Retry-After"] = str(RETRY_AFTER)
+    return respuesta
+
+@app.before_request
+def admitir_peticion():
+    """Toma un cupo de la ruta (si tiene límite) o responde 503 sin tocar la base"""
+    limitador = LIMITADORES.get(request.endpoint)
+    if limitador is None:
+        return None
+    try:
+        limitador.entrar()
+    except Saturado as err:
+        METRICA_RECHAZOS.sumar(_ruta(), "ruta")
+        return respuesta_saturada(str(err))
+    g.limitador = limitador
+    return None
+
+@app.teardown_request
+def liberar_cupo(_error):
+    """Devuelve el cupo si la respuesta no llegó a tomarlo (after_request no corrió)"""
+    limitador = g.pop("limitador", None)
+    if limitador is not None:
+        limitador.salir()
+
+@app.after_request
+def responder_saturacion(respuesta):
+    """Un 500 causado por un pool sin cupo (cola llena o espera agotada) pasa a 503
+
+    El cupo de la ruta se devuelve al cerrar la respuesta, así en streaming
+    dura hasta enviar el último bloque. Se registra después de las demás,
+    así que corre antes que la compresión y las métricas.
+    """
+    limitador = g.pop("limitador", None)
+    if limitador is not None:
+        respuesta.call_on_close(limitador.salir)
+    backend = g.get("saturado")
+    if backend and respuesta.status_code == 500:
+        respuesta.status_code = 503
+        respuesta.headers["Retry-After"] = str(RETRY_AFTER)
+        METRICA_RECHAZOS.sumar(_ruta(), backend)
+    return respuesta
+
+
+@app.route("/admision", methods=["GET"])
+def admision():
+    """Límites por ruta y colas de los pools"""
+    return jsonify({
+        "routes": {ruta: limitador.stats() for ruta, limitador in LIMITADORES.items()},
+        "pools": {
+            nombre: {clave: stats[clave] for clave in ("max_waiters", "waiting", "rejected", "timeouts")}
+            for nombre, stats in ((nombre, pool.stats()) for nombre, pool in POOLS.items())
+        },
+        "retry_after": RETRY_AFTER,
+    }), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas en formato de texto de Prometheus (de este proceso)"""
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    lineas += [
+        "# HELP api_pool_connections Conexiones de cada pool por estado",
+        "# TYPE api_pool_connections gauge",
+    ]
+    contadores = []
+    for nombre, pool in POOLS.items():
+        stats = pool.stats()
+        for estado in ("open", "in_use", "idle", "waiting"):
+            lineas.append(f'api_pool_connections{{backend="{nombre}",state="{estado}"}} {stats[estado]}')
+        contadores.append((nombre, stats["timeouts"]))
+    lineas += ["# HELP api_pool_timeouts_total Esperas por conexión que agotaron el timeout",
+               "# TYPE api_pool_timeouts_total counter"]
+    lineas += [f'api_pool_timeouts_total{{backend="{nombre}"}} {total}' for nombre, total in contadores]
+    lineas += [
+        "# HELP api_process_resident_memory_bytes Memoria residente de este proceso (worker)",
+        "# TYPE api_process_resident_memory_bytes gauge",
+        f'api_process_resident_memory_bytes{{pid="{os.getpid()}"}} {memoria_rss() or 0}',
+        "# HELP api_process_startup_seconds Tiempo de arranque del proceso (pools e índices)",
+        "# TYPE api_process_startup_seconds gauge",
+        f'api_process_startup_seconds{{pid="{os.getpid()}"}} {_proceso["arranque_segundos"] or 0}',
+    ]
+    return Response("\n".join(lineas) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Liveness: el proceso responde (no toca las bases; para eso está /ready)"""
+    return jsonify({"status": "ok"}), 200
+
+
+# Readiness: sondas a las tres bases en paralelo, con el resultado en caché READY_TTL segundos
+READY_TTL = float(os.getenv("READY_TTL", "2"))
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "1"))
+
+_ready = {"resultado": None, "vence": float("-inf")}
+_ready_lock = threading.Lock()
+# Sondas que aún no terminan: no se lanza otra sobre la misma base hasta que acaben
+_sondas_en_curso = {}
+
+
+def _sondear(nombre, pool, resultado, listo):
+    """Presta una conexión (sin esperar más de READY_TIMEOUT) y la verifica con un ping"""
+    inicio = time.perf_counter()
+    try:
+        with pool.connection(timeout=READY_TIMEOUT) as conn:
+            if not pool._ping(conn):
+                raise ConnectionError("ping fallido")
+        resultado.update(ok=True)
+    except Exception as err:
+        resultado.update(ok=False, error=str(err))
+    finally:
+        resultado["latency_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        with _ready_lock:
+            _sondas_en_curso.pop(nombre, None)
+        listo.set()
+
+def sondear_backends():
+    """{backend: {ok, latency_ms, error, pool}} con las sondas en paralelo"""
+    sondas = {}
+    for nombre, pool in POOLS.items():
+        resultado, listo = {}, threading.Event()
+        with _ready_lock:
+            en_curso = _sondas_en_curso.get(nombre)
+            if en_curso is None:
+                _sondas_en_curso[nombre] = listo
+        if en_curso is not None:
+            resultado.update(ok=False, error="la sonda anterior aún no termina")
+            listo.set()
+        else:
+            threading.Thread(
+                target=_sondear, args=(nombre, pool, resultado, listo), name=f"ready-{nombre}", daemon=True
+            ).start()
+        sondas[nombre] = (resultado, listo)
+
+    limite = time.monotonic() + READY_TIMEOUT
+    backends = {}
+    for nombre, (resultado, listo) in sondas.items():
+        if not listo.wait(max(0.0, limite - time.monotonic())):
+            resultado = {"ok": False, "error": f"sin respuesta en {READY_TIMEOUT}s",
+                         "latency_ms": round(READY_TIMEOUT * 1000, 1)}
+        stats = POOLS[nombre].stats()
+        capacidad = stats["size"] + stats["max_overflow"]
+        backends[nombre] = {
+            "ok": resultado["ok"],
+            "latency_ms": resultado.get("latency_ms"),
+            "error": resultado.get("error"),
+            "pool": {
+                "in_use": stats["in_use"],
+                "waiting": stats["waiting"],
+                "capacity": capacidad,
+                "saturation": round(stats["in_use"] / capacidad, 3) if capacidad else None,
+                "timeouts": stats["timeouts"],
+            },
+        }
+    return backends
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness: 200 si las tres bases responden, 503 si alguna no
+
+    El resultado se reutiliza READY_TTL segundos, así que muchos balanceadores
+    preguntando no multiplican las conexiones a las bases.
+    """
+    with _ready_lock:
+        vigente = _ready["resultado"] if time.monotonic() < _ready["vence"] else None
+    cached = vigente is not None
+    if vigente is None:
+        backends = sondear_backends()
+        vigente = {
+            "status": "ready" if all(b["ok"] for b in backends.values()) else "not_ready",
+            "checked_at": time.time(),
+            "backends": backends,
+        }
+        with _ready_lock:
+            _ready.update(resultado=vigente, vence=time.monotonic() + READY_TTL)
+    respuesta = jsonify({**vigente, "cached": cached})
+    respuesta.status_code = 200 if vigente["status"] == "ready" else 503
+    respuesta.headers["Cache-Control"] = "no-store"
+    return respuesta
+
+# Arranque del proceso que atiende peticiones
+API_POOL_CALIENTES = int(os.getenv("API_POOL_CALIENTES", "2"))
+_proceso = {"pid": os.getpid(), "arranque_segundos": None, "pools_calientes": {}}
+
+def memoria_rss():
+    """Memoria residente del proceso en bytes (None si no se puede leer)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def iniciar_proceso(calentar=False):
+    """Carga los índices configurados como startup
+
+    Sin calentar (python3 api.py) los lanza en segundo plano. Con calentar=True
+    (workers de gunicorn, después del fork) abre API_POOL_CALIENTES conexiones
+    por pool y carga los índices aquí mismo, así el worker no recibe tráfico
+    hasta estar listo. Devuelve el tiempo que tomó.
+    """
+    inicio = time.perf_counter()
+    _proceso["pid"] = os.getpid()
+    if calentar:
+        _proceso["pools_calientes"] = {nombre: pool.calentar(API_POOL_CALIENTES) for nombre, pool in POOLS.items()}
+    if GEO_INDEX_MODE == "startup":
+        recargar_geo_index(esperar=calentar)
+    if PRECIOS_INDEX_MODE == "startup":
+        recargar_indice_precios(esperar=calentar)
+    if BUSQUEDA_INDEX_MODE == "startup":
+        for nombre in BUSQUEDAS:
+            recargar_busqueda(nombre, esperar=calentar)
+    _proceso["arranque_segundos"] = round(time.perf_counter() - inicio, 3)
+    return _proceso["arranque_segundos"]
+
+# Con gunicorn (API_PREFORK=1) el master no abre conexiones ni lanza hilos:
+# cada worker llama a iniciar_proceso después del fork (ver gunicorn.conf.py)
+if os.getenv("API_PREFORK") != "1":
+    iniciar_proceso()
 
 if __name__ == "__main__":
-    # debug=True solo en desarrollo
-    app.run(host="0.0.0.0", port=4000, debug=True)
\ No newline at end of file
+    # Servidor de desarrollo; el depurador (y el reloader) solo con API_DEBUG=1
+    app.run(host="0.0.0.0", port=4000, debug=os.getenv("API_DEBUG", "0") == "1")
\ No newline at end of file
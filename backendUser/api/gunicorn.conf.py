@@ -0,0 +1,80 @@
+"""Configuración de gunicorn para la API en producción
+
+    gunicorn -c gunicorn.conf.py api:app
+
+Workers pre-forkeados con hilos (gthread). Con GUNICORN_PRELOAD=1 (por
+defecto) api.py se importa una sola vez en el master y los workers comparten
+esas páginas; el master no abre conexiones ni lanza hilos (API_PREFORK=1).
+Cada worker, ya forkeado, abre sus conexiones y carga los índices en
+post_worker_init, antes de aceptar su primera petición.
+
+Recarga sin cortar peticiones:
+    kill -HUP <master>     workers nuevos con la configuración releída; los viejos
+                           dejan de aceptar y terminan lo que tienen en curso
+                           (hasta GUNICORN_GRACEFUL_TIMEOUT segundos)
+    kill -USR2 <master>    con preload el código se cargó en el master: para tomar
+    kill -TERM <viejo>     código nuevo se arranca otro master y se drena el viejo
+
+Variables de entorno:
+    GUNICORN_BIND               por defecto 0.0.0.0:4000
+    GUNICORN_WORKERS            por defecto un worker por núcleo
+    GUNICORN_THREADS            hilos por worker (por defecto 8)
+    GUNICORN_TIMEOUT            segundos sin latido antes de reiniciar un worker (120)
+    GUNICORN_GRACEFUL_TIMEOUT   segundos para drenar en un reinicio (30)
+    GUNICORN_MAX_REQUESTS       reinicia cada worker tras N peticiones (0 = nunca)
+    GUNICORN_PRELOAD            1 (por defecto) o 0
+
+Cada worker tiene sus propios pools: el máximo de conexiones por base es
+workers x (API_*_POOL_SIZE + API_*_POOL_MAX_OVERFLOW).
+"""
+import os
+import time
+
+# Antes de importar api.py (también con preload): el arranque lo hace cada worker
+os.environ["API_PREFORK"] = "1"
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:4000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(os.cpu_count() or 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+worker_class = "gthread"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+accesslog = "-"
+errorlog = "-"
+
+_inicio_master = time.perf_counter()
+
+
+def _mb(rss):
+    return f"{rss / 1024 / 1024:.1f} MB" if rss else "?"
+
+
+def when_ready(server):
+    server.log.info("Master listo en %.2fs (%d workers x %d hilos, preload=%s)",
+                    time.perf_counter() - _inicio_master, workers, threads, preload_app)
+
+
+def post_fork(server, worker):
+    worker.inicio_arranque = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Abre los pools y carga los índices del worker antes de que reciba tráfico"""
+    import api
+
+    api.iniciar_proceso(calentar=True)
+    worker.log.info(
+        "Worker %s listo en %.2fs (pools %s), RSS %s",
+        worker.pid, time.perf_counter() - worker.inicio_arranque,
+        api._proceso["pools_calientes"], _mb(api.memoria_rss()),
+    )
+
+
+def worker_exit(server, worker):
+    import api
+
+    server.log.info("Worker %s termina, RSS %s", worker.pid, _mb(api.memoria_rss()))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""plan-audit: EXPLAIN de cada sentencia SQL que emite api.py.
+
+Recorre todas las rutas de la API con valores de muestra (usando el cliente de
+pruebas de Flask contra las bases configuradas por variables de entorno),
+captura las sentencias con api.observar_sql y corre EXPLAIN (o EXPLAIN ANALYZE
+con --analyze) sobre cada una. Marca recorridos completos de tabla y
+ordenamientos (filesort / Sort) sobre más de --min-rows filas.
+
+Sale con código 1 si hay hallazgos no permitidos o rutas sin muestra, así que
+sirve como prueba de regresión en CI contra una base sembrada:
+
+    python3 plan_audit.py --min-rows 1000
+    python3 plan_audit.py --analyze --json reporte.json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# El índice geográfico respondería sin SQL: se apaga para auditar las consultas
+os.environ.setdefault("GEO_INDEX", "off")
+os.environ.setdefault("PRECIOS_INDEX", "off")
+os.environ.setdefault("BUSQUEDA_INDEX", "off")
+
+import psycopg2  # noqa: E402
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+import api  # noqa: E402
+
+
+# Valores de muestra por nombre de parámetro de ruta
+MUESTRAS = {
+    "country_name": os.getenv("AUDIT_PAIS", "Colombia"),
+    "numero_documento": os.getenv("AUDIT_DOCUMENTO", "CC1001"),
+    "producto_name": os.getenv("AUDIT_PRODUCTO", "Iphone16"),
+}
+
+# Parámetros que recorren todos sus valores permitidos
+MUESTRAS_MULTIPLES = {
+    ("tablas_persona", "name_tabla"): list(api.TABLAS_HOJA_VIDA),
+    ("tabla_productos", "name_tabla"): list(api.TABLAS_TIENDA),
+    ("ventas", "dimension"): list(api.DIMENSIONES_VENTAS),
+    ("exportar_mundo", "tabla"): list(api.TABLAS_MUNDO),
+    ("exportar_hoja_vida", "tabla"): list(api.TABLAS_HOJA_VIDA),
+    ("exportar_tienda", "tabla"): list(api.TABLAS_TIENDA),
+}
+
+# Variantes de query string por endpoint: (nombre, query string)
+VARIANTES = {
+    "obtener_paises_estados_ciudades": [
+        ("completo", ""),
+        ("pagina", "limit=100"),
+        ("pagina_siguiente", "limit=100&after=" + os.getenv("AUDIT_AFTER", "Colombia,Antioquia,Medellín,1")),
+    ],
+    "tablas_persona": [("completo", ""), ("pagina", "limit=100&after_id=0")],
+    "tabla_productos": [("completo", ""), ("pagina", "limit=100&after_id=0")],
+    "consultar_precio": [("", "articulo_id=4&fecha=2024-07-01")],
+    "buscar_mundo": [("", "q=" + os.getenv("AUDIT_BUSQUEDA", "bog"))],
+    "buscar_articulos": [("", "q=" + os.getenv("AUDIT_BUSQUEDA_ARTICULO", "iph"))],
+}
+
+# Cuerpos de muestra para rutas POST de lectura
+MUESTRAS_POST = {
+    "reporte_tiempo_experiencia_batch": {"documentos": [MUESTRAS["numero_documento"]]},
+    "consultar_precios_batch": {"consultas": [{"articulo_id": 4, "fecha": "2024-07-01"}]},
+}
+
+# Rutas administrativas o con efectos: no se auditan
+EXCLUIDAS = {
+    "static", "mundo_cache_invalidar", "mundo_indice_recargar", "precio_indice_recargar",
+    "facturas_bulk", "buscar_mundo_recargar", "buscar_articulos_recargar",
+}
+
+# Hallazgos esperados: (endpoint, variante) -> motivo
+PERMITIDOS = {
+    ("obtener_paises_estados_ciudades", "completo"): "volcado completo del mundo: recorre y ordena todo a propósito",
+    ("tablas_persona", "completo"): "volcado completo de la tabla sin paginar",
+    ("tabla_productos", "completo"): "volcado completo de la tabla sin paginar",
+    ("anomalias_precio", ""): "revisa todo historial_precio a propósito",
+    ("exportar_hoja_vida", ""): "exportación completa de la tabla",
+    ("exportar_tienda", ""): "exportación completa de la tabla",
+    ("buscar_mundo", ""): "respaldo sin índice de búsqueda: ILIKE recorre las tablas",
+    ("buscar_articulos", ""): "respaldo sin índice de búsqueda: LIKE recorre articulo",
+}
+
+
+def rutas():
+    """(endpoint, método, url, variante, cuerpo) de cada llamada a auditar; y rutas sin muestra"""
+    llamadas, sin_muestra = [], []
+    for regla in api.app.url_map.iter_rules():
+        if regla.endpoint in EXCLUIDAS:
+            continue
+        metodo = "GET" if "GET" in regla.methods else "POST"
+        if metodo == "POST" and regla.endpoint not in MUESTRAS_POST:
+            sin_muestra.append(f"{regla.rule} (POST sin cuerpo de muestra)")
+            continue
+
+        combinaciones = [{}]
+        for argumento in regla.arguments:
+            valores = MUESTRAS_MULTIPLES.get((regla.endpoint, argumento))
+            if valores is None and argumento in MUESTRAS:
+                valores = [MUESTRAS[argumento]]
+            if valores is None:
+                sin_muestra.append(f"{regla.rule} (sin muestra para <{argumento}>)")
+                combinaciones = []
+                break
+            combinaciones = [{**c, argumento: v} for c in combinaciones for v in valores]
+
+        for valores in combinaciones:
+            url = api.app.url_map.bind("localhost").build(regla.endpoint, valores)
+            for variante, query in VARIANTES.get(regla.endpoint, [("", "")]):
+                llamadas.append((
+                    regla.endpoint, metodo, url + ("?" + query if query else ""),
+                    variante, MUESTRAS_POST.get(regla.endpoint),
+                ))
+    return llamadas, sin_muestra
+
+
+def capturar_sentencias(llamadas):
+    """Ejecuta las llamadas y devuelve las sentencias únicas que emitió cada una"""
+    actual = {}
+    capturadas = []
+    vistas = set()
+
+    @api.observar_sql
+    def registrar(backend, sql, params):
+        clave = (actual.get("endpoint"), actual.get("variante"), backend, sql)
+        if clave in vistas:
+            return
+        vistas.add(clave)
+        capturadas.append({**actual, "backend": backend, "sql": sql, "params": list(params or ())})
+
+    cliente = api.app.test_client()
+    for endpoint, metodo, url, variante, cuerpo in llamadas:
+        actual.update(endpoint=endpoint, variante=variante, url=url)
+        if metodo == "GET":
+            respuesta = cliente.get(url)
+        else:
+            respuesta = cliente.post(url, json=cuerpo)
+        respuesta.get_data()  # consume las respuestas en streaming
+        if respuesta.status_code >= 500:
+            print(f"AVISO {url}: HTTP {respuesta.status_code} {respuesta.get_data(as_text=True)[:200]}")
+        respuesta.close()
+    return capturadas
+
+
+def explicar_mysql(sentencia, analyze, min_rows):
+    database = sentencia["backend"]
+    prefijo = "ANALYZE" if analyze else "EXPLAIN"
+    rows, err = api.query_mysql(f"{prefijo} {sentencia['sql']}", sentencia["params"], database)
+    if err:
+        return None, [f"no se pudo explicar: {err}"]
+    hallazgos = []
+    for r in rows:
+        filas = int(r.get("r_rows") or r.get("rows") or 0) if analyze else int(r.get("rows") or 0)
+        extra = r.get("Extra") or ""
+        tabla = r.get("table")
+        if r.get("type") == "ALL" and filas >= min_rows:
+            hallazgos.append(f"recorrido completo de {tabla} (~{filas} filas)")
+        if r.get("type") == "index" and filas >= min_rows:
+            hallazgos.append(f"recorrido completo del índice {r.get('key')} de {tabla} (~{filas} filas)")
+        if "filesort" in extra and filas >= min_rows:
+            hallazgos.append(f"filesort en {tabla} (~{filas} filas)")
+        if "temporary" in extra and filas >= min_rows:
+            hallazgos.append(f"tabla temporal en {tabla} (~{filas} filas)")
+    return rows, hallazgos
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def explicar_postgres(sentencia, analyze, min_rows):
+    opciones = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+    try:
+        with api.get_db_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(f"EXPLAIN ({opciones}) {sentencia['sql']}", sentencia["params"])
+                plan = cur.fetchone()["QUERY PLAN"][0]["Plan"]
+    except (psycopg2.Error, api.PoolTimeout) as err:
+        return None, [f"no se pudo explicar: {err}"]
+    hallazgos = []
+    for nodo in _nodos(plan):
+        filas = int(nodo.get("Actual Rows", nodo.get("Plan Rows", 0)) * nodo.get("Actual Loops", 1))
+        if nodo["Node Type"] == "Seq Scan" and filas >= min_rows:
+            hallazgos.append(f"Seq Scan de {nodo.get('Relation Name')} (~{filas} filas)")
+        if nodo["Node Type"] == "Sort" and filas >= min_rows:
+            hallazgos.append(f"Sort de ~{filas} filas por {', '.join(nodo.get('Sort Key', []))}")
+    return plan, hallazgos
+
+
+def auditar(analyze=False, min_rows=1000):
+    llamadas, sin_muestra = rutas()
+    resultados = []
+    for sentencia in capturar_sentencias(llamadas):
+        sql = sentencia["sql"].lstrip().upper()
+        if not sql.startswith(("SELECT", "WITH")):
+            # CALL, SHOW, ...: EXPLAIN no aplica
+            resultados.append({**sentencia, "plan": None, "hallazgos": [], "omitida": True})
+            continue
+        explicar = explicar_postgres if sentencia["backend"] == "postgres" else explicar_mysql
+        plan, hallazgos = explicar(sentencia, analyze, min_rows)
+        motivo = PERMITIDOS.get((sentencia["endpoint"], sentencia["variante"]))
+        resultados.append({**sentencia, "plan": plan, "hallazgos": hallazgos, "permitido": motivo})
+    return resultados, sin_muestra
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoría de planes de consulta de api.py")
+    parser.add_argument("--analyze", action="store_true", help="ejecuta las consultas (EXPLAIN ANALYZE / ANALYZE)")
+    parser.add_argument("--min-rows", type=int, default=1000, help="ignora recorridos de menos filas")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda el reporte completo en JSON")
+    args = parser.parse_args()
+
+    resultados, sin_muestra = auditar(args.analyze, args.min_rows)
+
+    fallas = 0
+    for r in resultados:
+        etiqueta = f"[{r['backend']}] {r['endpoint']}" + (f" ({r['variante']})" if r["variante"] else "")
+        if r.get("omitida"):
+            print(f"--   {etiqueta}: {r['sql'].split()[0]} sin EXPLAIN")
+        elif not r["hallazgos"]:
+            print(f"OK   {etiqueta}")
+        elif r["permitido"]:
+            print(f"PERM {etiqueta}: {'; '.join(r['hallazgos'])} -- {r['permitido']}")
+        else:
+            fallas += 1
+            print(f"FALLA {etiqueta}: {'; '.join(r['hallazgos'])}\n      {' '.join(r['sql'].split())[:300]}")
+    for ruta in sin_muestra:
+        fallas += 1
+        print(f"FALLA sin auditar: {ruta}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2, default=str)
+
+    print(f"\n{len(resultados)} sentencias auditadas, {fallas} fallas")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Configuración común de las pruebas de la API
+
+Las pruebas unitarias no necesitan bases de datos. Las de integración usan
+las mismas variables de entorno que api.py (MYSQL_HOST, MARIADB_HOST,
+DB_HOST, ...) y se saltan si la base no responde. Escriben datos: correr
+contra bases de prueba.
+"""
+import os
+import sys
+
+# Sin pools calientes ni índices cargados al importar
+os.environ.setdefault("API_PREFORK", "1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytest  # noqa: E402
+
+import api  # noqa: E402
+
+_disponibles = {}
+
+
+def base_disponible(database):
+    """True si la base contesta un SELECT 1 (se prueba una vez por sesión)"""
+    if database not in _disponibles:
+        if database == "postgres":
+            _, err = api.postgres_all("SELECT 1")
+        else:
+            _, err = api.query_mysql("SELECT 1", (), database)
+        _disponibles[database] = err is None
+    return _disponibles[database]
+
+
+def requiere_base(database):
+    return pytest.mark.skipif(not base_disponible(database), reason=f"{database} no disponible")
+
+
+@pytest.fixture
+def cliente():
+    return api.app.test_client()
@@ -0,0 +1,41 @@
+"""Las rutas POST con cuerpo JSON rechazan con 400 lo que no es un objeto"""
+import pytest
+
+import api
+
+
+def post(cliente, ruta, cuerpo, **kwargs):
+    respuesta = cliente.post(ruta, json=cuerpo, **kwargs)
+    estado, datos = respuesta.status_code, respuesta.get_json()
+    respuesta.close()
+    return estado, datos
+
+
+@pytest.mark.parametrize("cuerpo", [["CC1001"], "CC1001", 5, None])
+def test_experiencia_batch_con_cuerpo_que_no_es_objeto(cliente, cuerpo):
+    estado, datos = post(cliente, "/hoja_vida/reporte_tiempo_experiencia/batch", cuerpo)
+    assert estado == 400
+    assert "error" in datos
+
+
+@pytest.mark.parametrize("cuerpo", [[{"articulo_id": 1, "fecha": "2024-07-01"}], "consultas", 5, None])
+def test_precios_batch_con_cuerpo_que_no_es_objeto(cliente, cuerpo):
+    estado, datos = post(cliente, "/factura_db/precio/batch", cuerpo)
+    assert estado == 400
+    assert "error" in datos
+
+
+@pytest.mark.parametrize("cuerpo", [["Colombia"], "Colombia", {"country": 5}])
+def test_invalidar_cache_mundo_con_cuerpo_invalido(cliente, monkeypatch, cuerpo):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "")
+    estado, datos = post(cliente, "/mundo/cache/invalidar", cuerpo)
+    assert estado == 400
+    assert "error" in datos
+
+
+def test_invalidar_cache_mundo_sin_cuerpo_invalida_todo(cliente, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "")
+    respuesta = cliente.post("/mundo/cache/invalidar")
+    estado = respuesta.status_code
+    respuesta.close()
+    assert estado == 200
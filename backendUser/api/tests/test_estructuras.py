@@ -0,0 +1,239 @@
+"""Pruebas unitarias de las estructuras en memoria de api.py (sin bases de datos)"""
+import threading
+from datetime import date
+
+import pytest
+
+import api
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(api.time, "monotonic", reloj)
+    return reloj
+
+
+# TTLCache
+
+def test_cache_expulsa_la_menos_usada():
+    cache = api.TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_vence_por_ttl(reloj):
+    cache = api.TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    reloj.ahora += 4
+    assert cache.get("a") == 1
+    reloj.ahora += 2
+    assert cache.get("a", "falta") == "falta"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_cache_invalida_por_predicado():
+    cache = api.TTLCache()
+    for clave in (("pais", "Colombia"), ("repetidas", "Colombia"), ("pais", "Peru")):
+        cache.set(clave, [])
+    assert cache.invalidate(lambda clave: clave[1] == "Colombia") == 2
+    assert cache.stats()["size"] == 1
+    assert cache.invalidate() == 1
+
+
+def test_cache_no_guarda_errores():
+    cache = api.TTLCache()
+    llamadas = []
+
+    def cargar():
+        llamadas.append(1)
+        return (None, "sin conexión") if len(llamadas) == 1 else ([1], None)
+
+    assert cache.get_or_load("k", cargar) == (None, "sin conexión")
+    assert cache.get_or_load("k", cargar) == ([1], None)
+    assert cache.get_or_load("k", cargar) == ([1], None)
+    assert len(llamadas) == 2
+
+
+# Limitador
+
+def test_limitador_rechaza_con_la_cola_llena():
+    limitador = api.Limitador("prueba", limite=1, cola=0, espera=1)
+    limitador.entrar()
+    with pytest.raises(api.Saturado):
+        limitador.entrar()
+    limitador.salir()
+    limitador.entrar()
+    stats = limitador.stats()
+    assert (stats["active"], stats["admitted"], stats["rejected"]) == (1, 2, 1)
+
+
+def test_limitador_agota_la_espera():
+    limitador = api.Limitador("prueba", limite=1, cola=1, espera=0.05)
+    limitador.entrar()
+    with pytest.raises(api.Saturado):
+        limitador.entrar()
+    assert limitador.stats()["timeouts"] == 1
+    assert limitador.stats()["waiting"] == 0
+
+
+def test_limitador_despierta_al_que_espera():
+    limitador = api.Limitador("prueba", limite=1, cola=1, espera=5)
+    limitador.entrar()
+    entro = threading.Event()
+
+    def esperar():
+        limitador.entrar()
+        entro.set()
+
+    hilo = threading.Thread(target=esperar)
+    hilo.start()
+    assert not entro.wait(0.05)
+    limitador.salir()
+    assert entro.wait(2)
+    hilo.join()
+    assert limitador.stats()["active"] == 1
+
+
+# IndiceTexto
+
+def indice_texto():
+    indice = api.IndiceTexto(("country", "state", "city"), ("country", "state"))
+    indice.agregar(0, 1, "Colombia", None, None)
+    indice.agregar(1, 2, "Bogotá D.C.", "Colombia", None)
+    indice.agregar(2, 3, "Bogotá", "Colombia", "Bogotá D.C.")
+    indice.agregar(2, 4, "Santa Fe de Bogotá", "Colombia", "Cundinamarca")
+    indice.agregar(2, 5, "Bogor", "Indonesia", "West Java")
+    indice.construir()
+    return indice
+
+
+def test_indice_texto_ordena_exacta_prefijo_palabras():
+    filas = indice_texto().buscar("BOGOTA", limite=10)
+    assert [(f["id"], f["coincidencia"]) for f in filas[:3]] == [(3, "exacta"), (2, "prefijo"), (4, "palabras")]
+    assert filas[0]["country"] == "Colombia"
+
+
+def test_indice_texto_filtra_por_tipo():
+    assert [f["id"] for f in indice_texto().buscar("bog", tipo=1)] == [2]
+
+
+def test_indice_texto_encuentra_parecidos():
+    filas = indice_texto().buscar("bogta")
+    assert filas and all(f["coincidencia"] == "similar" for f in filas)
+    assert filas[0]["id"] in (2, 3)
+    assert filas[0]["similitud"] >= api.SIMILITUD_MIN
+
+
+def test_indice_texto_consulta_vacia():
+    assert indice_texto().buscar(" .. ") == []
+
+
+# HistorialPrecios
+
+def intervalo(historial_id, precio, inicio, fin):
+    return {
+        "historial_id": historial_id, "precio": precio,
+        "fecha_inicio": date.fromisoformat(inicio), "fecha_fin": date.fromisoformat(fin) if fin else None,
+    }
+
+
+def precio(historial, dia):
+    return historial.precio(date.fromisoformat(dia).toordinal())
+
+
+def test_historial_solapado_gana_el_que_empieza_despues():
+    historial = api.HistorialPrecios(4, [
+        intervalo(1, 100, "2024-01-01", "2024-12-31"),
+        intervalo(2, 120, "2024-06-01", "2024-06-30"),
+    ])
+    assert precio(historial, "2024-05-31") == (100, 1)
+    assert precio(historial, "2024-06-15") == (120, 2)
+    assert precio(historial, "2024-07-01") == (100, 1)
+    assert [a["tipo"] for a in historial.anomalias] == ["solapamiento"]
+
+
+def test_historial_huecos_y_fechas_invertidas():
+    historial = api.HistorialPrecios(4, [
+        intervalo(1, 100, "2024-01-01", "2024-01-31"),
+        intervalo(2, 110, "2024-03-01", None),
+        intervalo(3, 999, "2024-05-01", "2024-04-01"),
+    ])
+    assert precio(historial, "2023-12-31") is None
+    assert precio(historial, "2024-02-15") is None
+    assert precio(historial, "2030-01-01") == (110, 2)
+    tipos = sorted(a["tipo"] for a in historial.anomalias)
+    assert tipos == ["fin_antes_de_inicio", "hueco"]
+    hueco = next(a for a in historial.anomalias if a["tipo"] == "hueco")
+    assert (hueco["desde"], hueco["hasta"]) == ("2024-02-01", "2024-02-29")
+
+
+def test_historial_a_igual_inicio_gana_el_mayor_id():
+    historial = api.HistorialPrecios(4, [
+        intervalo(7, 100, "2024-01-01", None),
+        intervalo(3, 90, "2024-01-01", None),
+    ])
+    assert precio(historial, "2024-02-01") == (100, 7)
+    # Los tramos contiguos del mismo intervalo quedan en un solo segmento
+    assert len(historial.inicios) == 1
+
+
+# Fusión de intervalos de experiencia
+
+def test_meses_colapsados_no_cuenta_dos_veces_los_solapes():
+    d = date.fromisoformat
+    rangos = [
+        (d("2020-01-01"), d("2020-12-31")),
+        (d("2020-06-01"), d("2021-06-01")),
+        (d("2022-01-15"), d("2022-03-15")),
+    ]
+    assert api.meses_colapsados(rangos) == api.meses_entre(d("2020-01-01"), d("2021-06-01")) + 2
+    assert api.meses_colapsados([]) == 0
+
+
+def test_meses_entre_como_timestampdiff():
+    d = date.fromisoformat
+    assert api.meses_entre(d("2020-01-31"), d("2020-02-29")) == 0
+    assert api.meses_entre(d("2020-01-15"), d("2020-03-15")) == 2
+
+
+# _redactar
+
+def test_redactar_oculta_documentos():
+    assert api._redactar(["CC1001", "1020304050", "Colombia", 5]) == ["<redactado>", "<redactado>", "Colombia", 5]
+
+
+def test_redactar_oculta_los_documentos_de_la_peticion():
+    with api.app.test_request_context(
+        "/hoja_vida/reporte_tiempo_experiencia/batch", method="POST", json={"documentos": ["pasaporte-x"]}
+    ):
+        assert api._redactar(["pasaporte-x", "otro"]) == ["<redactado>", "otro"]
+    with api.app.test_request_context("/x", method="POST", json=["pasaporte-x"]):
+        assert api._redactar(["pasaporte-x"]) == ["pasaporte-x"]
+
+
+# parse_after
+
+def test_parse_after_con_comillas_y_partes():
+    assert api.parse_after('Colombia,"Bogotá, D.C.",Bogotá,7', {4}) == ["Colombia", "Bogotá, D.C.", "Bogotá", "7"]
+    assert api.parse_after("Colombia,Antioquia", {1, 4}) is None
+    assert api.parse_after("", {1}) is None
+
+
+def test_parse_after_ida_y_vuelta():
+    campos = ['Côte d"Ivoire', "a,b", "", "12"]
+    assert api.parse_after(api.format_after(campos), {4}) == campos
@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import api
+from conftest import requiere_base
+
+
+def post_bulk(cliente, **kwargs):
+    respuesta = cliente.post("/factura_db/facturas/bulk", **kwargs)
+    cuerpo = respuesta.get_data(as_text=True)
+    # Cerrar la respuesta libera el cupo del limitador de la ruta
+    respuesta.close()
+    return respuesta.status_code, cuerpo
+
+
+def test_cuerpo_que_no_es_objeto_es_400(cliente):
+    for cuerpo in ([1, 2], {"facturas": "x"}, {"otra": []}):
+        estado, _ = post_bulk(cliente, json=cuerpo)
+        assert estado == 400
+    estado, _ = post_bulk(cliente, data=b"no es json", content_type="application/json")
+    assert estado == 400
+
+
+def test_facturas_mal_formadas_dan_error_por_fila(cliente):
+    estado, cuerpo = post_bulk(
+        cliente, data=b'[1]\nno es json\n"texto"\n', content_type="application/x-ndjson"
+    )
+    assert estado == 200
+    filas = [api.app.json.loads(linea) for linea in cuerpo.splitlines()]
+    assert [f["indice"] for f in filas[:-1]] == [0, 1, 2]
+    assert not any(f["ok"] for f in filas[:-1])
+    resumen = filas[-1]["resumen"]
+    assert (resumen["recibidas"], resumen["rechazadas"], resumen["insertadas"]) == (3, 3, 0)
+
+
+@requiere_base("mariadb")
+def test_bulk_llega_a_los_rollups(cliente):
+    """Las facturas del bulk (con @api_escritura_masiva) igual entran a la cola de rollups"""
+    hoy = date.today()
+    clientes, err = api.query_mysql("SELECT cliente_id FROM cliente ORDER BY cliente_id LIMIT 1", (), "mariadb")
+    assert err is None
+    articulos, err = api.query_mysql(
+        "SELECT articulo_id FROM historial_precio WHERE fecha_inicio <= %s AND (fecha_fin IS NULL OR fecha_fin >= %s) "
+        "ORDER BY articulo_id LIMIT 2", (hoy, hoy), "mariadb",
+    )
+    assert err is None
+    if not clientes or not articulos:
+        pytest.skip("tienda sin clientes o sin precios vigentes hoy")
+
+    def ventas_de_hoy():
+        api.actualizar_rollups()
+        with api._rollups_lock:
+            api._rollups_estado["revisado"] = float("inf")
+        respuesta = cliente.get(f"/factura_db/ventas/dia?desde={hoy}&hasta={hoy}")
+        filas = respuesta.get_json()
+        respuesta.close()
+        assert respuesta.status_code == 200
+        return filas[0] if filas else {"facturas": 0, "lineas": 0, "unidades": 0, "ingresos": "0"}
+
+    antes = ventas_de_hoy()
+    facturas = [
+        {"cliente_id": clientes[0]["cliente_id"], "fecha": hoy.isoformat(),
+         "lineas": [{"articulo_id": a["articulo_id"], "cantidad": n + 1} for a in articulos]}
+        for n in range(5)
+    ]
+    estado, cuerpo = post_bulk(cliente, json={"facturas": facturas}, query_string={"lote": 2})
+    assert estado == 200
+    filas = [api.app.json.loads(linea) for linea in cuerpo.splitlines()]
+    assert all(f["ok"] for f in filas[:-1]), filas
+    total = sum(Decimal(str(f["total"])) for f in filas[:-1])
+
+    despues = ventas_de_hoy()
+    assert despues["facturas"] - antes["facturas"] == len(facturas)
+    assert despues["lineas"] - antes["lineas"] == len(facturas) * len(articulos)
+    assert Decimal(str(despues["ingresos"])) - Decimal(str(antes["ingresos"])) == total
+
+    reporte, err = api.verificar_rollups()
+    assert err is None
+    assert reporte["ok"], reporte["diferencias"]
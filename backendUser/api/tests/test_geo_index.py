@@ -0,0 +1,85 @@
+import pytest
+
+import api
+from conftest import requiere_base
+
+# (country_id, country, state_id, state, city_id, city): dos países que solo
+# difieren en mayúsculas, con estados y ciudades que se intercalan entre ellos
+FILAS = [
+    (1, "Atlantis", 10, "Norte", 100, "Aguas"),
+    (1, "Atlantis", 10, "Norte", 101, "Puerto"),
+    (1, "Atlantis", 11, "Sur", 102, "Aguas"),
+    (2, "ATLANTIS", 20, "Centro", 200, "Puerto"),
+    (2, "ATLANTIS", 21, "Norte", 201, "Bahia"),
+    (3, "Lemuria", 30, "Este", 300, "Aguas"),
+]
+
+
+def rangos(valores):
+    """Lo que calcula dense_rank() OVER (ORDER BY valor)"""
+    return {v: i for i, v in enumerate(sorted(set(valores)), 1)}
+
+
+def indice_de_prueba():
+    filas = sorted(FILAS, key=lambda f: (f[1], f[0], f[3], f[5]))
+    estado = rangos(f[3] for f in filas)
+    ciudad = rangos(f[5] for f in filas)
+    return api.GeoIndex.desde_filas(f + (estado[f[3]], ciudad[f[5]]) for f in filas)
+
+
+def consulta_por_pais(country_name):
+    """Lo que responde la consulta: WHERE c.name ILIKE %s ORDER BY s.name, ci.name"""
+    filas = [f for f in FILAS if f[1].lower() == country_name.lower()]
+    return [{"country": f[1], "state": f[3], "city": f[5]} for f in sorted(filas, key=lambda f: (f[3], f[5]))]
+
+
+def consulta_repetidas(country_name):
+    """Lo que responde la consulta: ciudades repetidas entre los países que coinciden, ORDER BY ci.name, s.name"""
+    filas = [f for f in FILAS if f[1].lower() == country_name.lower()]
+    nombres = [f[5] for f in filas]
+    filas = [f for f in filas if nombres.count(f[5]) > 1]
+    return [{"country": f[1], "state": f[3], "city": f[5]} for f in sorted(filas, key=lambda f: (f[5], f[3]))]
+
+
+@pytest.mark.parametrize("pais", ["atlantis", "ATLANTIS", "Lemuria", "lemuria", " lemuria", "Mu"])
+def test_indice_responde_como_la_consulta(pais):
+    indice = indice_de_prueba()
+    assert indice.por_pais(pais) == consulta_por_pais(pais)
+    assert indice.repetidas_pais(pais) == consulta_repetidas(pais)
+
+
+@pytest.mark.parametrize("pais", ["Atl%", "Atlanti_", "Atlántida"])
+def test_comodines_y_no_ascii_van_a_postgres(pais):
+    indice = indice_de_prueba()
+    assert indice.por_pais(pais) is None
+    assert indice.repetidas_pais(pais) is None
+
+
+@requiere_base("postgres")
+def test_indice_y_postgres_responden_igual(cliente, monkeypatch):
+    filas, err = api.postgres_all("SELECT name FROM countries ORDER BY id LIMIT 3")
+    assert err is None
+    nombres = [f["name"] for f in filas if f["name"].isascii()]
+    nombres += [n.upper() for n in nombres] + [f" {nombres[0]}" if nombres else " x", "No existe"]
+    indice = api.GeoIndex.load()
+
+    def respuestas(con_indice):
+        monkeypatch.setattr(api, "GEO_INDEX_MODE", "lazy" if con_indice else "off")
+        monkeypatch.setattr(api, "_geo_index", indice if con_indice else None)
+        api.mundo_cache.invalidate()
+        resultado = {}
+        for nombre in nombres:
+            for ruta in ("obtenerPaisesEstadosCiudades", "listarCiudadesRepetidasPais"):
+                respuesta = cliente.get(f"/mundo/{ruta}/{nombre}")
+                assert respuesta.status_code == 200
+                resultado[ruta, nombre] = respuesta.get_json()
+                respuesta.close()
+        return resultado
+
+    sql, memoria = respuestas(False), respuestas(True)
+    for clave in sql:
+        ruta = clave[0]
+        orden = ("state", "city") if ruta == "obtenerPaisesEstadosCiudades" else ("city", "state")
+        # Las filas con el mismo (estado, ciudad) pueden salir en cualquier orden
+        assert [tuple(f[c] for c in orden) for f in memoria[clave]] == [tuple(f[c] for c in orden) for f in sql[clave]]
+        assert sorted(map(repr, memoria[clave])) == sorted(map(repr, sql[clave]))
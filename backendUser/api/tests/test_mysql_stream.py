@@ -0,0 +1,78 @@
+"""mysql_stream con un pool de conexiones falsas (sin base de datos)"""
+import pytest
+
+import api
+
+
+class CursorFalso:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.with_rows = True
+        self.rowcount = -1
+        self.cerrado = False
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchmany(self, n):
+        lote, self.filas = self.filas[:n], self.filas[n:]
+        return lote
+
+    def close(self):
+        self.cerrado = True
+
+
+class ConexionFalsa:
+    def __init__(self, filas):
+        self.filas = filas
+        self.rollbacks = 0
+        self.cerrada = False
+        self.cursores = []
+
+    def cursor(self, **kwargs):
+        self.cursores.append(CursorFalso(self.filas))
+        return self.cursores[-1]
+
+    def rollback(self):
+        # El rollback de mysql-connector descarga antes el resultado sin leer
+        self.rollbacks += 1
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    conexiones = []
+
+    def conectar():
+        conexiones.append(ConexionFalsa([{"n": i} for i in range(10)]))
+        return conexiones[-1]
+
+    pool = api.ConnectionPool("mariadb", conectar, lambda conn: not conn.cerrada, size=1, max_overflow=0)
+    monkeypatch.setattr(api, "mariadb_pool", pool)
+    monkeypatch.setattr(api, "STREAM_ITERSIZE", 3)
+    pool.conexiones = conexiones
+    return pool
+
+
+def test_stream_completo_devuelve_la_conexion(pool):
+    assert [f["n"] for f in api.mysql_stream("SELECT n", database="mariadb")] == list(range(10))
+    conn = pool.conexiones[0]
+    assert not conn.cerrada and conn.cursores[0].cerrado
+    assert pool.stats()["idle"] == 1
+
+
+def test_cliente_que_corta_cierra_la_conexion_sin_descargarla(pool):
+    filas = api.mysql_stream("SELECT n", database="mariadb")
+    assert [next(filas)["n"] for _ in range(4)] == [0, 1, 2, 3]
+    filas.close()
+    conn = pool.conexiones[0]
+    assert conn.cerrada
+    assert conn.rollbacks == 0
+    stats = pool.stats()
+    assert (stats["open"], stats["in_use"], stats["idle"]) == (0, 0, 0)
+
+    # La siguiente petición abre una conexión nueva
+    assert len(list(api.mysql_stream("SELECT n", database="mariadb"))) == 10
+    assert len(pool.conexiones) == 2
@@ -0,0 +1,62 @@
+"""Planes de consulta: las sentencias de cada ruta pasan por EXPLAIN (ver plan_audit.py)
+
+La auditoría completa necesita las tres bases sembradas; las pruebas de la
+forma del reporte no tocan ninguna base.
+"""
+import pytest
+
+import api
+import plan_audit
+from conftest import base_disponible
+
+MIN_FILAS = 1000
+
+
+@pytest.fixture
+def sin_indices(monkeypatch):
+    """Sin índices en memoria las rutas emiten su SQL; los observadores se quitan al terminar"""
+    for modo in ("GEO_INDEX_MODE", "PRECIOS_INDEX_MODE", "BUSQUEDA_INDEX_MODE"):
+        monkeypatch.setattr(api, modo, "off")
+    monkeypatch.setattr(api, "_geo_index", None)
+    monkeypatch.setattr(api, "_indice_precios", None)
+    monkeypatch.setattr(api, "_observadores_sql", list(api._observadores_sql))
+    api.mundo_cache.invalidate()
+
+
+def test_todas_las_rutas_tienen_muestra():
+    _, sin_muestra = plan_audit.rutas()
+    assert sin_muestra == []
+
+
+def test_observar_sql_recibe_las_sentencias(sin_indices):
+    vistas = []
+    api.observar_sql(lambda backend, sql, params: vistas.append((backend, sql, params)))
+    api.notificar_sql("mariadb", "SELECT 1", (5,))
+    assert vistas == [("mariadb", "SELECT 1", (5,))]
+
+
+def test_explain_marca_recorridos_y_ordenamientos(monkeypatch):
+    filas = [
+        {"table": "factura", "type": "ALL", "rows": 50000, "Extra": "Using filesort"},
+        {"table": "cliente", "type": "eq_ref", "rows": 1, "Extra": ""},
+        {"table": "articulo", "type": "ALL", "rows": 10, "Extra": ""},
+    ]
+    monkeypatch.setattr(api, "query_mysql", lambda sql, params, database: (filas, None))
+    _, hallazgos = plan_audit.explicar_mysql({"backend": "mariadb", "sql": "SELECT 1", "params": []}, False, MIN_FILAS)
+    assert hallazgos == ["recorrido completo de factura (~50000 filas)", "filesort en factura (~50000 filas)"]
+
+
+@pytest.mark.skipif(
+    not all(base_disponible(b) for b in ("mysql", "mariadb", "postgres")),
+    reason="la auditoría necesita mysql, mariadb y postgres",
+)
+def test_planes_sin_hallazgos_nuevos(sin_indices):
+    resultados, sin_muestra = plan_audit.auditar(analyze=False, min_rows=MIN_FILAS)
+    assert sin_muestra == []
+    assert resultados, "no se capturó ninguna sentencia"
+    fallas = [
+        f"{r['backend']} {r['endpoint']} ({r['variante']}): {'; '.join(r['hallazgos'])}"
+        for r in resultados
+        if r["hallazgos"] and not r.get("omitida") and not r.get("permitido")
+    ]
+    assert fallas == []
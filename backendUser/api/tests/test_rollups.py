@@ -0,0 +1,79 @@
+import pytest
+
+import api
+from conftest import requiere_base
+
+
+def escribir(*sentencias):
+    """Ejecuta cada (sql, params) en su propia transacción; devuelve el lastrowid de la última"""
+    with api.get_mariadb_connection() as conn:
+        cursor = conn.cursor()
+        for sql, params in sentencias:
+            cursor.execute(sql, params)
+            conn.commit()
+        ultimo = cursor.lastrowid
+        cursor.close()
+    return ultimo
+
+
+def al_dia_y_consistente():
+    _, err = api.actualizar_rollups()
+    assert err is None
+    reporte, err = api.verificar_rollups()
+    assert err is None
+    assert reporte["ok"], reporte["diferencias"]
+    assert reporte["pendientes"] == 0
+
+
+def ventas_del_dia(dia):
+    filas, err = api.query_mysql("SELECT facturas, lineas, unidades FROM ventas_dia WHERE dia = %s", (dia,), "mariadb")
+    assert err is None
+    return tuple(filas[0].values()) if filas else (0, 0, 0)
+
+
+@requiere_base("mariadb")
+def test_cambios_en_lineas_y_facturas_llegan_a_los_rollups():
+    """Líneas agregadas en otra transacción, editadas y borradas, y facturas que cambian de día"""
+    filas, err = api.query_mysql(
+        "SELECT (SELECT cliente_id FROM cliente ORDER BY cliente_id LIMIT 1) AS cliente_id, "
+        "(SELECT articulo_id FROM articulo ORDER BY articulo_id LIMIT 1) AS articulo_id", (), "mariadb",
+    )
+    assert err is None
+    cliente_id, articulo_id = filas[0]["cliente_id"], filas[0]["articulo_id"]
+    if cliente_id is None or articulo_id is None:
+        pytest.skip("tienda sin clientes o sin artículos")
+    # Días sin otras ventas, para que los totales del día sean solo los de la prueba
+    dia, otro_dia = "1901-01-01", "1901-02-01"
+    escribir(
+        ("DELETE d FROM detalle_factura d JOIN factura f ON f.factura_id = d.factura_id "
+         "WHERE DATE(f.fecha_factura) IN (%s, %s)", (dia, otro_dia)),
+        ("DELETE FROM factura WHERE DATE(fecha_factura) IN (%s, %s)", (dia, otro_dia)),
+    )
+    al_dia_y_consistente()
+
+    factura_id = escribir(("INSERT INTO factura (cliente_id, fecha_factura, total) VALUES (%s, %s, 0)", (cliente_id, dia)))
+    al_dia_y_consistente()
+    assert ventas_del_dia(dia) == (1, 0, 0)
+
+    detalle_id = escribir((
+        "INSERT INTO detalle_factura (factura_id, articulo_id, cantidad, precio_unitario, subtotal) "
+        "VALUES (%s, %s, 2, 10, 20)", (factura_id, articulo_id),
+    ))
+    al_dia_y_consistente()
+    assert ventas_del_dia(dia) == (1, 1, 2)
+
+    escribir(("UPDATE detalle_factura SET cantidad = 5, subtotal = 50 WHERE detalle_id = %s", (detalle_id,)))
+    al_dia_y_consistente()
+    assert ventas_del_dia(dia) == (1, 1, 5)
+
+    escribir(("UPDATE factura SET fecha_factura = %s WHERE factura_id = %s", (otro_dia, factura_id)))
+    al_dia_y_consistente()
+    assert ventas_del_dia(dia) == (0, 0, 0)
+    assert ventas_del_dia(otro_dia) == (1, 1, 5)
+
+    escribir(
+        ("DELETE FROM detalle_factura WHERE detalle_id = %s", (detalle_id,)),
+        ("DELETE FROM factura WHERE factura_id = %s", (factura_id,)),
+    )
+    al_dia_y_consistente()
+    assert ventas_del_dia(otro_dia) == (0, 0, 0)
@@ -0,0 +1,44 @@
+import threading
+
+import api
+from conftest import requiere_base
+
+
+def test_versiones_lanzan_un_plegado_por_intervalo(monkeypatch):
+    lanzados = []
+    termino = threading.Event()
+
+    def plegar(database):
+        lanzados.append(database)
+        termino.set()
+        return 0, None
+
+    monkeypatch.setattr(api, "query_mysql", lambda sql, params, database: ([{"tabla": "cliente", "version": 7}], None))
+    monkeypatch.setattr(api, "plegar_versiones", plegar)
+    monkeypatch.setattr(api, "VERSIONES_TTL", 0)
+    monkeypatch.setattr(api, "_versiones", {})
+    monkeypatch.setattr(api, "_plegado", {"siguiente": {}, "en_curso": set()})
+
+    assert api.versiones_tablas("mariadb") == {"cliente": "7"}
+    assert termino.wait(2)
+    assert api.versiones_tablas("mariadb") == {"cliente": "7"}
+    assert lanzados == ["mariadb"]
+
+
+@requiere_base("mariadb")
+def test_plegar_no_cambia_las_versiones(monkeypatch):
+    # Sin plegados en segundo plano que se repartan el registro con el de la prueba
+    monkeypatch.setattr(api, "_plegado", {"siguiente": {"mariadb": float("inf")}, "en_curso": set()})
+    with api.get_mariadb_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO version_cambios (tabla) VALUES ('cliente'), ('cliente')")
+        conn.commit()
+        cursor.close()
+    api._versiones.clear()
+    antes = api.versiones_tablas("mariadb")
+
+    plegados, err = api.plegar_versiones("mariadb")
+    assert err is None
+    assert plegados >= 2
+    api._versiones.clear()
+    assert api.versiones_tablas("mariadb")["cliente"] == antes["cliente"]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Facturas por segundo de POST /factura_db/facturas/bulk.
+
+Genera facturas sintéticas con clientes y artículos existentes y las envía en
+NDJSON con cada tamaño de lote, reportando facturas/s y líneas/s. Inserta
+datos de verdad: correr contra una base de pruebas. Ejemplo:
+
+    python3 bench_facturas_bulk.py --api http://localhost:4000 --facturas 20000 --lotes 100,500,2000
+"""
+import argparse
+import json
+import random
+import time
+
+import requests
+
+
+def facturas_sinteticas(cantidad, clientes, articulos, lineas_max, fecha, semilla):
+    azar = random.Random(semilla)
+    for i in range(cantidad):
+        yield {
+            "ref": f"bench-{i}",
+            "cliente_id": azar.choice(clientes),
+            "fecha": fecha,
+            "lineas": [
+                {"articulo_id": azar.choice(articulos), "cantidad": azar.randint(1, 5)}
+                for _ in range(azar.randint(1, lineas_max))
+            ],
+        }
+
+
+def cuerpo_ndjson(facturas):
+    for factura in facturas:
+        yield (json.dumps(factura) + "\n").encode()
+
+
+def enviar(base, facturas, lote, token):
+    """(segundos, resumen) de una petición bulk"""
+    headers = {"Content-Type": "application/x-ndjson"}
+    if token:
+        headers["X-Admin-Token"] = token
+    inicio = time.perf_counter()
+    resumen, errores = None, {}
+    with requests.post(f"{base}/factura_db/facturas/bulk", params={"lote": lote},
+                       data=cuerpo_ndjson(facturas), headers=headers, stream=True, timeout=3600) as r:
+        r.raise_for_status()
+        for linea in r.iter_lines():
+            fila = json.loads(linea)
+            if "resumen" in fila:
+                resumen = fila["resumen"]
+            elif not fila.get("ok"):
+                errores[fila.get("error")] = errores.get(fila.get("error"), 0) + 1
+    return time.perf_counter() - inicio, resumen, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento de la carga masiva de facturas")
+    parser.add_argument("--api", default="http://localhost:4000")
+    parser.add_argument("--facturas", type=int, default=5000, help="facturas por corrida")
+    parser.add_argument("--lotes", default="100,500,2000", help="tamaños de lote a probar")
+    parser.add_argument("--lineas", type=int, default=5, help="máximo de líneas por factura")
+    parser.add_argument("--clientes", default="1,2,3,4,5", help="ids de cliente existentes")
+    parser.add_argument("--articulos", default="1,2,3,4,5", help="ids de artículo con precio vigente")
+    parser.add_argument("--fecha", default="2024-07-01T12:00:00")
+    parser.add_argument("--token", default="", help="X-Admin-Token")
+    args = parser.parse_args()
+
+    clientes = [int(c) for c in args.clientes.split(",")]
+    articulos = [int(a) for a in args.articulos.split(",")]
+
+    print(f"{'lote':>6} {'facturas':>9} {'rechazadas':>11} {'s':>8} {'facturas/s':>11} {'líneas/s':>10}")
+    for lote in (int(n) for n in args.lotes.split(",")):
+        facturas = list(facturas_sinteticas(args.facturas, clientes, articulos, args.lineas, args.fecha, lote))
+        lineas = sum(len(f["lineas"]) for f in facturas)
+        segundos, resumen, errores = enviar(args.api, facturas, lote, args.token)
+        insertadas = resumen["insertadas"] if resumen else 0
+        print(f"{lote:>6} {insertadas:>9,} {(resumen or {}).get('rechazadas', '?'):>11} {segundos:>8.2f} "
+              f"{insertadas / segundos:>11,.0f} {lineas * insertadas / len(facturas) / segundos:>10,.0f}")
+        for error, veces in list(errores.items())[:3]:
+            print(f"         {veces} x {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compara el reporte de experiencia: procedimiento SQL (uno por documento) vs batch en Python.
+
+Usa la misma configuración de la API (variables MYSQL_*). Ejemplo:
+    MYSQL_HOST=127.0.0.1 MYSQL_PORT=4001 python3 bench_reporte_experiencia.py --documentos 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from itertools import groupby
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+import api  # noqa: E402
+
+
+def documentos_muestra(cantidad):
+    rows, err = api.query_mysql(
+        "SELECT numero_documento FROM persona ORDER BY persona_id LIMIT %s", (cantidad,)
+    )
+    if err:
+        sys.exit(f"Error leyendo personas: {err}")
+    return [r["numero_documento"] for r in rows]
+
+
+def ruta_sql(documentos):
+    """Un CALL al procedimiento por documento (lo que hace el endpoint individual)"""
+    resultados = {}
+    for documento in documentos:
+        conjuntos, err = api.callproc_mysql("reporte_tiempo_experiencia", (documento,))
+        if err:
+            sys.exit(f"Error en el procedimiento: {err}")
+        resultados[documento] = [
+            api.formatear_reporte(r["ocupacion"], r["total_meses_calculados"]) for r in conjuntos[0]
+        ]
+    return resultados
+
+
+def ruta_python(documentos):
+    """Una consulta para todos los documentos y el barrido en Python"""
+    marcadores = ", ".join(["%s"] * len(documentos))
+    sql = f"""
+    SELECT p.numero_documento, e.sector, e.empresa, e.cargo_contrato,
+           e.fecha_ingreso, e.fecha_retiro, e.es_actual
+    FROM persona p
+    LEFT JOIN experiencia_laboral e ON e.persona_id = p.persona_id
+    WHERE p.numero_documento IN ({marcadores})
+    ORDER BY p.numero_documento
+    """
+    hoy = date.today()
+    return {
+        documento: api.reporte_experiencia(grupo, hoy)
+        for documento, grupo in groupby(api.mysql_stream(sql, documentos), key=lambda f: f["numero_documento"])
+    }
+
+
+def medir(funcion, documentos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(documentos)
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documentos", type=int, default=200, help="cantidad de personas a comparar")
+    parser.add_argument("--repeticiones", type=int, default=3, help="se reporta el mejor tiempo")
+    args = parser.parse_args()
+
+    documentos = documentos_muestra(args.documentos)
+    if not documentos:
+        sys.exit("No hay personas cargadas")
+
+    sql, t_sql = medir(ruta_sql, documentos, args.repeticiones)
+    py, t_py = medir(ruta_python, documentos, args.repeticiones)
+
+    diferencias = [d for d in documentos if sql.get(d) != py.get(d)]
+    print(f"Documentos:        {len(documentos)}")
+    print(f"SQL (CALL por doc): {t_sql * 1000:9.1f} ms  ({len(documentos) / t_sql:,.0f} docs/s)")
+    print(f"Python batch:       {t_py * 1000:9.1f} ms  ({len(documentos) / t_py:,.0f} docs/s)")
+    print(f"Aceleración:        {t_sql / t_py:.1f}x")
+    print(f"Diferencias:        {len(diferencias)}")
+    for documento in diferencias[:10]:
+        print(f"  {documento}:\n    sql={sql.get(documento)}\n    py ={py.get(documento)}")
+    sys.exit(1 if diferencias else 0)
+
+
+if __name__ == "__main__":
+    main()
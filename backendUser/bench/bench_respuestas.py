@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Bytes en el cable y tiempo de codificación de las respuestas grandes de la API.
+
+Contra una API en marcha, pide cada endpoint en cada formato (json, columns)
+y con cada Accept-Encoding, y reporta bytes recibidos y tiempo total. Luego,
+con las filas ya descargadas, mide localmente el costo de serializar con el
+JSON estándar de Flask vs orjson y el de cada compresor. Ejemplo:
+
+    python3 bench_respuestas.py --api http://localhost:4000 --limit 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+import api  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+ENDPOINTS = [
+    "/mundo/obtenerPaisesEstadosCiudades",
+    "/hoja_vida/tablas_persona/persona",
+    "/hoja_vida/tablas_persona/experiencia_laboral",
+    "/factura_db/tabla_productos/detalle_factura",
+]
+
+
+def medir(funcion, repeticiones=3):
+    """Mejor tiempo (ms) de varias repeticiones y el último resultado"""
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, resultado
+
+
+def cable(base, endpoint, limit):
+    """(formato, encoding, bytes, ms) pidiendo el endpoint por HTTP"""
+    filas = []
+    for formato in ("json", "columns"):
+        for encoding in ["identity", *api.CODIFICACIONES]:
+            params = {"format": formato}
+            if limit:
+                params["limit"] = limit
+            inicio = time.perf_counter()
+            with requests.get(base + endpoint, params=params, stream=True,
+                              headers={"Accept-Encoding": encoding}, timeout=300) as r:
+                r.raise_for_status()
+                recibidos = sum(len(b) for b in r.raw.stream(64 * 1024, decode_content=False))
+                servida = r.headers.get("Content-Encoding", "identity")
+            ms = (time.perf_counter() - inicio) * 1000
+            filas.append((formato, servida, recibidos, ms))
+    return filas
+
+
+def codificacion(filas):
+    """(encoder, ms, bytes) serializando las filas como arreglo y como columnas"""
+    estandar = DefaultJSONProvider(api.app)
+    rapido = api.JSONProviderRapido(api.app) if api.orjson else None
+    columnas = {clave: [f[clave] for f in filas] for clave in (filas[0] if filas else {})}
+    resultados = []
+    for nombre, proveedor in (("flask", estandar), ("orjson", rapido)):
+        if proveedor is None:
+            continue
+        ms, cuerpo = medir(lambda: "[" + ",".join(proveedor.dumps(f) for f in filas) + "]")
+        resultados.append((f"{nombre} json", ms, len(cuerpo.encode())))
+        ms, cuerpo = medir(lambda: proveedor.dumps(columnas))
+        resultados.append((f"{nombre} columns", ms, len(cuerpo.encode())))
+    return resultados
+
+
+def compresion(datos):
+    """(codificación, ms, bytes) comprimiendo el cuerpo completo"""
+    resultados = []
+    for codigo in api.CODIFICACIONES:
+        def comprimir():
+            compresor = api.Compresor(codigo)
+            return compresor.comprimir(datos) + compresor.terminar()
+        ms, salida = medir(comprimir)
+        resultados.append((codigo, ms, len(salida)))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamaño y costo de codificación de las respuestas")
+    parser.add_argument("--api", default="http://localhost:4000")
+    parser.add_argument("--limit", type=int, default=0, help="pide una página en vez del volcado completo")
+    parser.add_argument("--endpoint", action="append", help="endpoint a medir (repetible)")
+    args = parser.parse_args()
+
+    for endpoint in args.endpoint or ENDPOINTS:
+        print(f"\n== {endpoint}")
+        print(f"  {'formato':<8} {'encoding':<9} {'bytes':>12} {'ms':>9}")
+        for formato, encoding, recibidos, ms in cable(args.api, endpoint, args.limit):
+            print(f"  {formato:<8} {encoding:<9} {recibidos:>12,} {ms:>9.1f}")
+
+        params = {"limit": args.limit} if args.limit else {}
+        filas = requests.get(args.api + endpoint, params=params,
+                             headers={"Accept-Encoding": "gzip"}, timeout=300).json()
+        if not filas:
+            continue
+        print(f"  -- codificación local de {len(filas):,} filas")
+        for nombre, ms, tam in codificacion(filas):
+            print(f"  {nombre:<18} {tam:>12,} {ms:>9.1f}")
+        datos = json.dumps(filas, ensure_ascii=False, separators=(",", ":")).encode()
+        for nombre, ms, tam in compresion(datos):
+            print(f"  {nombre:<18} {tam:>12,} {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""Datos sintéticos a escala para hojaVida, tienda y mundo.
+
+Con la misma semilla y los mismos volúmenes genera exactamente las mismas
+filas, así dos corridas de harness.py sobre bases generadas igual son
+comparables. Las llaves se asignan en el cliente (a partir del MAX actual de
+cada tabla) y todo se escribe con INSERT multi-fila (MySQL/MariaDB) o COPY
+(Postgres) en lotes de --lote filas, con un commit por lote. Inserta datos de
+verdad: correr contra una base de pruebas. Ejemplos:
+
+    python3 generar_datos.py --personas 1000000 --experiencias 4
+    python3 generar_datos.py --solo tienda --articulos 20000 --historial 12 --facturas 2000000
+    python3 generar_datos.py --solo mundo --paises 250 --estados 40 --ciudades 60
+
+hojaVida necesita las ubicaciones cargadas (mysql/scripts.py). Las conexiones
+usan las mismas variables de entorno que api.py (MYSQL_HOST, MARIADB_HOST,
+DB_HOST, ...). Al terminar escribe un manifiesto JSON (--manifiesto) con los
+volúmenes y muestras de documentos, productos y países que harness.py usa
+para armar las peticiones.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+# Solo se usan las configuraciones: sin pools calientes ni índices
+os.environ["API_PREFORK"] = "1"
+
+import mysql.connector  # noqa: E402
+import psycopg2  # noqa: E402
+
+import api  # noqa: E402
+
+MUESTRAS_MAX = 500
+PREFIJO_DOCUMENTO = "BE"
+PREFIJO_CLIENTE = "BC"
+INICIO_PRECIOS = date(2020, 1, 1)
+
+SILABAS = ("ka", "lo", "mi", "ra", "te", "su", "an", "do", "ve", "ni", "pa", "li", "to", "ri", "sa", "me", "ul", "or")
+NOMBRES = ("Ana", "Luis", "María", "Carlos", "Laura", "Jorge", "Sofía", "Andrés", "Valentina", "Diego",
+           "Camila", "Juan", "Daniela", "Pedro", "Paula", "Felipe", "Natalia", "Santiago", "Isabel", "Miguel")
+APELLIDOS = ("Gómez", "Pérez", "López", "Rodríguez", "Martínez", "García", "Torres", "Ramírez", "Díaz",
+             "Moreno", "Vargas", "Castro", "Rojas", "Ortiz", "Herrera", "Suárez", "Muñoz", "Jiménez")
+IDIOMAS = ("Español", "Inglés", "Portugués", "Francés", "Alemán", "Italiano", "Mandarín")
+NIVELES = ("Regular", "Bien", "Muy Bien")
+MODALIDADES = ("TC", "TL", "TE", "UN", "ES", "MG", "DOC")
+ESTUDIOS = ("Ingeniería de Sistemas", "Administración", "Contaduría", "Derecho", "Medicina", "Diseño",
+            "Economía", "Psicología", "Redes", "Analítica de Datos")
+EMPRESAS = ("Tech Solutions", "Alcaldía Municipal", "Market Data", "Banco Central", "Consultores Asociados",
+            "Gobernación", "Independiente", "Freelance Studio", "Hospital Regional", "Universidad Pública")
+CARGOS = ("Analista", "Desarrollador", "Coordinador", "Auxiliar", "Gerente", "Contratista de servicios",
+          "Consultor independiente", "Profesional especializado")
+CATEGORIAS = ("Electrodoméstico", "Tecnología", "Hogar", "Deportes", "Juguetes", "Ropa", "Alimentos", "Libros")
+MARCAS = ("Samsung", "LG", "Whirlpool", "Apple", "Sony", "Lenovo", "Xiaomi", "Nike", "Adidas", "Genérica")
+
+
+def azar_de(semilla, seccion):
+    """Generador propio por sección: cambiar un volumen no altera las filas de las otras"""
+    return random.Random(f"{semilla}:{seccion}")
+
+
+def palabra(azar, silabas=(2, 4)):
+    return "".join(azar.choice(SILABAS) for _ in range(azar.randint(*silabas))).capitalize()
+
+
+def fecha_entre(azar, inicio, fin):
+    return inicio + timedelta(days=azar.randint(0, max((fin - inicio).days, 0)))
+
+
+def muestrear(azar, valores, n=MUESTRAS_MAX):
+    valores = list(valores)
+    return valores if len(valores) <= n else azar.sample(valores, n)
+
+
+class Avance:
+    """Filas escritas por tabla e impresión del avance en filas/s"""
+
+    def __init__(self):
+        self.filas = {}
+        self.segundos = {}
+
+    def sumar(self, tabla, filas, segundos):
+        self.filas[tabla] = self.filas.get(tabla, 0) + filas
+        self.segundos[tabla] = self.segundos.get(tabla, 0.0) + segundos
+
+    def imprimir(self, seccion, hechas, total, inicio):
+        velocidad = hechas / max(time.perf_counter() - inicio, 1e-9)
+        print(f"  {seccion}: {hechas:,}/{total:,} ({velocidad:,.0f}/s)", flush=True)
+
+    def resumen(self):
+        return {
+            tabla: {"filas": filas, "segundos": round(self.segundos[tabla], 2),
+                    "filas_s": round(filas / max(self.segundos[tabla], 1e-9))}
+            for tabla, filas in self.filas.items()
+        }
+
+
+def insertar(cursor, avance, tabla, columnas, filas):
+    """INSERT multi-fila (mysql-connector reescribe el executemany en una sola sentencia)"""
+    if not filas:
+        return
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})"
+    inicio = time.perf_counter()
+    cursor.executemany(sql, filas)
+    # Con @api_escritura_masiva los triggers no registran cada fila: un cambio de versión por lote
+    cursor.execute("INSERT INTO version_cambios (tabla) VALUES (%s)", (tabla,))
+    avance.sumar(tabla, len(filas), time.perf_counter() - inicio)
+
+
+def siguiente_id(cursor, tabla, pk):
+    cursor.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {tabla}")
+    return cursor.fetchone()[0] + 1
+
+
+def conectar_mysql(config):
+    conexion = mysql.connector.connect(**config)
+    conexion.autocommit = False
+    cursor = conexion.cursor()
+    # Las llaves las asigna el generador: no hace falta revisar FK ni unicidad fila por fila
+    cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    cursor.execute("SET @api_escritura_masiva = 1")
+    return conexion, cursor
+
+
+# =============================
+# hojaVida
+# =============================
+def generar_hoja_vida(args, avance):
+    azar = azar_de(args.semilla, "hoja_vida")
+    conexion, cursor = conectar_mysql(api.MYSQL_CONFIG)
+
+    cursor.execute("""
+        SELECT c.ciudad_id, c.estado_id, e.pais_id, p.nacionalidad, p.nombre, e.nombre, c.nombre
+        FROM ciudad c
+        JOIN estado e ON e.estado_id = c.estado_id
+        JOIN pais p ON p.pais_id = e.pais_id
+        ORDER BY c.ciudad_id
+    """)
+    ubicaciones = cursor.fetchall()
+    if not ubicaciones:
+        raise SystemExit("hojaVida no tiene ubicaciones: cargar primero mysql/scripts.py")
+
+    cursor.executemany(
+        "INSERT INTO distrito_militar (nombre) VALUES (%s) ON DUPLICATE KEY UPDATE nombre = VALUES(nombre)",
+        [(f"DM-{i:02d}",) for i in range(1, 21)],
+    )
+    cursor.execute("INSERT INTO version_cambios (tabla) VALUES ('distrito_militar')")
+    cursor.execute("SELECT distrito_id FROM distrito_militar ORDER BY distrito_id")
+    distritos = [r[0] for r in cursor.fetchall()]
+    conexion.commit()
+
+    persona_id = siguiente_id(cursor, "persona", "persona_id")
+    primer_id = persona_id
+    hoy = date.today()
+    inicio = time.perf_counter()
+
+    for desde in range(0, args.personas, args.lote):
+        personas, libretas, idiomas, basicas, superiores, experiencias = [], [], [], [], [], []
+        for _ in range(min(args.lote, args.personas - desde)):
+            documento = f"{PREFIJO_DOCUMENTO}{persona_id:09d}"
+            nac = azar.choice(ubicaciones)
+            res = azar.choice(ubicaciones) if azar.random() < 0.3 else nac
+            sexo = azar.choice("MF")
+            nacimiento = fecha_entre(azar, date(1950, 1, 1), date(2004, 12, 31))
+            nombres = azar.choice(NOMBRES)
+            apellido = azar.choice(APELLIDOS)
+            personas.append((
+                persona_id, nombres, apellido, azar.choice(APELLIDOS), azar.choice(("CC", "CC", "CC", "CE", "PAS")),
+                documento, sexo, nac[3], nac[2], nac[1], nac[0], nacimiento,
+                f"Calle {azar.randint(1, 200)} #{azar.randint(1, 99)}-{azar.randint(1, 99)}",
+                res[2], res[1], res[0], f"3{azar.randint(100000000, 999999999)}",
+                f"{documento.lower()}@bench.test",
+            ))
+            if sexo == "M" and azar.random() < 0.6:
+                libretas.append((persona_id, azar.choice(("Primera", "Segunda")),
+                                 f"LM-{persona_id}", azar.choice(distritos)))
+            for idioma in azar.sample(IDIOMAS, azar.randint(1, 3)):
+                idiomas.append((persona_id, idioma, *(azar.choice(NIVELES) for _ in range(3))))
+            basicas.append((persona_id, 11, "Bachiller", nacimiento + timedelta(days=365 * 17)))
+            for _ in range(azar.choice((0, 1, 1, 1, 2))):
+                graduado = azar.random() < 0.7
+                superiores.append((
+                    persona_id, azar.choice(MODALIDADES), azar.choice(ESTUDIOS), azar.randint(1, 10), graduado,
+                    fecha_entre(azar, nacimiento + timedelta(days=365 * 20), hoy) if graduado else None,
+                    f"TARJ-{persona_id}" if graduado and azar.random() < 0.5 else None,
+                ))
+            ingreso = nacimiento + timedelta(days=365 * 18 + azar.randint(0, 365 * 6))
+            for i in range(azar.randint(0, 2 * args.experiencias)):
+                if ingreso >= hoy:
+                    break
+                actual = azar.random() < 0.15
+                retiro = None if actual else min(ingreso + timedelta(days=azar.randint(60, 365 * 6)), hoy)
+                lugar = azar.choice((res, nac))
+                experiencias.append((
+                    persona_id, azar.choice(("PUBLICA", "PRIVADA", "PRIVADA")), azar.choice(EMPRESAS),
+                    lugar[4], lugar[5], lugar[6], f"rrhh{i}@empresa.test", f"60{azar.randint(10000000, 99999999)}",
+                    ingreso, retiro, azar.choice(CARGOS), azar.choice(ESTUDIOS), "Cra 1 #2-3", actual,
+                ))
+                # Algunos periodos se solapan con el anterior (el reporte los colapsa)
+                ingreso = (retiro or hoy) + timedelta(days=azar.randint(-90, 240))
+            persona_id += 1
+
+        insertar(cursor, avance, "persona", (
+            "persona_id", "nombres", "primer_apellido", "segundo_apellido", "tipo_documento", "numero_documento",
+            "sexo", "nacionalidad", "pais_nacimiento_id", "estado_nacimiento_id", "ciudad_nacimiento_id",
+            "fecha_nacimiento", "direccion", "pais_residencia_id", "estado_residencia_id", "ciudad_residencia_id",
+            "telefono", "email"), personas)
+        insertar(cursor, avance, "libreta_militar", ("persona_id", "clase", "numero", "distrito_id"), libretas)
+        insertar(cursor, avance, "idioma", ("persona_id", "nombre", "habla", "lee", "escribe"), idiomas)
+        insertar(cursor, avance, "educacion_basica",
+                 ("persona_id", "ultimo_grado_aprobado", "titulo_obtenido", "fecha_grado"), basicas)
+        insertar(cursor, avance, "educacion_superior", (
+            "persona_id", "modalidad", "nombre_estudio", "semestre_aprobado", "graduado",
+            "fecha_terminacion", "numero_tarjeta"), superiores)
+        insertar(cursor, avance, "experiencia_laboral", (
+            "persona_id", "sector", "empresa", "pais", "departamento", "municipio", "correo_entidad", "telefonos",
+            "fecha_ingreso", "fecha_retiro", "cargo_contrato", "dependencia", "direccion_entidad", "es_actual"),
+            experiencias)
+        conexion.commit()
+        avance.imprimir("personas", desde + len(personas), args.personas, inicio)
+
+    analizar_mysql(cursor, api.TABLAS_HOJA_VIDA)
+    cursor.close()
+    conexion.close()
+    return {
+        "personas": [primer_id, persona_id - 1],
+        "documentos": [f"{PREFIJO_DOCUMENTO}{i:09d}" for i in muestrear(azar, range(primer_id, persona_id))],
+    }
+
+
+# =============================
+# tienda
+# =============================
+def generar_tienda(args, avance):
+    azar = azar_de(args.semilla, "tienda")
+    conexion, cursor = conectar_mysql(api.MARIADB_CONFIG)
+    hoy = date.today()
+    inicio = time.perf_counter()
+
+    cliente_id = primer_cliente = siguiente_id(cursor, "cliente", "cliente_id")
+    for desde in range(0, args.clientes, args.lote):
+        filas = []
+        for _ in range(min(args.lote, args.clientes - desde)):
+            filas.append((
+                cliente_id, azar.choice(NOMBRES), azar.choice(APELLIDOS), f"{PREFIJO_CLIENTE}{cliente_id:09d}",
+                f"3{azar.randint(100000000, 999999999)}", f"cliente{cliente_id}@bench.test",
+                f"Carrera {azar.randint(1, 120)} #{azar.randint(1, 99)}-{azar.randint(1, 99)}",
+            ))
+            cliente_id += 1
+        insertar(cursor, avance, "cliente",
+                 ("cliente_id", "nombre", "apellido", "documento", "telefono", "correo", "direccion"), filas)
+        conexion.commit()
+    avance.imprimir("clientes", args.clientes, args.clientes, inicio)
+
+    # Artículos con historial de precios consecutivo (el último tramo queda abierto)
+    articulo_id = primer_articulo = siguiente_id(cursor, "articulo", "articulo_id")
+    precios = {}
+    nombres = []
+    for desde in range(0, args.articulos, args.lote):
+        articulos, historial = [], []
+        for _ in range(min(args.lote, args.articulos - desde)):
+            categoria, marca = azar.choice(CATEGORIAS), azar.choice(MARCAS)
+            nombre = f"{marca} {palabra(azar)} {articulo_id}"
+            nombres.append(nombre)
+            articulos.append((articulo_id, nombre, f"{categoria} {marca}", categoria, marca))
+            precio = azar.randint(20, 5000) * 1000
+            tramo = fecha_entre(azar, INICIO_PRECIOS, INICIO_PRECIOS + timedelta(days=180))
+            inicios, valores = [], []
+            for i in range(args.historial):
+                fin = tramo + timedelta(days=azar.randint(30, 150))
+                ultimo = i == args.historial - 1 or fin >= hoy
+                historial.append((articulo_id, precio, tramo, None if ultimo else fin))
+                inicios.append(tramo.toordinal())
+                valores.append(precio)
+                if ultimo:
+                    break
+                tramo = fin + timedelta(days=1)
+                precio = max(1000, int(round(precio * azar.uniform(0.85, 1.15), -2)))
+            precios[articulo_id] = (inicios, valores)
+            articulo_id += 1
+        insertar(cursor, avance, "articulo", ("articulo_id", "nombre", "descripcion", "categoria", "marca"), articulos)
+        insertar(cursor, avance, "historial_precio", ("articulo_id", "precio", "fecha_inicio", "fecha_fin"), historial)
+        conexion.commit()
+    avance.imprimir("artículos", args.articulos, args.articulos, inicio)
+
+    # Facturas con el precio vigente de cada artículo en la fecha de la factura
+    factura_id = primer_factura = siguiente_id(cursor, "factura", "factura_id")
+    clientes = range(primer_cliente, cliente_id)
+    articulos = range(primer_articulo, articulo_id)
+    if args.facturas and (not clientes or not articulos):
+        raise SystemExit("Las facturas necesitan --clientes y --articulos mayores que 0")
+    inicio_ventas = datetime.combine(INICIO_PRECIOS + timedelta(days=181), datetime.min.time())
+    segundos_ventas = int((datetime.now() - inicio_ventas).total_seconds())
+    for desde in range(0, args.facturas, args.lote):
+        facturas, detalles = [], []
+        for _ in range(min(args.lote, args.facturas - desde)):
+            fecha = inicio_ventas + timedelta(seconds=azar.randint(0, segundos_ventas))
+            total = 0
+            for articulo in azar.sample(articulos, min(azar.randint(1, args.lineas), len(articulos))):
+                inicios, valores = precios[articulo]
+                precio = valores[max(bisect_right(inicios, fecha.date().toordinal()) - 1, 0)]
+                cantidad = azar.randint(1, 5)
+                detalles.append((factura_id, articulo, cantidad, precio, precio * cantidad))
+                total += precio * cantidad
+            facturas.append((factura_id, azar.choice(clientes), fecha, total))
+            factura_id += 1
+        insertar(cursor, avance, "factura", ("factura_id", "cliente_id", "fecha_factura", "total"), facturas)
+        insertar(cursor, avance, "detalle_factura",
+                 ("factura_id", "articulo_id", "cantidad", "precio_unitario", "subtotal"), detalles)
+        conexion.commit()
+        avance.imprimir("facturas", desde + len(facturas), args.facturas, inicio)
+
+    analizar_mysql(cursor, api.TABLAS_TIENDA)
+    cursor.close()
+    conexion.close()
+    return {
+        "clientes": [primer_cliente, cliente_id - 1],
+        "articulos": [primer_articulo, articulo_id - 1],
+        "facturas": [primer_factura, factura_id - 1],
+        "productos": muestrear(azar, nombres),
+        "articulo_ids": muestrear(azar, articulos),
+        "ventas_desde": inicio_ventas.date().isoformat(),
+    }
+
+
+def analizar_mysql(cursor, tablas):
+    """Estadísticas al día para que los planes correspondan al volumen nuevo"""
+    for tabla in tablas:
+        cursor.execute(f"ANALYZE TABLE `{tabla}`")
+        cursor.fetchall()
+
+
+# =============================
+# mundo (Postgres)
+# =============================
+def columnas_obligatorias(cursor, tabla):
+    """Columnas NOT NULL sin valor por defecto: (nombre, tipo, largo máximo)"""
+    cursor.execute("""
+        SELECT column_name, data_type, character_maximum_length
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+          AND is_nullable = 'NO' AND column_default IS NULL
+        ORDER BY ordinal_position
+    """, (tabla,))
+    return cursor.fetchall()
+
+
+def relleno(tipo, largo):
+    """Valor neutro para una columna obligatoria que el generador no conoce"""
+    if tipo in ("character varying", "character", "text"):
+        return "XX"[:largo or 2]
+    if tipo in ("smallint", "integer", "bigint", "numeric", "real", "double precision"):
+        return 0
+    if tipo == "boolean":
+        return "f"
+    if tipo.startswith("timestamp") or tipo == "date":
+        return datetime.now().isoformat(sep=" ", timespec="seconds")
+    raise SystemExit(f"No sé rellenar una columna obligatoria de tipo {tipo}")
+
+
+def copiar(cursor, avance, tabla, columnas, filas):
+    """COPY FROM STDIN en CSV: la forma más rápida de cargar Postgres desde el cliente"""
+    if not filas:
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    buffer.seek(0)
+    inicio = time.perf_counter()
+    cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    avance.sumar(tabla, len(filas), time.perf_counter() - inicio)
+
+
+def generar_mundo(args, avance):
+    azar = azar_de(args.semilla, "mundo")
+    conexion = psycopg2.connect(**api.POSTGRES_CONFIG)
+    cursor = conexion.cursor()
+
+    def plantilla(tabla, conocidas):
+        """Columnas a escribir y valores fijos de las obligatorias que no son de la plantilla"""
+        extra = [(c, relleno(t, largo)) for c, t, largo in columnas_obligatorias(cursor, tabla) if c not in conocidas]
+        return [*conocidas, *(c for c, _ in extra)], [v for _, v in extra]
+
+    col_paises, fijo_paises = plantilla("countries", ("id", "name"))
+    col_estados, fijo_estados = plantilla("states", ("id", "name", "country_id"))
+    col_ciudades, fijo_ciudades = plantilla("cities", ("id", "name", "state_id", "country_id"))
+
+    siguientes = {}
+    for tabla in ("countries", "states", "cities"):
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}")
+        siguientes[tabla] = cursor.fetchone()[0]
+    primer_pais = pais_id = siguientes["countries"]
+    estado_id, ciudad_id = siguientes["states"], siguientes["cities"]
+    paises_nombres = []
+    inicio = time.perf_counter()
+
+    for i in range(args.paises):
+        nombre_pais = f"{palabra(azar, (2, 3))}ia {pais_id}"
+        paises_nombres.append(nombre_pais)
+        estados, ciudades = [], []
+        for _ in range(args.estados):
+            estados.append((estado_id, f"{palabra(azar)} {estado_id}", pais_id, *fijo_estados))
+            # Un nombre de ciudad de cada diez se repite dentro del país (listarCiudadesRepetidasPais)
+            repetidos = [palabra(azar) for _ in range(max(args.ciudades // 10, 1))]
+            for _ in range(args.ciudades):
+                nombre = azar.choice(repetidos) if azar.random() < 0.1 else f"{palabra(azar)} {ciudad_id}"
+                ciudades.append((ciudad_id, nombre, estado_id, pais_id, *fijo_ciudades))
+                ciudad_id += 1
+            estado_id += 1
+        copiar(cursor, avance, "countries", col_paises, [(pais_id, nombre_pais, *fijo_paises)])
+        copiar(cursor, avance, "states", col_estados, estados)
+        for desde in range(0, len(ciudades), args.lote):
+            copiar(cursor, avance, "cities", col_ciudades, ciudades[desde:desde + args.lote])
+        conexion.commit()
+        pais_id += 1
+        if (i + 1) % 10 == 0 or i + 1 == args.paises:
+            avance.imprimir("países", i + 1, args.paises, inicio)
+
+    # Las secuencias siguen después de los IDs asignados aquí
+    for tabla in ("countries", "states", "cities"):
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), (SELECT MAX(id) FROM {tabla})) "
+            f"WHERE pg_get_serial_sequence('{tabla}', 'id') IS NOT NULL"
+        )
+        cursor.execute(f"ANALYZE {tabla}")
+    conexion.commit()
+    cursor.close()
+    conexion.close()
+    return {"paises": [primer_pais, pais_id - 1], "paises_nombres": muestrear(azar, paises_nombres)}
+
+
+SECCIONES = {"hoja_vida": generar_hoja_vida, "tienda": generar_tienda, "mundo": generar_mundo}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos reproducibles para las tres bases")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--solo", default=",".join(SECCIONES), help="secciones a generar: hoja_vida,tienda,mundo")
+    parser.add_argument("--lote", type=int, default=5000, help="filas por INSERT/COPY y por commit")
+    parser.add_argument("--personas", type=int, default=100000)
+    parser.add_argument("--experiencias", type=int, default=3, help="experiencias laborales promedio por persona")
+    parser.add_argument("--clientes", type=int, default=50000)
+    parser.add_argument("--articulos", type=int, default=5000)
+    parser.add_argument("--historial", type=int, default=12, help="tramos de precio por artículo (máximo)")
+    parser.add_argument("--facturas", type=int, default=500000)
+    parser.add_argument("--lineas", type=int, default=5, help="máximo de líneas por factura")
+    parser.add_argument("--paises", type=int, default=50, help="países nuevos en mundo")
+    parser.add_argument("--estados", type=int, default=30, help="estados por país")
+    parser.add_argument("--ciudades", type=int, default=50, help="ciudades por estado")
+    parser.add_argument("--manifiesto", default="datos_bench.json", help="archivo JSON con volúmenes y muestras")
+    args = parser.parse_args()
+
+    if args.historial < 1 or args.lineas < 1 or args.lote < 1:
+        parser.error("--historial, --lineas y --lote deben ser al menos 1")
+    secciones = [s.strip() for s in args.solo.split(",") if s.strip()]
+    desconocidas = [s for s in secciones if s not in SECCIONES]
+    if desconocidas:
+        parser.error(f"secciones desconocidas: {', '.join(desconocidas)}")
+
+    avance = Avance()
+    manifiesto = {
+        "semilla": args.semilla,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "volumenes": {k: v for k, v in vars(args).items() if k not in ("solo", "manifiesto")},
+    }
+    inicio = time.perf_counter()
+    for seccion in secciones:
+        print(f"== {seccion}")
+        manifiesto[seccion] = SECCIONES[seccion](args, avance)
+    manifiesto["tablas"] = avance.resumen()
+    manifiesto["segundos"] = round(time.perf_counter() - inicio, 2)
+
+    # Conserva las secciones de corridas anteriores que no se regeneraron
+    try:
+        with open(args.manifiesto, encoding="utf-8") as f:
+            manifiesto = {**json.load(f), **manifiesto}
+    except (OSError, ValueError):
+        pass
+    with open(args.manifiesto, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'tabla':<22} {'filas':>12} {'filas/s':>10}")
+    for tabla, m in manifiesto["tablas"].items():
+        print(f"{tabla:<22} {m['filas']:>12,} {m['filas_s']:>10,}")
+    print(f"Total {manifiesto['segundos']:.1f}s; manifiesto en {args.manifiesto}")
+
+
+if __name__ == "__main__":
+    main()
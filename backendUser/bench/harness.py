@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Carga reproducible contra todas las rutas de lectura de la API.
+
+Corre una mezcla fija de peticiones (MEZCLA: ruta y peso) con --concurrencia
+hilos durante --duracion segundos, descartando los primeros --calentamiento.
+Cada hilo usa su propio generador con la semilla, así la secuencia de
+peticiones es la misma en cada corrida. Reporta por ruta y en total:
+peticiones/s, p50/p95/p99, errores y bytes; y la memoria residente de los
+workers de la API (leída de /metrics durante la corrida). Guarda todo en JSON
+para comparar corridas:
+
+    python3 harness.py --api http://localhost:4000 --manifiesto datos_bench.json --salida base.json
+    python3 harness.py --api http://localhost:4000 --manifiesto datos_bench.json --comparar base.json
+
+Los documentos, productos y países salen del manifiesto de generar_datos.py;
+sin manifiesto se usan los datos de ejemplo de la base. Las rutas
+administrativas y las que escriben (EXCLUIDAS) no entran en la mezcla; la
+carga masiva de facturas tiene su propio bench_facturas_bulk.py.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+# Solo se lee el mapa de rutas: sin pools calientes ni índices
+os.environ["API_PREFORK"] = "1"
+
+import api  # noqa: E402
+
+# Rutas administrativas, con efectos o de exportación masiva: fuera de la mezcla
+EXCLUIDAS = {
+    "static", "mundo_cache_invalidar", "mundo_indice_recargar", "precio_indice_recargar",
+    "buscar_mundo_recargar", "buscar_articulos_recargar", "facturas_bulk",
+    "exportar_mundo", "exportar_hoja_vida", "exportar_tienda",
+}
+
+# Datos de ejemplo de las bases sin generar_datos.py
+MUESTRAS_BASE = {
+    "documentos": ["CC1001", "CE2001", "PAS3001"],
+    "productos": ["Iphone16"],
+    "articulo_ids": [1, 2, 3, 4],
+    "paises_nombres": ["Colombia"],
+    "ventas_desde": "2024-01-01",
+}
+
+
+def muestras_de(manifiesto):
+    """Valores de muestra del manifiesto de generar_datos.py (o los de ejemplo)"""
+    muestras = dict(MUESTRAS_BASE)
+    if manifiesto:
+        with open(manifiesto, encoding="utf-8") as f:
+            datos = json.load(f)
+        for seccion in ("hoja_vida", "tienda", "mundo"):
+            muestras.update({k: v for k, v in datos.get(seccion, {}).items() if k in MUESTRAS_BASE and v})
+    return muestras
+
+
+def _fecha(azar, m):
+    inicio = datetime.fromisoformat(m["ventas_desde"]).toordinal()
+    return datetime.fromordinal(azar.randint(inicio, datetime.now().toordinal())).date().isoformat()
+
+
+def _pagina(azar, ruta, tablas):
+    return "GET", f"{ruta}/{azar.choice(tablas)}?limit=100&after_id={azar.randint(0, 1000)}", None
+
+
+# (endpoint, peso, función que arma (método, ruta, cuerpo) con el generador y las muestras)
+MEZCLA = [
+    # hoja de vida
+    ("hoja_vida_persona", 10, lambda azar, m: ("GET", f"/hoja_vida/persona/{azar.choice(m['documentos'])}", None)),
+    ("reporte_tiempo_experiencia", 10, lambda azar, m: (
+        "GET", f"/hoja_vida/reporte_tiempo_experiencia/{azar.choice(m['documentos'])}", None)),
+    ("reporte_tiempo_experiencia_batch", 2, lambda azar, m: (
+        "POST", "/hoja_vida/reporte_tiempo_experiencia/batch?format=json",
+        {"documentos": azar.sample(m["documentos"], min(20, len(m["documentos"])))})),
+    ("tablas_persona", 4, lambda azar, m: _pagina(
+        azar, "/hoja_vida/tablas_persona", ["persona", "idioma", "experiencia_laboral"])),
+    ("reporte_cache_stats", 0.2, lambda azar, m: ("GET", "/hoja_vida/reporte_tiempo_experiencia/cache", None)),
+    ("hoja_vida_geo_cache_stats", 0.2, lambda azar, m: ("GET", "/hoja_vida/persona/cache", None)),
+    # mundo
+    ("obtener_paises_estados_ciudades", 3, lambda azar, m: (
+        "GET", "/mundo/obtenerPaisesEstadosCiudades?limit=100", None)),
+    ("obtener_por_pais", 5, lambda azar, m: (
+        "GET", f"/mundo/obtenerPaisesEstadosCiudades/{azar.choice(m['paises_nombres'])}", None)),
+    ("listar_ciudades_repetidas_pais", 3, lambda azar, m: (
+        "GET", f"/mundo/listarCiudadesRepetidasPais/{azar.choice(m['paises_nombres'])}", None)),
+    ("buscar_mundo", 8, lambda azar, m: (
+        "GET", f"/mundo/buscar?q={azar.choice(m['paises_nombres'])[:azar.randint(2, 5)]}", None)),
+    ("buscar_mundo_indice", 0.2, lambda azar, m: ("GET", "/mundo/buscar/indice", None)),
+    ("mundo_indice_stats", 0.2, lambda azar, m: ("GET", "/mundo/indice", None)),
+    ("mundo_cache_stats", 0.2, lambda azar, m: ("GET", "/mundo/cache", None)),
+    # tienda
+    ("historial_precio", 6, lambda azar, m: (
+        "GET", f"/factura_db/historial_precio/{azar.choice(m['productos'])}", None)),
+    ("consultar_precio", 8, lambda azar, m: (
+        "GET", f"/factura_db/precio?articulo_id={azar.choice(m['articulo_ids'])}&fecha={_fecha(azar, m)}", None)),
+    ("consultar_precios_batch", 3, lambda azar, m: (
+        "POST", "/factura_db/precio/batch",
+        {"consultas": [{"articulo_id": azar.choice(m["articulo_ids"]), "fecha": _fecha(azar, m)} for _ in range(50)]})),
+    ("anomalias_precio", 0.5, lambda azar, m: ("GET", "/factura_db/precio/anomalias", None)),
+    ("precio_indice_stats", 0.2, lambda azar, m: ("GET", "/factura_db/precio/indice", None)),
+    ("buscar_articulos", 6, lambda azar, m: (
+        "GET", f"/factura_db/articulos/buscar?q={azar.choice(m['productos'])[:azar.randint(2, 6)]}", None)),
+    ("buscar_articulos_indice", 0.2, lambda azar, m: ("GET", "/factura_db/articulos/buscar/indice", None)),
+    ("tabla_productos", 3, lambda azar, m: _pagina(
+        azar, "/factura_db/tabla_productos", ["factura", "detalle_factura", "cliente"])),
+    ("ventas", 4, lambda azar, m: (
+        "GET", f"/factura_db/ventas/{azar.choice(list(api.DIMENSIONES_VENTAS))}?desde={m['ventas_desde']}", None)),
+    # operación
+    ("health", 1, lambda azar, m: ("GET", "/health", None)),
+    ("ready", 1, lambda azar, m: ("GET", "/ready", None)),
+    ("pools", 0.2, lambda azar, m: ("GET", "/pools", None)),
+    ("admision", 0.2, lambda azar, m: ("GET", "/admision", None)),
+    ("exportar_stats", 0.2, lambda azar, m: ("GET", "/export/stats", None)),
+    ("metrics", 0.2, lambda azar, m: ("GET", "/metrics", None)),
+]
+
+
+def rutas_sin_carga():
+    """Endpoints de la API que ni están en la mezcla ni están excluidos a propósito"""
+    en_mezcla = {endpoint for endpoint, _, _ in MEZCLA}
+    return sorted(r.endpoint for r in api.app.url_map.iter_rules()
+                  if r.endpoint not in en_mezcla and r.endpoint not in EXCLUIDAS)
+
+
+def memoria_api(base):
+    """{pid: bytes} de los workers según /metrics (vacío si no se puede leer)"""
+    try:
+        texto = requests.get(f"{base}/metrics", timeout=5).text
+    except requests.RequestException:
+        return {}
+    memoria = {}
+    for linea in texto.splitlines():
+        if linea.startswith("api_process_resident_memory_bytes{"):
+            etiquetas, valor = linea.rsplit(" ", 1)
+            memoria[etiquetas.split('pid="', 1)[1].split('"', 1)[0]] = int(float(valor))
+    return memoria
+
+
+class MuestreoMemoria(threading.Thread):
+    """Lee la memoria de los workers cada `intervalo` segundos: primera y última lectura por pid, y el pico
+
+    Cada lectura de /metrics la responde un solo worker: con varias lecturas
+    se van viendo todos.
+    """
+
+    def __init__(self, base, intervalo):
+        super().__init__(daemon=True)
+        self.base, self.intervalo = base, intervalo
+        self.primera, self.ultima, self.pico = {}, {}, 0
+        self.detener = threading.Event()
+
+    def leer(self):
+        for pid, valor in memoria_api(self.base).items():
+            self.primera.setdefault(pid, valor)
+            self.ultima[pid] = valor
+        self.pico = max(self.pico, sum(self.ultima.values()))
+
+    def run(self):
+        self.leer()
+        while not self.detener.wait(self.intervalo):
+            self.leer()
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ordenada (no vacía)"""
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)), 1) - 1]
+
+
+def trabajador(indice, args, muestras, inicio_medicion, fin, resultados):
+    azar = random.Random(f"{args.semilla}:{indice}")
+    endpoints = [e for e, _, _ in MEZCLA]
+    pesos = [p for _, p, _ in MEZCLA]
+    armadores = {e: a for e, _, a in MEZCLA}
+    sesion = requests.Session()
+    propios = []
+    while time.monotonic() < fin:
+        endpoint = azar.choices(endpoints, pesos)[0]
+        metodo, ruta, cuerpo = armadores[endpoint](azar, muestras)
+        inicio = time.perf_counter()
+        try:
+            with sesion.request(metodo, args.api + ruta, json=cuerpo, stream=True, timeout=args.timeout,
+                                headers={"Accept-Encoding": args.encoding}) as r:
+                recibidos = sum(len(b) for b in r.raw.stream(64 * 1024, decode_content=False))
+                status = r.status_code
+        except requests.RequestException as e:
+            recibidos, status = 0, type(e).__name__
+        segundos = time.perf_counter() - inicio
+        if time.monotonic() >= inicio_medicion:
+            propios.append((endpoint, status, segundos, recibidos))
+    resultados[indice] = propios
+
+
+def resumir(muestras, segundos):
+    tiempos = sorted(m[2] for m in muestras) or [0.0]
+    estados = {}
+    for m in muestras:
+        estados[str(m[1])] = estados.get(str(m[1]), 0) + 1
+    errores = sum(n for s, n in estados.items() if not s.isdigit() or int(s) >= 500)
+    return {
+        "peticiones": len(muestras),
+        "rps": round(len(muestras) / segundos, 2),
+        "p50_ms": round(percentil(tiempos, 50) * 1000, 2),
+        "p95_ms": round(percentil(tiempos, 95) * 1000, 2),
+        "p99_ms": round(percentil(tiempos, 99) * 1000, 2),
+        "max_ms": round(tiempos[-1] * 1000, 2),
+        "errores": errores,
+        "status": estados,
+        "bytes": sum(m[3] for m in muestras),
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def correr(args):
+    muestras = muestras_de(args.manifiesto)
+    sin_carga = rutas_sin_carga()
+    if sin_carga:
+        print(f"AVISO rutas sin carga en la mezcla: {', '.join(sin_carga)}")
+
+    muestreo = MuestreoMemoria(args.api, args.muestreo_memoria)
+    muestreo.start()
+
+    ahora = time.monotonic()
+    inicio_medicion = ahora + args.calentamiento
+    fin = inicio_medicion + args.duracion
+    resultados = [None] * args.concurrencia
+    hilos = [threading.Thread(target=trabajador, args=(i, args, muestras, inicio_medicion, fin, resultados))
+             for i in range(args.concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    muestreo.detener.set()
+    muestreo.join()
+    muestreo.leer()
+    # Las peticiones que terminan después de `fin` alargan la ventana medida
+    segundos = max(time.monotonic() - inicio_medicion, 1e-9)
+
+    todas = [m for propias in resultados for m in propias]
+    por_ruta = {}
+    for m in todas:
+        por_ruta.setdefault(m[0], []).append(m)
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "host": platform.node(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "segundos": round(segundos, 2),
+        "total": resumir(todas, segundos),
+        "rutas": {endpoint: resumir(por_ruta[endpoint], segundos) for endpoint in sorted(por_ruta)},
+        "sin_carga": sin_carga,
+        "memoria": {
+            "inicial_bytes": sum(muestreo.primera.values()),
+            "final_bytes": sum(muestreo.ultima.values()),
+            "pico_bytes": muestreo.pico,
+            "workers": {pid: {"inicial": muestreo.primera[pid], "final": b} for pid, b in muestreo.ultima.items()},
+        },
+    }
+
+
+def imprimir(reporte):
+    print(f"\n{'ruta':<34} {'pet':>7} {'pet/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'MB':>8}")
+    filas = [*reporte["rutas"].items(), ("TOTAL", reporte["total"])]
+    for endpoint, r in filas:
+        print(f"{endpoint:<34} {r['peticiones']:>7,} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['errores']:>5} {r['bytes'] / 1e6:>8.1f}")
+    memoria = reporte["memoria"]
+    if memoria["final_bytes"]:
+        print(f"\nMemoria API: {memoria['inicial_bytes'] / 2**20:.0f} MB -> {memoria['final_bytes'] / 2**20:.0f} MB "
+              f"(pico {memoria['pico_bytes'] / 2**20:.0f} MB, {len(memoria['workers'])} workers)")
+
+
+def comparar(base, actual):
+    """Cambio de pet/s y p95 por ruta respecto a una corrida anterior"""
+    def cambio(antes, despues):
+        return f"{(despues - antes) / antes * 100:+.1f}%" if antes else "-"
+
+    print(f"\nComparación con {base.get('commit') or '?'} ({base['fecha']})")
+    print(f"{'ruta':<34} {'pet/s':>17} {'cambio':>8} {'p95 ms':>17} {'cambio':>8}")
+    rutas = sorted(set(base["rutas"]) & set(actual["rutas"]))
+    for endpoint, b, a in [*((e, base["rutas"][e], actual["rutas"][e]) for e in rutas),
+                           ("TOTAL", base["total"], actual["total"])]:
+        print(f"{endpoint:<34} {b['rps']:>8.1f}{a['rps']:>9.1f} {cambio(b['rps'], a['rps']):>8} "
+              f"{b['p95_ms']:>8.1f}{a['p95_ms']:>9.1f} {cambio(b['p95_ms'], a['p95_ms']):>8}")
+    if base["memoria"]["pico_bytes"] and actual["memoria"]["pico_bytes"]:
+        print(f"{'memoria pico (MB)':<34} {base['memoria']['pico_bytes'] / 2**20:>8.0f}"
+              f"{actual['memoria']['pico_bytes'] / 2**20:>9.0f} "
+              f"{cambio(base['memoria']['pico_bytes'], actual['memoria']['pico_bytes']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga reproducible contra todas las rutas de la API")
+    parser.add_argument("--api", default="http://localhost:4000")
+    parser.add_argument("--manifiesto", help="JSON de generar_datos.py con las muestras")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--concurrencia", type=int, default=16, help="hilos haciendo peticiones")
+    parser.add_argument("--duracion", type=float, default=60, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=10, help="segundos iniciales que no se miden")
+    parser.add_argument("--timeout", type=float, default=120, help="segundos por petición")
+    parser.add_argument("--encoding", default="gzip", help="Accept-Encoding de las peticiones")
+    parser.add_argument("--muestreo-memoria", type=float, default=2, help="segundos entre lecturas de /metrics")
+    parser.add_argument("--salida", default=f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--comparar", metavar="JSON", help="corrida anterior para comparar")
+    args = parser.parse_args()
+
+    reporte = correr(args)
+    imprimir(reporte)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), reporte)
+
+
+if __name__ == "__main__":
+    main()
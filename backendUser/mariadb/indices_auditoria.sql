@@ -0,0 +1,10 @@
+-- =========================================
+-- Índices detectados por api/plan_audit.py
+-- =========================================
+USE tienda;
+
+-- historial_precio/<producto>: búsqueda del artículo por nombre
+CREATE INDEX IF NOT EXISTS idx_articulo_nombre ON articulo(nombre);
+
+-- historial_precio/<producto>: precios del artículo ya ordenados por fecha (evita el filesort)
+CREATE INDEX IF NOT EXISTS idx_historial_articulo_fecha ON historial_precio(articulo_id, fecha_inicio);
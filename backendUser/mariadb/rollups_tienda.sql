@@ -0,0 +1,151 @@
+-- ===================================================
+-- Rollups de ventas (tienda)
+-- Resúmenes que la API mantiene de forma incremental: los triggers de
+-- factura y detalle_factura encolan en rollup_cambios lo que cada
+-- INSERT, UPDATE o DELETE suma o resta, y cada corrida aplica los
+-- cambios encolados y los saca de la cola en la misma transacción.
+-- Reconstruir: flask --app api rollups reconstruir
+-- ===================================================
+
+USE tienda;
+
+-- Totales por día
+CREATE TABLE IF NOT EXISTS ventas_dia (
+    dia DATE NOT NULL PRIMARY KEY,
+    facturas INT NOT NULL DEFAULT 0,
+    lineas INT NOT NULL DEFAULT 0,
+    unidades BIGINT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16,2) NOT NULL DEFAULT 0
+);
+
+-- Totales por mes y artículo (categoría y marca se toman de articulo al consultar)
+CREATE TABLE IF NOT EXISTS ventas_articulo_mes (
+    mes DATE NOT NULL,
+    articulo_id INT NOT NULL,
+    lineas INT NOT NULL DEFAULT 0,
+    unidades BIGINT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, articulo_id),
+    INDEX idx_ventas_articulo (articulo_id)
+);
+
+-- Totales por mes y cliente
+CREATE TABLE IF NOT EXISTS ventas_cliente_mes (
+    mes DATE NOT NULL,
+    cliente_id INT NOT NULL,
+    facturas INT NOT NULL DEFAULT 0,
+    unidades BIGINT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, cliente_id),
+    INDEX idx_ventas_cliente (cliente_id)
+);
+
+-- Cambios que faltan por aplicar: cuánto suma (o resta, con signo negativo)
+-- cada escritura a su día, cliente y artículo. articulo_id NULL es el cambio
+-- de la factura misma (facturas +1/-1). Como los cambios se suman, el orden
+-- en que confirman las transacciones no importa.
+CREATE TABLE IF NOT EXISTS rollup_cambios (
+    cambio_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    dia DATE NOT NULL,
+    cliente_id INT NOT NULL,
+    articulo_id INT NULL,
+    facturas INT NOT NULL DEFAULT 0,
+    lineas INT NOT NULL DEFAULT 0,
+    unidades BIGINT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16,2) NOT NULL DEFAULT 0
+);
+
+DROP TABLE IF EXISTS rollup_pendientes;
+DROP TABLE IF EXISTS rollup_watermark;
+
+-- Con los rollups vacíos (instalación nueva) se encolan las facturas existentes;
+-- con datos de una versión anterior, correr rollups reconstruir
+INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, facturas)
+SELECT DATE(fecha_factura), cliente_id, NULL, 1
+FROM factura
+WHERE NOT EXISTS (SELECT 1 FROM ventas_dia);
+
+INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, lineas, unidades, ingresos)
+SELECT DATE(f.fecha_factura), f.cliente_id, d.articulo_id, 1, d.cantidad, d.subtotal
+FROM detalle_factura d
+JOIN factura f ON f.factura_id = d.factura_id
+WHERE NOT EXISTS (SELECT 1 FROM ventas_dia);
+
+DELIMITER $$
+
+-- Una línea suma (signo 1) o resta (signo -1) en el día y cliente de su factura
+DROP PROCEDURE IF EXISTS rollup_encolar_linea$$
+CREATE PROCEDURE rollup_encolar_linea(
+    IN p_factura_id INT, IN p_articulo_id INT, IN p_signo INT, IN p_cantidad INT, IN p_subtotal DECIMAL(12,2)
+)
+BEGIN
+  DECLARE v_dia DATE;
+  DECLARE v_cliente_id INT;
+  SELECT DATE(fecha_factura), cliente_id INTO v_dia, v_cliente_id
+  FROM factura WHERE factura_id = p_factura_id;
+  -- Sin factura (líneas huérfanas) no hay nada que contar
+  IF v_dia IS NOT NULL THEN
+    INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, lineas, unidades, ingresos)
+    VALUES (v_dia, v_cliente_id, p_articulo_id, p_signo, p_signo * p_cantidad, p_signo * p_subtotal);
+  END IF;
+END$$
+
+-- Una factura que cambia de día o cliente (o se borra) mueve también sus líneas
+DROP PROCEDURE IF EXISTS rollup_encolar_factura$$
+CREATE PROCEDURE rollup_encolar_factura(
+    IN p_factura_id INT, IN p_fecha DATETIME, IN p_cliente_id INT, IN p_signo INT
+)
+BEGIN
+  INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, facturas)
+  VALUES (DATE(p_fecha), p_cliente_id, NULL, p_signo);
+  INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, lineas, unidades, ingresos)
+  SELECT DATE(p_fecha), p_cliente_id, articulo_id, p_signo, p_signo * cantidad, p_signo * subtotal
+  FROM detalle_factura
+  WHERE factura_id = p_factura_id;
+END$$
+
+DROP TRIGGER IF EXISTS factura_rollup_ai$$
+CREATE TRIGGER factura_rollup_ai AFTER INSERT ON factura
+FOR EACH ROW
+  -- Las líneas llegan después y se encolan solas (sin leer detalle_factura aquí,
+  -- que bloquearía el hueco del índice a otras cargas concurrentes)
+  INSERT INTO rollup_cambios (dia, cliente_id, articulo_id, facturas)
+  VALUES (DATE(NEW.fecha_factura), NEW.cliente_id, NULL, 1)$$
+
+DROP TRIGGER IF EXISTS factura_rollup_au$$
+CREATE TRIGGER factura_rollup_au AFTER UPDATE ON factura
+FOR EACH ROW
+BEGIN
+  IF DATE(NEW.fecha_factura) <> DATE(OLD.fecha_factura) OR NEW.cliente_id <> OLD.cliente_id
+     OR NEW.factura_id <> OLD.factura_id THEN
+    CALL rollup_encolar_factura(OLD.factura_id, OLD.fecha_factura, OLD.cliente_id, -1);
+    CALL rollup_encolar_factura(NEW.factura_id, NEW.fecha_factura, NEW.cliente_id, 1);
+  END IF;
+END$$
+
+-- Las líneas ya se borraron (la llave foránea lo exige) y restaron por su cuenta;
+-- si quedaran huérfanas se restan aquí
+DROP TRIGGER IF EXISTS factura_rollup_ad$$
+CREATE TRIGGER factura_rollup_ad AFTER DELETE ON factura
+FOR EACH ROW
+  CALL rollup_encolar_factura(OLD.factura_id, OLD.fecha_factura, OLD.cliente_id, -1)$$
+
+DROP TRIGGER IF EXISTS detalle_factura_rollup_ai$$
+CREATE TRIGGER detalle_factura_rollup_ai AFTER INSERT ON detalle_factura
+FOR EACH ROW
+  CALL rollup_encolar_linea(NEW.factura_id, NEW.articulo_id, 1, NEW.cantidad, NEW.subtotal)$$
+
+DROP TRIGGER IF EXISTS detalle_factura_rollup_au$$
+CREATE TRIGGER detalle_factura_rollup_au AFTER UPDATE ON detalle_factura
+FOR EACH ROW
+BEGIN
+  CALL rollup_encolar_linea(OLD.factura_id, OLD.articulo_id, -1, OLD.cantidad, OLD.subtotal);
+  CALL rollup_encolar_linea(NEW.factura_id, NEW.articulo_id, 1, NEW.cantidad, NEW.subtotal);
+END$$
+
+DROP TRIGGER IF EXISTS detalle_factura_rollup_ad$$
+CREATE TRIGGER detalle_factura_rollup_ad AFTER DELETE ON detalle_factura
+FOR EACH ROW
+  CALL rollup_encolar_linea(OLD.factura_id, OLD.articulo_id, -1, OLD.cantidad, OLD.subtotal)$$
+
+DELIMITER ;
@@ -0,0 +1,35 @@
+-- ===================================================
+-- Triggers de tienda
+-- historial_precio_cambios registra qué artículos cambiaron de
+-- precio; la API lo consulta para actualizar su índice de precios.
+-- ===================================================
+
+USE tienda;
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS historial_precio_ai$$
+CREATE TRIGGER historial_precio_ai AFTER INSERT ON historial_precio
+FOR EACH ROW
+BEGIN
+  INSERT INTO historial_precio_cambios (articulo_id) VALUES (NEW.articulo_id);
+END$$
+
+DROP TRIGGER IF EXISTS historial_precio_au$$
+CREATE TRIGGER historial_precio_au AFTER UPDATE ON historial_precio
+FOR EACH ROW
+BEGIN
+  INSERT INTO historial_precio_cambios (articulo_id) VALUES (NEW.articulo_id);
+  IF NEW.articulo_id <> OLD.articulo_id THEN
+    INSERT INTO historial_precio_cambios (articulo_id) VALUES (OLD.articulo_id);
+  END IF;
+END$$
+
+DROP TRIGGER IF EXISTS historial_precio_ad$$
+CREATE TRIGGER historial_precio_ad AFTER DELETE ON historial_precio
+FOR EACH ROW
+BEGIN
+  INSERT INTO historial_precio_cambios (articulo_id) VALUES (OLD.articulo_id);
+END$$
+
+DELIMITER ;
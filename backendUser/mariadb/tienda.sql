@@ -32,6 +32,13 @@ CREATE TABLE historial_precio (
     FOREIGN KEY (articulo_id) REFERENCES articulo(articulo_id)
 );
 
+-- Registro de cambios de historial_precio (lo llenan los triggers de sp_tienda.sql)
+CREATE TABLE historial_precio_cambios (
+    cambio_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    articulo_id INT NOT NULL,
+    cambiado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE factura (
     factura_id INT AUTO_INCREMENT PRIMARY KEY,
     cliente_id INT NOT NULL,
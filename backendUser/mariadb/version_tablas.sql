@@ -0,0 +1,142 @@
+-- ===================================================
+-- Versiones por tabla (ETag de la API)
+-- Cada escritura agrega una fila a version_cambios; la versión
+-- de una tabla es cuántos cambios lleva: los plegados en
+-- version_plegado más los que siguen en el registro. La API
+-- pliega el registro en segundo plano, así no crece sin límite.
+-- Solo se inserta: dos escrituras concurrentes no se esperan
+-- por un contador compartido. La ingesta masiva de la API pone
+-- @api_escritura_masiva y registra un cambio por lote.
+-- ===================================================
+
+USE tienda;
+
+DROP TABLE IF EXISTS version_tabla;
+
+CREATE TABLE IF NOT EXISTS version_cambios (
+  cambio_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  tabla VARCHAR(64) NOT NULL,
+  KEY idx_version_cambios_tabla (tabla, cambio_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Cambios ya plegados por tabla (solo los actualiza el plegado de la API)
+CREATE TABLE IF NOT EXISTS version_plegado (
+  tabla VARCHAR(64) NOT NULL PRIMARY KEY,
+  cambios BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO version_plegado (tabla) VALUES
+  ('cliente'),
+  ('articulo'),
+  ('historial_precio'),
+  ('factura'),
+  ('detalle_factura');
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS cliente_version_ai$$
+CREATE TRIGGER cliente_version_ai AFTER INSERT ON cliente
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('cliente');
+  END IF$$
+
+DROP TRIGGER IF EXISTS cliente_version_au$$
+CREATE TRIGGER cliente_version_au AFTER UPDATE ON cliente
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('cliente');
+  END IF$$
+
+DROP TRIGGER IF EXISTS cliente_version_ad$$
+CREATE TRIGGER cliente_version_ad AFTER DELETE ON cliente
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('cliente');
+  END IF$$
+
+DROP TRIGGER IF EXISTS articulo_version_ai$$
+CREATE TRIGGER articulo_version_ai AFTER INSERT ON articulo
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('articulo');
+  END IF$$
+
+DROP TRIGGER IF EXISTS articulo_version_au$$
+CREATE TRIGGER articulo_version_au AFTER UPDATE ON articulo
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('articulo');
+  END IF$$
+
+DROP TRIGGER IF EXISTS articulo_version_ad$$
+CREATE TRIGGER articulo_version_ad AFTER DELETE ON articulo
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('articulo');
+  END IF$$
+
+DROP TRIGGER IF EXISTS historial_precio_version_ai$$
+CREATE TRIGGER historial_precio_version_ai AFTER INSERT ON historial_precio
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('historial_precio');
+  END IF$$
+
+DROP TRIGGER IF EXISTS historial_precio_version_au$$
+CREATE TRIGGER historial_precio_version_au AFTER UPDATE ON historial_precio
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('historial_precio');
+  END IF$$
+
+DROP TRIGGER IF EXISTS historial_precio_version_ad$$
+CREATE TRIGGER historial_precio_version_ad AFTER DELETE ON historial_precio
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('historial_precio');
+  END IF$$
+
+DROP TRIGGER IF EXISTS factura_version_ai$$
+CREATE TRIGGER factura_version_ai AFTER INSERT ON factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('factura');
+  END IF$$
+
+DROP TRIGGER IF EXISTS factura_version_au$$
+CREATE TRIGGER factura_version_au AFTER UPDATE ON factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('factura');
+  END IF$$
+
+DROP TRIGGER IF EXISTS factura_version_ad$$
+CREATE TRIGGER factura_version_ad AFTER DELETE ON factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('factura');
+  END IF$$
+
+DROP TRIGGER IF EXISTS detalle_factura_version_ai$$
+CREATE TRIGGER detalle_factura_version_ai AFTER INSERT ON detalle_factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('detalle_factura');
+  END IF$$
+
+DROP TRIGGER IF EXISTS detalle_factura_version_au$$
+CREATE TRIGGER detalle_factura_version_au AFTER UPDATE ON detalle_factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('detalle_factura');
+  END IF$$
+
+DROP TRIGGER IF EXISTS detalle_factura_version_ad$$
+CREATE TRIGGER detalle_factura_version_ad AFTER DELETE ON detalle_factura
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('detalle_factura');
+  END IF$$
+
+DELIMITER ;
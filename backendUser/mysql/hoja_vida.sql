@@ -149,6 +149,13 @@ CREATE TABLE experiencia_laboral (
     ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Registro de cambios de experiencia_laboral (lo llenan los triggers de sp_hoja_vida.sql)
+CREATE TABLE experiencia_cambios (
+  cambio_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  persona_id INT NOT NULL,
+  cambiado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =========================================
 -- Índices (para rendimiento)
 -- =========================================
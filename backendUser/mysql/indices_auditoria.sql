@@ -0,0 +1,10 @@
+-- =========================================
+-- Índices detectados por api/plan_audit.py
+-- =========================================
+USE hojaVida;
+
+-- reporte_tiempo_experiencia (SP y batch): experiencias de una persona ordenadas por ingreso
+CREATE INDEX IF NOT EXISTS idx_exp_persona_ingreso ON experiencia_laboral(persona_id, fecha_ingreso);
+
+-- sincronizar_cambios_experiencia lee por cambio_id (llave primaria): no necesita índice
+-- persona.numero_documento ya es UNIQUE: no necesita índice
@@ -1,90 +1,330 @@
 #!/usr/bin/env python3
+"""Carga la BD hojaVida: ubicaciones desde el CSV y datos de prueba.
+
+Uso:
+    python3 scripts.py                               # carga secuencial
+    python3 scripts.py --paralelo 4                  # chunks en paralelo con checkpoint
+    python3 scripts.py --paralelo 4 --dry-run --benchmark
+"""
+import argparse
 import csv
+import io
+import json
+import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import mysql.connector
 
 CSV_PATH = "/tmp/nueva_db.csv"   # En tu Dockerfile copias a /tmp
 
-conexion = mysql.connector.connect(
-    host='localhost',
-    user='admin',
-    password='admin123',
-    database='hojaVida',
-    port=3306
-)
-conexion.autocommit = False
-cursor = conexion.cursor()
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "admin",
+    "password": "admin123",
+    "database": "hojaVida",
+    "port": 3306,
+}
+
+BATCH = 5000  # filas por INSERT multi-fila (y por commit)
+CHECKPOINT_PATH = CSV_PATH + ".checkpoint"
 
 # =============================
-# INSERTAR PAÍS / ESTADO / CIUDAD
+# INSERTAR PAÍS / ESTADO / CIUDAD (carga masiva)
+# Una sola pasada por el CSV: se deduplica en memoria, los IDs se asignan
+# en el cliente y cada tabla se inserta con INSERT multi-fila (executemany).
+# Las filas que ya existen en la BD se respetan, así que es idempotente.
 # =============================
-sql_pais = """
-INSERT INTO pais (nombre, nacionalidad)
-SELECT %s, %s
-WHERE NOT EXISTS (SELECT 1 FROM pais WHERE nombre = %s)
-"""
+sql_pais = "INSERT INTO pais (pais_id, nombre, nacionalidad) VALUES (%s, %s, %s)"
+sql_estado = "INSERT INTO estado (estado_id, nombre, pais_id) VALUES (%s, %s, %s)"
+sql_ciudad = "INSERT INTO ciudad (ciudad_id, nombre, estado_id) VALUES (%s, %s, %s)"
 
-sql_estado = """
-INSERT INTO estado (nombre, pais_id)
-SELECT %s, p.pais_id
-FROM pais p
-WHERE p.nombre = %s
-  AND NOT EXISTS (
-    SELECT 1 FROM estado e
-    WHERE e.nombre = %s AND e.pais_id = p.pais_id
-  )
-"""
 
-sql_ciudad = """
-INSERT INTO ciudad (nombre, estado_id)
-SELECT %s,
-       (SELECT e.estado_id
-          FROM estado e
-          JOIN pais p ON p.pais_id = e.pais_id
-         WHERE e.nombre = %s AND p.nombre = %s
-         LIMIT 1)
-WHERE NOT EXISTS (
-  SELECT 1
-  FROM ciudad c
-  JOIN estado e2 ON e2.estado_id = c.estado_id
-  JOIN pais p2 ON p2.pais_id = e2.pais_id
-  WHERE c.nombre = %s AND e2.nombre = %s AND p2.nombre = %s
-)
-"""
+_claves = {}
+
+def clave(nombre):
+    """Aproxima la comparación de utf8mb4_unicode_ci: sin tildes, sin mayúsculas ni espacios finales"""
+    k = _claves.get(nombre)
+    if k is None:
+        sin_tildes = unicodedata.normalize("NFKD", nombre)
+        k = "".join(ch for ch in sin_tildes if not unicodedata.combining(ch)).casefold().rstrip()
+        _claves[nombre] = k
+    return k
+
+
+class Ubicaciones:
+    """Países, estados y ciudades conocidos (en la BD o ya leídos del CSV) con su ID"""
+
+    def __init__(self, cursor):
+        self.paises, self.estados, self.ciudades = {}, {}, {}
+        cursor.execute("SELECT pais_id, nombre FROM pais")
+        for pais_id, nombre in cursor:
+            self.paises.setdefault(clave(nombre), pais_id)
+        cursor.execute("SELECT estado_id, pais_id, nombre FROM estado")
+        for estado_id, pais_id, nombre in cursor:
+            self.estados.setdefault((pais_id, clave(nombre)), estado_id)
+        cursor.execute("SELECT ciudad_id, estado_id, nombre FROM ciudad")
+        for ciudad_id, estado_id, nombre in cursor:
+            self.ciudades.setdefault((estado_id, clave(nombre)), ciudad_id)
+        cursor.execute(
+            "SELECT (SELECT COALESCE(MAX(pais_id), 0) FROM pais),"
+            " (SELECT COALESCE(MAX(estado_id), 0) FROM estado),"
+            " (SELECT COALESCE(MAX(ciudad_id), 0) FROM ciudad)"
+        )
+        self.max_pais, self.max_estado, self.max_ciudad = cursor.fetchone()
+        self.nuevos_paises, self.nuevos_estados, self.nuevas_ciudades = [], [], []
+
+    def agregar(self, pais, nacionalidad, estado, ciudad):
+        """Registra la fila del CSV; solo lo que no existía queda pendiente de insertar"""
+        k = clave(pais)
+        pais_id = self.paises.get(k)
+        if pais_id is None:
+            self.max_pais += 1
+            pais_id = self.paises[k] = self.max_pais
+            self.nuevos_paises.append((pais_id, pais, nacionalidad))
+
+        k = (pais_id, clave(estado))
+        estado_id = self.estados.get(k)
+        if estado_id is None:
+            self.max_estado += 1
+            estado_id = self.estados[k] = self.max_estado
+            self.nuevos_estados.append((estado_id, estado, pais_id))
+
+        k = (estado_id, clave(ciudad))
+        if k not in self.ciudades:
+            self.max_ciudad += 1
+            self.ciudades[k] = self.max_ciudad
+            self.nuevas_ciudades.append((self.max_ciudad, ciudad, estado_id))
+
+
+def insertar_lotes(conexion, cursor, sql, filas, tabla, commit=True, verbose=True):
+    """Inserta en lotes multi-fila con commit por lote e imprime el avance en filas/s"""
+    inicio = time.perf_counter()
+    for i in range(0, len(filas), BATCH):
+        cursor.executemany(sql, filas[i:i + BATCH])
+        if commit:
+            conexion.commit()
+        if not verbose:
+            continue
+        hechas = min(i + BATCH, len(filas))
+        velocidad = hechas / max(time.perf_counter() - inicio, 1e-9)
+        print(f"  {tabla}: {hechas}/{len(filas)} filas ({velocidad:,.0f} filas/s)", flush=True)
+    if not filas and verbose:
+        print(f"  {tabla}: sin filas nuevas")
+    return time.perf_counter() - inicio
+
+
+def cargar_ubicaciones(conexion, cursor, csv_path=CSV_PATH, dry_run=False):
+    inicio = time.perf_counter()
+    ubicaciones = Ubicaciones(cursor)
+    leidas = 0
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        lector = csv.reader(f)
+        next(lector)  # encabezados: pais,nacionalidad,estado,ciudad
+        for pais, nacionalidad, estado, ciudad in lector:
+            ubicaciones.agregar(pais, nacionalidad, estado, ciudad)
+            leidas += 1
+    lectura = time.perf_counter() - inicio
+    print(f"CSV leído: {leidas} filas en {lectura:.2f}s ({leidas / max(lectura, 1e-9):,.0f} filas/s)")
+
+    # En dry-run todo va en una sola transacción que se revierte al final
+    insercion = 0.0
+    for sql, filas, tabla in (
+        (sql_pais, ubicaciones.nuevos_paises, "pais"),
+        (sql_estado, ubicaciones.nuevos_estados, "estado"),
+        (sql_ciudad, ubicaciones.nuevas_ciudades, "ciudad"),
+    ):
+        insercion += insertar_lotes(conexion, cursor, sql, filas, tabla, commit=not dry_run)
+    if dry_run:
+        conexion.rollback()
+    total = time.perf_counter() - inicio
+    print(f"Ubicaciones cargadas en {total:.2f}s ({leidas / max(total, 1e-9):,.0f} filas CSV/s)")
+    nuevas = len(ubicaciones.nuevos_paises) + len(ubicaciones.nuevos_estados) + len(ubicaciones.nuevas_ciudades)
+    return {"filas_csv": leidas, "parseo_s": lectura, "filas_insertadas": nuevas, "insercion_s": insercion}
+
+
+# =============================
+# CARGA PARALELA POR CHUNKS CON CHECKPOINT
+# El CSV se parte en rangos de bytes alineados a fin de línea; un pool de
+# procesos los parsea y deduplica, y las ciudades nuevas de cada chunk se
+# escriben repartidas entre N conexiones. Tras confirmar cada chunk se guarda
+# el checkpoint (offset + filas confirmadas) para poder reanudar.
+# Supone que ningún campo del CSV contiene saltos de línea.
+# =============================
+def rangos_csv(csv_path, inicio, chunk_bytes):
+    """Rangos (inicio, fin) de ~chunk_bytes que terminan en fin de línea"""
+    tamano = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        pos = inicio
+        while pos < tamano:
+            fin = min(pos + chunk_bytes, tamano)
+            if fin < tamano:
+                f.seek(fin)
+                f.readline()
+                fin = f.tell()
+            yield pos, fin
+            pos = fin
+
+
+def parsear_rango(args):
+    """Parsea un rango del CSV en un proceso aparte y devuelve sus ubicaciones únicas"""
+    csv_path, inicio, fin = args
+    t0 = time.perf_counter()
+    with open(csv_path, 'rb') as f:
+        f.seek(inicio)
+        datos = f.read(fin - inicio).decode('utf-8')
+    unicas = {}
+    filas = 0
+    for pais, nacionalidad, estado, ciudad in csv.reader(io.StringIO(datos, newline='')):
+        filas += 1
+        unicas.setdefault((clave(pais), clave(estado), clave(ciudad)), (pais, nacionalidad, estado, ciudad))
+    return inicio, fin, filas, list(unicas.values()), time.perf_counter() - t0
+
+
+def leer_checkpoint(checkpoint_path, csv_path):
+    try:
+        with open(checkpoint_path, encoding='utf-8') as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Solo sirve si corresponde al mismo archivo
+    if ckpt.get("csv") != os.path.abspath(csv_path) or ckpt.get("tamano") != os.path.getsize(csv_path):
+        return None
+    return ckpt
+
+
+def guardar_checkpoint(checkpoint_path, csv_path, offset, filas):
+    tmp = checkpoint_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({
+            "csv": os.path.abspath(csv_path),
+            "tamano": os.path.getsize(csv_path),
+            "offset": offset,
+            "filas": filas,
+        }, f)
+    os.replace(tmp, checkpoint_path)
+
+
+def cargar_ubicaciones_paralelo(conexion, cursor, csv_path=CSV_PATH, workers=4, chunk_mb=16,
+                                checkpoint_path=CHECKPOINT_PATH, dry_run=False):
+    inicio = time.perf_counter()
+    ubicaciones = Ubicaciones(cursor)
 
-BATCH = 5000
-pend = 0
+    with open(csv_path, 'rb') as f:
+        f.readline()  # encabezados: pais,nacionalidad,estado,ciudad
+        offset = f.tell()
+    filas_confirmadas = 0
+    ckpt = None if dry_run else leer_checkpoint(checkpoint_path, csv_path)
+    if ckpt:
+        offset, filas_confirmadas = ckpt["offset"], ckpt["filas"]
+        print(f"Reanudando desde el byte {offset} ({filas_confirmadas} filas ya confirmadas)")
 
-with open(CSV_PATH, 'r', encoding='utf-8', newline='') as f:
-    lector = csv.reader(f)
-    next(lector)  # encabezados: pais,nacionalidad,estado,ciudad
-    for pais, nacionalidad, estado, ciudad in lector:
-        cursor.execute(sql_pais,   (pais, nacionalidad, pais))
-        cursor.execute(sql_estado, (estado, pais, estado))
-        cursor.execute(sql_ciudad, (ciudad, estado, pais, ciudad, estado, pais))
-        pend += 1
-        if pend >= BATCH:
-            conexion.commit(); pend = 0
+    # Una conexión por escritor; en dry-run las ciudades referencian estados sin confirmar
+    escritores = []
+    for _ in range(workers):
+        con = mysql.connector.connect(**DB_CONFIG)
+        con.autocommit = False
+        if dry_run:
+            cur = con.cursor()
+            cur.execute("SET SESSION foreign_key_checks = 0")
+            cur.close()
+        escritores.append(con)
+
+    def escribir(i, filas):
+        con = escritores[i]
+        cur = con.cursor()
+        try:
+            insertar_lotes(con, cur, sql_ciudad, filas, "ciudad", commit=not dry_run, verbose=False)
+        finally:
+            cur.close()
+
+    m = {"filas_csv": 0, "parseo_s": 0.0, "filas_insertadas": 0, "insercion_s": 0.0, "workers": workers}
+
+    def aplicar(resultado):
+        """Deduplica el chunk contra lo conocido, inserta lo nuevo y guarda el checkpoint"""
+        nonlocal filas_confirmadas
+        _, fin, filas, unicas, parseo = resultado
+        ubicaciones.nuevos_paises, ubicaciones.nuevos_estados, ubicaciones.nuevas_ciudades = [], [], []
+        for pais, nacionalidad, estado, ciudad in unicas:
+            ubicaciones.agregar(pais, nacionalidad, estado, ciudad)
+
+        t0 = time.perf_counter()
+        # Países y estados son pocos: van por la conexión principal antes que las ciudades (FK)
+        insertar_lotes(conexion, cursor, sql_pais, ubicaciones.nuevos_paises, "pais",
+                       commit=not dry_run, verbose=False)
+        insertar_lotes(conexion, cursor, sql_estado, ubicaciones.nuevos_estados, "estado",
+                       commit=not dry_run, verbose=False)
+        ciudades = ubicaciones.nuevas_ciudades
+        list(hilos.map(escribir, range(workers), [ciudades[i::workers] for i in range(workers)]))
+        nuevas = len(ubicaciones.nuevos_paises) + len(ubicaciones.nuevos_estados) + len(ciudades)
+
+        m["insercion_s"] += time.perf_counter() - t0
+        m["parseo_s"] += parseo
+        m["filas_csv"] += filas
+        m["filas_insertadas"] += nuevas
+        filas_confirmadas += filas
+        if not dry_run:
+            guardar_checkpoint(checkpoint_path, csv_path, fin, filas_confirmadas)
+        print(f"  chunk hasta byte {fin}: {filas} filas, {nuevas} nuevas "
+              f"({filas_confirmadas} confirmadas)", flush=True)
+
+    tareas = ((csv_path, a, b) for a, b in rangos_csv(csv_path, offset, chunk_mb * 1024 * 1024))
+    try:
+        with ProcessPoolExecutor(workers) as procesos, ThreadPoolExecutor(workers) as hilos:
+            # Ventana acotada: como mucho 2*workers chunks parseados en memoria.
+            # Los chunks se aplican en orden para que el checkpoint sea un offset válido.
+            pendientes = []
+            for tarea in tareas:
+                pendientes.append(procesos.submit(parsear_rango, tarea))
+                if len(pendientes) >= 2 * workers:
+                    aplicar(pendientes.pop(0).result())
+            for futuro in pendientes:
+                aplicar(futuro.result())
+    finally:
+        for con in escritores:
+            if dry_run:
+                con.rollback()
+            con.close()
+    if dry_run:
+        conexion.rollback()
+    elif os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)  # carga completa: el checkpoint ya no hace falta
+
+    m["total_s"] = time.perf_counter() - inicio
+    print(f"Ubicaciones cargadas en {m['total_s']:.2f}s ({m['filas_csv'] / max(m['total_s'], 1e-9):,.0f} filas CSV/s)")
+    return m
+
+
+def imprimir_benchmark(m):
+    """Throughput de parseo e inserción por separado"""
+    print("=== Benchmark ===")
+    print(f"Filas CSV: {m['filas_csv']}  |  filas insertadas: {m['filas_insertadas']}")
+    print(f"Parseo:    {m['parseo_s']:.2f}s de CPU -> {m['filas_csv'] / max(m['parseo_s'], 1e-9):,.0f} filas/s"
+          + (f" por proceso ({m['workers']} procesos)" if m.get('workers') else ""))
+    print(f"Inserción: {m['insercion_s']:.2f}s -> {m['filas_insertadas'] / max(m['insercion_s'], 1e-9):,.0f} filas/s")
+    if m.get('total_s'):
+        print(f"Total:     {m['total_s']:.2f}s -> {m['filas_csv'] / max(m['total_s'], 1e-9):,.0f} filas CSV/s")
 
-if pend:
-    conexion.commit()
 
 # =============================
 # AYUDAS: OBTENER TRIPLAS VÁLIDAS (pais, estado, ciudad)
 # =============================
-def get_geo_triple(offset: int = 0):
+def get_geo_triple(cursor, offset: int = 0):
     """
     Devuelve (pais_id, estado_id, ciudad_id, nacionalidad_txt, pais_nombre, estado_nombre, ciudad_nombre)
-    usando un offset sobre el orden natural por IDs.
-    Si no hay suficientes filas para el offset, reintenta con offset 0.
+    de la primera ciudad con ciudad_id > offset (búsqueda por llave primaria, sin
+    recorrer las filas anteriores como haría LIMIT offset).
+    Si no hay ciudades después del offset, reintenta con offset 0.
     """
     q = """
     SELECT p.pais_id, e.estado_id, c.ciudad_id, p.nacionalidad,
            p.nombre AS pais_nombre, e.nombre AS estado_nombre, c.nombre AS ciudad_nombre
-    FROM pais p
-    JOIN estado e ON e.pais_id = p.pais_id
-    JOIN ciudad c ON c.estado_id = e.estado_id
-    ORDER BY p.pais_id, e.estado_id, c.ciudad_id
-    LIMIT %s, 1
+    FROM ciudad c
+    JOIN estado e ON e.estado_id = c.estado_id
+    JOIN pais p ON p.pais_id = e.pais_id
+    WHERE c.ciudad_id > %s
+    ORDER BY c.ciudad_id
+    LIMIT 1
     """
     cursor.execute(q, (offset,))
     row = cursor.fetchone()
@@ -93,191 +333,229 @@ def get_geo_triple(offset: int = 0):
         row = cursor.fetchone()
     return row  # puede ser None si no hubiera datos
 
-# =============================
-# DATOS DE PRUEBA: DISTRITOS
-# =============================
-cursor.executemany(
+def cargar_datos_prueba(cursor):
+    # =============================
+    # DATOS DE PRUEBA: DISTRITOS
+    # =============================
+    cursor.executemany(
+        """
+        INSERT INTO distrito_militar (nombre)
+        VALUES (%s)
+        ON DUPLICATE KEY UPDATE nombre = VALUES(nombre)
+        """,
+        [("DM-01",), ("DM-02",), ("DM-03",)]
+    )
+
+    # =============================
+    # DATOS DE PRUEBA: PERSONAS (3 ejemplos)
+    # Usamos geos distintos con offsets para variar nacimiento/residencia
+    # =============================
+    personas = [
+        {
+            "doc": "CC1001", "tipo": "CC", "sexo": "F",
+            "nombres": "Ana Maria", "ap1": "Lopez", "ap2": "Gonzalez",
+            "nac_offset": 0, "res_offset": 10,
+            "fecha_nac": "1996-03-12", "dir": "Calle 10 #12-34",
+            "tel": "3001234567", "email": "ana.lopez@example.com"
+        },
+        {
+            "doc": "CE2001", "tipo": "CE", "sexo": "M",
+            "nombres": "Carlos Andres", "ap1": "Perez", "ap2": "Gomez",
+            "nac_offset": 1, "res_offset": 11,
+            "fecha_nac": "1992-07-25", "dir": "Carrera 45 #67-89",
+            "tel": "3017654321", "email": "carlos.perez@example.com"
+        },
+        {
+            "doc": "PAS3001", "tipo": "PAS", "sexo": "F",
+            "nombres": "Laura", "ap1": "Torres", "ap2": "Ramirez",
+            "nac_offset": 2, "res_offset": 12,
+            "fecha_nac": "1998-11-05", "dir": "Av. Principal 123",
+            "tel": "3025557788", "email": "laura.torres@example.com"
+        },
+    ]
+
+    sql_persona = """
+    INSERT INTO persona (
+        nombres, primer_apellido, segundo_apellido, tipo_documento, numero_documento, sexo,
+        nacionalidad, pais_nacimiento_id, estado_nacimiento_id, ciudad_nacimiento_id,
+        fecha_nacimiento, direccion, pais_residencia_id, estado_residencia_id, ciudad_residencia_id,
+        telefono, email
+    )
+    SELECT
+        %s, %s, %s, %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s, %s, %s,
+        %s, %s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM persona WHERE numero_documento = %s
+    )
     """
-    INSERT INTO distrito_militar (nombre)
-    VALUES (%s)
-    ON DUPLICATE KEY UPDATE nombre = VALUES(nombre)
-    """,
-    [("DM-01",), ("DM-02",), ("DM-03",)]
-)
 
-# =============================
-# DATOS DE PRUEBA: PERSONAS (3 ejemplos)
-# Usamos geos distintos con offsets para variar nacimiento/residencia
-# =============================
-personas = [
-    {
-        "doc": "CC1001", "tipo": "CC", "sexo": "F",
-        "nombres": "Ana Maria", "ap1": "Lopez", "ap2": "Gonzalez",
-        "nac_offset": 0, "res_offset": 10,
-        "fecha_nac": "1996-03-12", "dir": "Calle 10 #12-34",
-        "tel": "3001234567", "email": "ana.lopez@example.com"
-    },
-    {
-        "doc": "CE2001", "tipo": "CE", "sexo": "M",
-        "nombres": "Carlos Andres", "ap1": "Perez", "ap2": "Gomez",
-        "nac_offset": 1, "res_offset": 11,
-        "fecha_nac": "1992-07-25", "dir": "Carrera 45 #67-89",
-        "tel": "3017654321", "email": "carlos.perez@example.com"
-    },
-    {
-        "doc": "PAS3001", "tipo": "PAS", "sexo": "F",
-        "nombres": "Laura", "ap1": "Torres", "ap2": "Ramirez",
-        "nac_offset": 2, "res_offset": 12,
-        "fecha_nac": "1998-11-05", "dir": "Av. Principal 123",
-        "tel": "3025557788", "email": "laura.torres@example.com"
-    },
-]
-
-sql_persona = """
-INSERT INTO persona (
-    nombres, primer_apellido, segundo_apellido, tipo_documento, numero_documento, sexo,
-    nacionalidad, pais_nacimiento_id, estado_nacimiento_id, ciudad_nacimiento_id,
-    fecha_nacimiento, direccion, pais_residencia_id, estado_residencia_id, ciudad_residencia_id,
-    telefono, email
-)
-SELECT
-    %s, %s, %s, %s, %s, %s,
-    %s, %s, %s, %s,
-    %s, %s, %s, %s, %s,
-    %s, %s
-WHERE NOT EXISTS (
-    SELECT 1 FROM persona WHERE numero_documento = %s
-)
-"""
+    for p in personas:
+        nac = get_geo_triple(cursor, p["nac_offset"])
+        res = get_geo_triple(cursor, p["res_offset"])
+        if not nac or not res:
+            continue  # si no hay datos geográficos cargados, saltar
+
+        (pais_nac_id, estado_nac_id, ciudad_nac_id, nac_txt, *_rest1) = nac
+        (pais_res_id, estado_res_id, ciudad_res_id, *_rest2) = res
 
-for p in personas:
-    nac = get_geo_triple(p["nac_offset"])
-    res = get_geo_triple(p["res_offset"])
-    if not nac or not res:
-        continue  # si no hay datos geográficos cargados, saltar
-
-    (pais_nac_id, estado_nac_id, ciudad_nac_id, nac_txt, *_rest1) = nac
-    (pais_res_id, estado_res_id, ciudad_res_id, *_rest2) = res
-
-    params = (
-        p["nombres"], p["ap1"], p["ap2"], p["tipo"], p["doc"], p["sexo"],
-        nac_txt, pais_nac_id, estado_nac_id, ciudad_nac_id,
-        p["fecha_nac"], p["dir"], pais_res_id, estado_res_id, ciudad_res_id,
-        p["tel"], p["email"],
-        p["doc"]
+        params = (
+            p["nombres"], p["ap1"], p["ap2"], p["tipo"], p["doc"], p["sexo"],
+            nac_txt, pais_nac_id, estado_nac_id, ciudad_nac_id,
+            p["fecha_nac"], p["dir"], pais_res_id, estado_res_id, ciudad_res_id,
+            p["tel"], p["email"],
+            p["doc"]
+        )
+        cursor.execute(sql_persona, params)
+
+    # =============================
+    # DATOS DE PRUEBA: LIBRETA MILITAR (2 personas)
+    # =============================
+    sql_libreta = """
+    INSERT INTO libreta_militar (persona_id, clase, numero, distrito_id)
+    SELECT pe.persona_id, %s, %s, dm.distrito_id
+    FROM persona pe
+    JOIN distrito_militar dm ON dm.nombre = %s
+    WHERE pe.numero_documento = %s
+      AND NOT EXISTS (SELECT 1 FROM libreta_militar lm WHERE lm.persona_id = pe.persona_id)
+    """
+    cursor.execute(sql_libreta, ("Primera", "LM-0001", "DM-01", "CC1001"))
+    cursor.execute(sql_libreta, ("Segunda", "LM-0002", "DM-02", "CE2001"))
+
+    # =============================
+    # DATOS DE PRUEBA: IDIOMAS
+    # =============================
+    sql_idioma = """
+    INSERT INTO idioma (persona_id, nombre, habla, lee, escribe)
+    SELECT pe.persona_id, %s, %s, %s, %s
+    FROM persona pe
+    WHERE pe.numero_documento = %s
+      AND NOT EXISTS (
+        SELECT 1 FROM idioma i
+        WHERE i.persona_id = pe.persona_id AND i.nombre = %s
+      )
+    """
+    # Ana
+    cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "CC1001", "Español"))
+    cursor.execute(sql_idioma, ("Inglés",  "Bien",     "Bien",     "Regular", "CC1001", "Inglés"))
+    # Carlos
+    cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "CE2001", "Español"))
+    cursor.execute(sql_idioma, ("Portugués","Regular", "Regular", "Regular",  "CE2001", "Portugués"))
+    # Laura
+    cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "PAS3001", "Español"))
+    cursor.execute(sql_idioma, ("Inglés",  "Bien",     "Bien",     "Bien",     "PAS3001", "Inglés"))
+
+    # =============================
+    # DATOS DE PRUEBA: EDUCACIÓN BÁSICA
+    # =============================
+    sql_basica = """
+    INSERT INTO educacion_basica (persona_id, ultimo_grado_aprobado, titulo_obtenido, fecha_grado)
+    SELECT pe.persona_id, %s, %s, %s
+    FROM persona pe
+    WHERE pe.numero_documento = %s
+      AND NOT EXISTS (
+        SELECT 1 FROM educacion_basica b WHERE b.persona_id = pe.persona_id
+      )
+    """
+    cursor.execute(sql_basica, (11, "Bachiller Académico", "2013-11-30", "CC1001"))
+    cursor.execute(sql_basica, (11, "Bachiller Técnico",   "2010-11-30", "CE2001"))
+    cursor.execute(sql_basica, (11, "Bachiller Académico", "2015-11-30", "PAS3001"))
+
+    # =============================
+    # DATOS DE PRUEBA: EDUCACIÓN SUPERIOR
+    # =============================
+    sql_superior = """
+    INSERT INTO educacion_superior (persona_id, modalidad, nombre_estudio, semestre_aprobado, graduado, fecha_terminacion, numero_tarjeta)
+    SELECT pe.persona_id, %s, %s, %s, %s, %s, %s
+    FROM persona pe
+    WHERE pe.numero_documento = %s
+      AND NOT EXISTS (
+        SELECT 1 FROM educacion_superior s WHERE s.persona_id = pe.persona_id
+      )
+    """
+    cursor.execute(sql_superior, ("UN", "Ingeniería de Sistemas", 10, True,  "2020-12-15", "TARJ-001", "CC1001"))
+    cursor.execute(sql_superior, ("TL", "Tecnología en Redes",     6, True,  "2014-06-30", "TARJ-002", "CE2001"))
+    cursor.execute(sql_superior, ("ES", "Especialización en Datos", 2, False, None,         None,       "PAS3001"))
+
+    # =============================
+    # DATOS DE PRUEBA: EXPERIENCIA LABORAL
+    # (usa valores de texto para pais/departamento/municipio)
+    # =============================
+    sql_exp = """
+    INSERT INTO experiencia_laboral (
+      persona_id, sector, empresa, pais, departamento, municipio, correo_entidad, telefonos,
+      fecha_ingreso, fecha_retiro, cargo_contrato, dependencia, direccion_entidad, es_actual
     )
-    cursor.execute(sql_persona, params)
+    SELECT pe.persona_id, %s, %s,
+           p.nombre, e.nombre, c.nombre,
+           %s, %s, %s, %s, %s, %s, %s, %s
+    FROM persona pe
+    JOIN pais p    ON p.pais_id = pe.pais_residencia_id
+    JOIN estado e  ON e.estado_id = pe.estado_residencia_id
+    JOIN ciudad c  ON c.ciudad_id = pe.ciudad_residencia_id
+    WHERE pe.numero_documento = %s
+      AND NOT EXISTS (
+        SELECT 1 FROM experiencia_laboral ex WHERE ex.persona_id = pe.persona_id
+      )
+    """
+    cursor.execute(sql_exp, ("PRIVADA", "Tech Solutions S.A.S",
+                             "contacto@techsolutions.com", "3200000000",
+                             "2021-01-10", None, "Desarrolladora Backend", "TI",
+                             "Cra 12 #34-56", True, "CC1001"))
 
-# =============================
-# DATOS DE PRUEBA: LIBRETA MILITAR (2 personas)
-# =============================
-sql_libreta = """
-INSERT INTO libreta_militar (persona_id, clase, numero, distrito_id)
-SELECT pe.persona_id, %s, %s, dm.distrito_id
-FROM persona pe
-JOIN distrito_militar dm ON dm.nombre = %s
-WHERE pe.numero_documento = %s
-  AND NOT EXISTS (SELECT 1 FROM libreta_militar lm WHERE lm.persona_id = pe.persona_id)
-"""
-cursor.execute(sql_libreta, ("Primera", "LM-0001", "DM-01", "CC1001"))
-cursor.execute(sql_libreta, ("Segunda", "LM-0002", "DM-02", "CE2001"))
+    cursor.execute(sql_exp, ("PUBLICA", "Alcaldía Municipal",
+                             "recursoshumanos@alcaldia.gov", "6011234567",
+                             "2015-03-01", "2018-07-31", "Analista de Sistemas", "Sistemas",
+                             "Cl. 1 #2-03", False, "CE2001"))
 
-# =============================
-# DATOS DE PRUEBA: IDIOMAS
-# =============================
-sql_idioma = """
-INSERT INTO idioma (persona_id, nombre, habla, lee, escribe)
-SELECT pe.persona_id, %s, %s, %s, %s
-FROM persona pe
-WHERE pe.numero_documento = %s
-  AND NOT EXISTS (
-    SELECT 1 FROM idioma i
-    WHERE i.persona_id = pe.persona_id AND i.nombre = %s
-  )
-"""
-# Ana
-cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "CC1001", "Español"))
-cursor.execute(sql_idioma, ("Inglés",  "Bien",     "Bien",     "Regular", "CC1001", "Inglés"))
-# Carlos
-cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "CE2001", "Español"))
-cursor.execute(sql_idioma, ("Portugués","Regular", "Regular", "Regular",  "CE2001", "Portugués"))
-# Laura
-cursor.execute(sql_idioma, ("Español", "Muy Bien", "Muy Bien", "Muy Bien", "PAS3001", "Español"))
-cursor.execute(sql_idioma, ("Inglés",  "Bien",     "Bien",     "Bien",     "PAS3001", "Inglés"))
+    cursor.execute(sql_exp, ("PRIVADA", "Market Data LTDA",
+                             "rrhh@marketdata.com", "3101234567",
+                             "2023-05-15", None, "Data Analyst Jr", "Analytics",
+                             "Av 7 #80-20", True, "PAS3001"))
 
-# =============================
-# DATOS DE PRUEBA: EDUCACIÓN BÁSICA
-# =============================
-sql_basica = """
-INSERT INTO educacion_basica (persona_id, ultimo_grado_aprobado, titulo_obtenido, fecha_grado)
-SELECT pe.persona_id, %s, %s, %s
-FROM persona pe
-WHERE pe.numero_documento = %s
-  AND NOT EXISTS (
-    SELECT 1 FROM educacion_basica b WHERE b.persona_id = pe.persona_id
-  )
-"""
-cursor.execute(sql_basica, (11, "Bachiller Académico", "2013-11-30", "CC1001"))
-cursor.execute(sql_basica, (11, "Bachiller Técnico",   "2010-11-30", "CE2001"))
-cursor.execute(sql_basica, (11, "Bachiller Académico", "2015-11-30", "PAS3001"))
 
-# =============================
-# DATOS DE PRUEBA: EDUCACIÓN SUPERIOR
-# =============================
-sql_superior = """
-INSERT INTO educacion_superior (persona_id, modalidad, nombre_estudio, semestre_aprobado, graduado, fecha_terminacion, numero_tarjeta)
-SELECT pe.persona_id, %s, %s, %s, %s, %s, %s
-FROM persona pe
-WHERE pe.numero_documento = %s
-  AND NOT EXISTS (
-    SELECT 1 FROM educacion_superior s WHERE s.persona_id = pe.persona_id
-  )
-"""
-cursor.execute(sql_superior, ("UN", "Ingeniería de Sistemas", 10, True,  "2020-12-15", "TARJ-001", "CC1001"))
-cursor.execute(sql_superior, ("TL", "Tecnología en Redes",     6, True,  "2014-06-30", "TARJ-002", "CE2001"))
-cursor.execute(sql_superior, ("ES", "Especialización en Datos", 2, False, None,         None,       "PAS3001"))
+def main():
+    parser = argparse.ArgumentParser(description="Carga de ubicaciones y datos de prueba en hojaVida")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV pais,nacionalidad,estado,ciudad")
+    parser.add_argument("--paralelo", type=int, metavar="N",
+                        help="parsea por chunks en N procesos y escribe por N conexiones")
+    parser.add_argument("--chunk-mb", type=int, default=16, help="tamaño de cada chunk en MB (modo paralelo)")
+    parser.add_argument("--checkpoint", default=None, help="archivo de checkpoint (modo paralelo)")
+    parser.add_argument("--dry-run", action="store_true", help="ejecuta las inserciones y las revierte")
+    parser.add_argument("--benchmark", action="store_true", help="reporta throughput de parseo e inserción")
+    parser.add_argument("--sin-datos-prueba", action="store_true", help="solo carga las ubicaciones")
+    args = parser.parse_args()
 
-# =============================
-# DATOS DE PRUEBA: EXPERIENCIA LABORAL
-# (usa valores de texto para pais/departamento/municipio)
-# =============================
-sql_exp = """
-INSERT INTO experiencia_laboral (
-  persona_id, sector, empresa, pais, departamento, municipio, correo_entidad, telefonos,
-  fecha_ingreso, fecha_retiro, cargo_contrato, dependencia, direccion_entidad, es_actual
-)
-SELECT pe.persona_id, %s, %s,
-       p.nombre, e.nombre, c.nombre,
-       %s, %s, %s, %s, %s, %s, %s, %s
-FROM persona pe
-JOIN pais p    ON p.pais_id = pe.pais_residencia_id
-JOIN estado e  ON e.estado_id = pe.estado_residencia_id
-JOIN ciudad c  ON c.ciudad_id = pe.ciudad_residencia_id
-WHERE pe.numero_documento = %s
-  AND NOT EXISTS (
-    SELECT 1 FROM experiencia_laboral ex WHERE ex.persona_id = pe.persona_id
-  )
-"""
-cursor.execute(sql_exp, ("PRIVADA", "Tech Solutions S.A.S",
-                         "contacto@techsolutions.com", "3200000000",
-                         "2021-01-10", None, "Desarrolladora Backend", "TI",
-                         "Cra 12 #34-56", True, "CC1001"))
+    conexion = mysql.connector.connect(**DB_CONFIG)
+    conexion.autocommit = False
+    cursor = conexion.cursor()
 
-cursor.execute(sql_exp, ("PUBLICA", "Alcaldía Municipal",
-                         "recursoshumanos@alcaldia.gov", "6011234567",
-                         "2015-03-01", "2018-07-31", "Analista de Sistemas", "Sistemas",
-                         "Cl. 1 #2-03", False, "CE2001"))
+    if args.paralelo:
+        metricas = cargar_ubicaciones_paralelo(
+            conexion, cursor, args.csv, workers=args.paralelo, chunk_mb=args.chunk_mb,
+            checkpoint_path=args.checkpoint or args.csv + ".checkpoint", dry_run=args.dry_run,
+        )
+    else:
+        metricas = cargar_ubicaciones(conexion, cursor, args.csv, dry_run=args.dry_run)
+    if args.benchmark:
+        imprimir_benchmark(metricas)
 
-cursor.execute(sql_exp, ("PRIVADA", "Market Data LTDA",
-                         "rrhh@marketdata.com", "3101234567",
-                         "2023-05-15", None, "Data Analyst Jr", "Analytics",
-                         "Av 7 #80-20", True, "PAS3001"))
+    if not args.dry_run and not args.sin_datos_prueba:
+        cargar_datos_prueba(cursor)
+
+    # =============================
+    # COMMIT FINAL
+    # =============================
+    if args.dry_run:
+        conexion.rollback()
+    else:
+        conexion.commit()
+    cursor.close()
+    conexion.close()
+
+    print("Carga completada: ubicaciones + datos de prueba." if not args.dry_run else "Dry-run terminado: sin cambios.")
 
-# =============================
-# COMMIT FINAL
-# =============================
-conexion.commit()
-cursor.close()
-conexion.close()
 
-print("Carga completada: ubicaciones + datos de prueba.")
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,18 @@
 -- ===================================================
 -- Procedimiento: Reporte tiempo de experiencia
+-- Una sola llamada: busca la persona y calcula el reporte.
+-- Si el documento no existe no devuelve ningún result set.
 -- ===================================================
 
+USE hojaVida;
+
 DROP PROCEDURE IF EXISTS reporte_tiempo_experiencia;
 
 DELIMITER $$
 
 CREATE PROCEDURE reporte_tiempo_experiencia(IN p_numero_documento VARCHAR(255))
-BEGIN
+proc: BEGIN
   DECLARE v_persona_id INT DEFAULT NULL;
-  
-  -- Handler para errores SQL
-  DECLARE EXIT HANDLER FOR SQLEXCEPTION
-  BEGIN
-    GET DIAGNOSTICS CONDITION 1
-      @sqlstate = RETURNED_SQLSTATE,
-      @errno = MYSQL_ERRNO,
-      @text = MESSAGE_TEXT;
-    RESIGNAL;
-  END;
 
   -- Buscar la persona
   SELECT persona_id INTO v_persona_id
@@ -26,10 +20,9 @@ BEGIN
   WHERE numero_documento = p_numero_documento
   LIMIT 1;
 
-  -- Validar que existe la persona
+  -- Sin persona no hay reporte (la API responde 404)
   IF v_persona_id IS NULL THEN
-    SIGNAL SQLSTATE '45000'
-      SET MESSAGE_TEXT = CONCAT('No existe persona con documento: ', p_numero_documento);
+    LEAVE proc;
   END IF;
 
   -- Consulta principal
@@ -37,13 +30,26 @@ BEGIN
     SELECT
       CASE
         WHEN sector = 'PUBLICA' THEN 'SERVIDOR PÚBLICO'
-        WHEN (empresa LIKE '%independient%' OR empresa LIKE '%freelan%'
-              OR cargo_contrato LIKE '%independient%' OR cargo_contrato LIKE '%servicio%')
-          THEN 'TRABAJADOR INDEPENDIENTE'
+        WHEN (
+          INSTR(LOWER(empresa), 'independient') > 0 OR
+          INSTR(LOWER(empresa), 'freelan') > 0 OR
+          INSTR(LOWER(cargo_contrato), 'independient') > 0 OR
+          INSTR(LOWER(cargo_contrato), 'servicio') > 0
+        ) THEN 'TRABAJADOR INDEPENDIENTE'
         ELSE 'EMPLEADO DEL SECTOR PRIVADO'
       END AS categoria,
-      GREATEST(fecha_ingreso, DATE('1900-01-01')) AS ini,
-      LEAST(COALESCE(fecha_retiro, CURDATE()), CURDATE()) AS fin
+
+      -- inicio siempre válido y no futuro
+      GREATEST(DATE(fecha_ingreso), DATE('1900-01-01')) AS ini,
+
+      -- fin: si es_actual=1 o no hay retiro => hoy; si retiro > hoy => hoy; si no, retiro
+      LEAST(
+        COALESCE(
+          CASE WHEN es_actual = 1 THEN CURDATE() ELSE fecha_retiro END,
+          CURDATE()
+        ),
+        CURDATE()
+      ) AS fin
     FROM experiencia_laboral
     WHERE persona_id = v_persona_id
       AND fecha_ingreso IS NOT NULL
@@ -53,16 +59,23 @@ BEGIN
     FROM base
     WHERE fin >= ini
   ),
-  orden AS (
+
+  -- Colapso POR CATEGORÍA
+  -- Se compara con el mayor fin anterior (no solo con el inmediato) para que
+  -- un periodo contenido en otro no parta la isla
+  orden_cat AS (
     SELECT
       categoria, ini, fin,
       CASE
-        WHEN LAG(fin) OVER (PARTITION BY categoria ORDER BY ini) >= ini THEN 0
+        WHEN MAX(fin) OVER (
+          PARTITION BY categoria ORDER BY ini
+          ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ) >= ini THEN 0
         ELSE 1
       END AS nueva_isla
     FROM rangos
   ),
-  islas AS (
+  islas_cat AS (
     SELECT
       categoria, ini, fin,
       SUM(nueva_isla) OVER (
@@ -70,18 +83,18 @@ BEGIN
         ORDER BY ini
         ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
       ) AS grp
-    FROM orden
+    FROM orden_cat
   ),
-  colapsado AS (
+  colapsado_cat AS (
     SELECT categoria, MIN(ini) AS ini, MAX(fin) AS fin
-    FROM islas
+    FROM islas_cat
     GROUP BY categoria, grp
   ),
   meses_categoria AS (
     SELECT
       categoria,
       COALESCE(SUM(TIMESTAMPDIFF(MONTH, ini, fin)), 0) AS total_meses
-    FROM colapsado
+    FROM colapsado_cat
     GROUP BY categoria
   ),
   detalle AS (
@@ -94,15 +107,41 @@ BEGIN
     SELECT 'TRABAJADOR INDEPENDIENTE',
            COALESCE((SELECT total_meses FROM meses_categoria WHERE categoria='TRABAJADOR INDEPENDIENTE'), 0)
   ),
+
+  -- Colapso GLOBAL (todas las categorías) para TOTAL sin doble conteo
+  orden_global AS (
+    SELECT
+      ini, fin,
+      CASE
+        WHEN MAX(fin) OVER (
+          ORDER BY ini
+          ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ) >= ini THEN 0
+        ELSE 1
+      END AS nueva_isla
+    FROM rangos
+  ),
+  islas_global AS (
+    SELECT
+      ini, fin,
+      SUM(nueva_isla) OVER (ORDER BY ini ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS grp
+    FROM orden_global
+  ),
+  colapsado_global AS (
+    SELECT MIN(ini) AS ini, MAX(fin) AS fin
+    FROM islas_global
+    GROUP BY grp
+  ),
   totales AS (
     SELECT 'TOTAL TIEMPO EXPERIENCIA' AS categoria,
-           COALESCE(SUM(total_meses), 0) AS total_meses
-    FROM detalle
+           COALESCE(SUM(TIMESTAMPDIFF(MONTH, ini, fin)), 0) AS total_meses
+    FROM colapsado_global
   )
   SELECT
     s.categoria AS ocupacion,
     FLOOR(s.total_meses / 12) AS anios,
-    (s.total_meses % 12) AS meses
+    MOD(s.total_meses, 12) AS meses,
+    s.total_meses AS total_meses_calculados
   FROM (
     SELECT * FROM detalle
     UNION ALL
@@ -117,8 +156,91 @@ BEGIN
   );
 END$$
 
+-- ===================================================
+-- Procedimiento: Hoja de vida completa de una persona
+-- Un solo viaje: la persona y luego un result set por tabla hija
+-- (libreta_militar, idioma, educacion_basica, educacion_superior,
+-- experiencia_laboral), cada uno por el índice de persona_id.
+-- Si el documento no existe no devuelve ningún result set.
+-- ===================================================
+
+DROP PROCEDURE IF EXISTS hoja_vida_persona$$
+
+CREATE PROCEDURE hoja_vida_persona(IN p_numero_documento VARCHAR(255))
+proc: BEGIN
+  DECLARE v_persona_id INT DEFAULT NULL;
+
+  SELECT persona_id INTO v_persona_id
+  FROM persona
+  WHERE numero_documento = p_numero_documento
+  LIMIT 1;
+
+  IF v_persona_id IS NULL THEN
+    LEAVE proc;
+  END IF;
+
+  SELECT * FROM persona WHERE persona_id = v_persona_id;
+
+  SELECT l.libreta_id, l.clase, l.numero, l.distrito_id, d.nombre AS distrito
+  FROM libreta_militar l
+  LEFT JOIN distrito_militar d ON d.distrito_id = l.distrito_id
+  WHERE l.persona_id = v_persona_id;
+
+  SELECT idioma_id, nombre, habla, lee, escribe
+  FROM idioma
+  WHERE persona_id = v_persona_id
+  ORDER BY idioma_id;
+
+  SELECT basica_id, ultimo_grado_aprobado, titulo_obtenido, fecha_grado
+  FROM educacion_basica
+  WHERE persona_id = v_persona_id
+  ORDER BY fecha_grado DESC, basica_id;
+
+  SELECT superior_id, modalidad, nombre_estudio, semestre_aprobado, graduado,
+         fecha_terminacion, numero_tarjeta
+  FROM educacion_superior
+  WHERE persona_id = v_persona_id
+  ORDER BY fecha_terminacion DESC, superior_id;
+
+  SELECT id_exp, sector, empresa, pais, departamento, municipio, correo_entidad,
+         telefonos, fecha_ingreso, fecha_retiro, cargo_contrato, dependencia,
+         direccion_entidad, es_actual
+  FROM experiencia_laboral
+  WHERE persona_id = v_persona_id
+  ORDER BY fecha_ingreso DESC, id_exp;
+END$$
+
+-- ===================================================
+-- Triggers: registro de cambios en experiencia_laboral
+-- La API los lee para invalidar su caché de reportes por persona.
+-- ===================================================
+
+DROP TRIGGER IF EXISTS experiencia_laboral_ai$$
+CREATE TRIGGER experiencia_laboral_ai AFTER INSERT ON experiencia_laboral
+FOR EACH ROW
+BEGIN
+  INSERT INTO experiencia_cambios (persona_id) VALUES (NEW.persona_id);
+END$$
+
+DROP TRIGGER IF EXISTS experiencia_laboral_au$$
+CREATE TRIGGER experiencia_laboral_au AFTER UPDATE ON experiencia_laboral
+FOR EACH ROW
+BEGIN
+  INSERT INTO experiencia_cambios (persona_id) VALUES (NEW.persona_id);
+  IF NEW.persona_id <> OLD.persona_id THEN
+    INSERT INTO experiencia_cambios (persona_id) VALUES (OLD.persona_id);
+  END IF;
+END$$
+
+DROP TRIGGER IF EXISTS experiencia_laboral_ad$$
+CREATE TRIGGER experiencia_laboral_ad AFTER DELETE ON experiencia_laboral
+FOR EACH ROW
+BEGIN
+  INSERT INTO experiencia_cambios (persona_id) VALUES (OLD.persona_id);
+END$$
+
 DELIMITER ;
 
 -- =========================================
 -- FIN DEL SCRIPT
--- =========================================
\ No newline at end of file
+-- =========================================
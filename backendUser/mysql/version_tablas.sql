@@ -0,0 +1,252 @@
+-- ===================================================
+-- Versiones por tabla (ETag de la API)
+-- Cada escritura agrega una fila a version_cambios; la versión
+-- de una tabla es cuántos cambios lleva: los plegados en
+-- version_plegado más los que siguen en el registro. La API
+-- pliega el registro en segundo plano, así no crece sin límite.
+-- Solo se inserta: dos escrituras concurrentes no se esperan
+-- por un contador compartido. La ingesta masiva de la API pone
+-- @api_escritura_masiva y registra un cambio por lote.
+-- ===================================================
+
+USE hojaVida;
+
+DROP TABLE IF EXISTS version_tabla;
+
+CREATE TABLE IF NOT EXISTS version_cambios (
+  cambio_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  tabla VARCHAR(64) NOT NULL,
+  KEY idx_version_cambios_tabla (tabla, cambio_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Cambios ya plegados por tabla (solo los actualiza el plegado de la API)
+CREATE TABLE IF NOT EXISTS version_plegado (
+  tabla VARCHAR(64) NOT NULL PRIMARY KEY,
+  cambios BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO version_plegado (tabla) VALUES
+  ('persona'),
+  ('pais'),
+  ('estado'),
+  ('ciudad'),
+  ('distrito_militar'),
+  ('libreta_militar'),
+  ('idioma'),
+  ('educacion_basica'),
+  ('educacion_superior'),
+  ('experiencia_laboral');
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS persona_version_ai$$
+CREATE TRIGGER persona_version_ai AFTER INSERT ON persona
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('persona');
+  END IF$$
+
+DROP TRIGGER IF EXISTS persona_version_au$$
+CREATE TRIGGER persona_version_au AFTER UPDATE ON persona
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('persona');
+  END IF$$
+
+DROP TRIGGER IF EXISTS persona_version_ad$$
+CREATE TRIGGER persona_version_ad AFTER DELETE ON persona
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('persona');
+  END IF$$
+
+DROP TRIGGER IF EXISTS pais_version_ai$$
+CREATE TRIGGER pais_version_ai AFTER INSERT ON pais
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('pais');
+  END IF$$
+
+DROP TRIGGER IF EXISTS pais_version_au$$
+CREATE TRIGGER pais_version_au AFTER UPDATE ON pais
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('pais');
+  END IF$$
+
+DROP TRIGGER IF EXISTS pais_version_ad$$
+CREATE TRIGGER pais_version_ad AFTER DELETE ON pais
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('pais');
+  END IF$$
+
+DROP TRIGGER IF EXISTS estado_version_ai$$
+CREATE TRIGGER estado_version_ai AFTER INSERT ON estado
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('estado');
+  END IF$$
+
+DROP TRIGGER IF EXISTS estado_version_au$$
+CREATE TRIGGER estado_version_au AFTER UPDATE ON estado
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('estado');
+  END IF$$
+
+DROP TRIGGER IF EXISTS estado_version_ad$$
+CREATE TRIGGER estado_version_ad AFTER DELETE ON estado
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('estado');
+  END IF$$
+
+DROP TRIGGER IF EXISTS ciudad_version_ai$$
+CREATE TRIGGER ciudad_version_ai AFTER INSERT ON ciudad
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('ciudad');
+  END IF$$
+
+DROP TRIGGER IF EXISTS ciudad_version_au$$
+CREATE TRIGGER ciudad_version_au AFTER UPDATE ON ciudad
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('ciudad');
+  END IF$$
+
+DROP TRIGGER IF EXISTS ciudad_version_ad$$
+CREATE TRIGGER ciudad_version_ad AFTER DELETE ON ciudad
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('ciudad');
+  END IF$$
+
+DROP TRIGGER IF EXISTS distrito_militar_version_ai$$
+CREATE TRIGGER distrito_militar_version_ai AFTER INSERT ON distrito_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('distrito_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS distrito_militar_version_au$$
+CREATE TRIGGER distrito_militar_version_au AFTER UPDATE ON distrito_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('distrito_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS distrito_militar_version_ad$$
+CREATE TRIGGER distrito_militar_version_ad AFTER DELETE ON distrito_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('distrito_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS libreta_militar_version_ai$$
+CREATE TRIGGER libreta_militar_version_ai AFTER INSERT ON libreta_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('libreta_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS libreta_militar_version_au$$
+CREATE TRIGGER libreta_militar_version_au AFTER UPDATE ON libreta_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('libreta_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS libreta_militar_version_ad$$
+CREATE TRIGGER libreta_militar_version_ad AFTER DELETE ON libreta_militar
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('libreta_militar');
+  END IF$$
+
+DROP TRIGGER IF EXISTS idioma_version_ai$$
+CREATE TRIGGER idioma_version_ai AFTER INSERT ON idioma
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('idioma');
+  END IF$$
+
+DROP TRIGGER IF EXISTS idioma_version_au$$
+CREATE TRIGGER idioma_version_au AFTER UPDATE ON idioma
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('idioma');
+  END IF$$
+
+DROP TRIGGER IF EXISTS idioma_version_ad$$
+CREATE TRIGGER idioma_version_ad AFTER DELETE ON idioma
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('idioma');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_basica_version_ai$$
+CREATE TRIGGER educacion_basica_version_ai AFTER INSERT ON educacion_basica
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_basica');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_basica_version_au$$
+CREATE TRIGGER educacion_basica_version_au AFTER UPDATE ON educacion_basica
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_basica');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_basica_version_ad$$
+CREATE TRIGGER educacion_basica_version_ad AFTER DELETE ON educacion_basica
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_basica');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_superior_version_ai$$
+CREATE TRIGGER educacion_superior_version_ai AFTER INSERT ON educacion_superior
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_superior');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_superior_version_au$$
+CREATE TRIGGER educacion_superior_version_au AFTER UPDATE ON educacion_superior
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_superior');
+  END IF$$
+
+DROP TRIGGER IF EXISTS educacion_superior_version_ad$$
+CREATE TRIGGER educacion_superior_version_ad AFTER DELETE ON educacion_superior
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('educacion_superior');
+  END IF$$
+
+DROP TRIGGER IF EXISTS experiencia_laboral_version_ai$$
+CREATE TRIGGER experiencia_laboral_version_ai AFTER INSERT ON experiencia_laboral
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('experiencia_laboral');
+  END IF$$
+
+DROP TRIGGER IF EXISTS experiencia_laboral_version_au$$
+CREATE TRIGGER experiencia_laboral_version_au AFTER UPDATE ON experiencia_laboral
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('experiencia_laboral');
+  END IF$$
+
+DROP TRIGGER IF EXISTS experiencia_laboral_version_ad$$
+CREATE TRIGGER experiencia_laboral_version_ad AFTER DELETE ON experiencia_laboral
+FOR EACH ROW
+  IF @api_escritura_masiva IS NULL THEN
+    INSERT INTO version_cambios (tabla) VALUES ('experiencia_laboral');
+  END IF$$
+
+DELIMITER ;
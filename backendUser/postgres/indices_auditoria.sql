@@ -0,0 +1,16 @@
+-- =========================================
+-- Índices detectados por api/plan_audit.py
+-- =========================================
+
+-- obtenerPaisesEstadosCiudades paginado: el prefijo c.name >= ... usa este índice
+CREATE INDEX IF NOT EXISTS idx_countries_name ON countries(name);
+
+-- recorrido de estados por país en el orden de la paginación
+CREATE INDEX IF NOT EXISTS idx_states_country_name ON states(country_id, name);
+
+-- ciudades por estado en el orden (name, id) de la paginación y de listarCiudadesRepetidasPais
+CREATE INDEX IF NOT EXISTS idx_cities_state_name_id ON cities(state_id, name, id);
+
+ANALYZE countries;
+ANALYZE states;
+ANALYZE cities;
@@ -0,0 +1,46 @@
+-- ===================================================
+-- Versiones por tabla (ETag de la API)
+-- Igual que en MySQL/MariaDB: cada escritura agrega una fila a
+-- version_cambios y la versión de una tabla es cuántos cambios
+-- lleva (los plegados en version_plegado más los del registro).
+-- Los triggers son por sentencia: una carga de muchas filas
+-- registra un solo cambio.
+-- ===================================================
+
+CREATE TABLE IF NOT EXISTS version_cambios (
+  cambio_id BIGSERIAL PRIMARY KEY,
+  tabla VARCHAR(64) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_version_cambios_tabla ON version_cambios(tabla, cambio_id);
+
+-- Cambios ya plegados por tabla (solo los actualiza el plegado de la API)
+CREATE TABLE IF NOT EXISTS version_plegado (
+  tabla VARCHAR(64) PRIMARY KEY,
+  cambios BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO version_plegado (tabla) VALUES
+  ('countries'),
+  ('states'),
+  ('cities')
+ON CONFLICT (tabla) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION registrar_version() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO version_cambios (tabla) VALUES (TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER countries_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON countries
+FOR EACH STATEMENT EXECUTE FUNCTION registrar_version();
+
+CREATE OR REPLACE TRIGGER states_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON states
+FOR EACH STATEMENT EXECUTE FUNCTION registrar_version();
+
+CREATE OR REPLACE TRIGGER cities_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cities
+FOR EACH STATEMENT EXECUTE FUNCTION registrar_version();
@@ -1,6 +1,11 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import requests
+from requests.adapters import HTTPAdapter
+from bisect import bisect_left
+from collections import OrderedDict
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -11,6 +16,203 @@ app = Flask(__name__)
 # Configuracion de la API base
 API_BASE = os.getenv('API_BASE', 'http://localhost:8080')
 
+# Configuracion del proxy
+PROXY_POOL_SIZE = int(os.getenv('PROXY_POOL_SIZE', '20'))
+PROXY_TIMEOUT = float(os.getenv('PROXY_TIMEOUT', '30'))
+PROXY_CONNECT_TIMEOUT = float(os.getenv('PROXY_CONNECT_TIMEOUT', '5'))
+PROXY_CHUNK_BYTES = 64 * 1024
+
+# Headers que se reenvian del navegador a la API y de la API al navegador
+HEADERS_PETICION = (
+    'Content-Type', 'Accept', 'Accept-Encoding',
+    'If-None-Match', 'If-Modified-Since', 'Cache-Control',
+)
+HEADERS_RESPUESTA = (
+    'Content-Type', 'Content-Length', 'Content-Encoding',
+    'ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Vary',
+    'X-Next-After', 'Retry-After', 'Server-Timing',
+)
+
+# Sesion compartida: conexiones keep-alive reutilizadas entre peticiones
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PROXY_POOL_SIZE, pool_block=False)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+# Metricas del proxy (GET /metrics): latencia de la API vista desde el proxy
+METRICAS_BUCKETS = tuple(
+    float(b) for b in os.getenv(
+        'PROXY_METRICAS_BUCKETS', '0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+    ).split(',')
+)
+
+
+class Histograma:
+    """Histograma por combinacion de etiquetas, en el formato de texto de Prometheus"""
+
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [0] * (len(METRICAS_BUCKETS) + 1) + [0.0]
+            serie[bisect_left(METRICAS_BUCKETS, valor)] += 1
+            serie[-1] += valor
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        with self._lock:
+            series = sorted((etiquetas, list(serie)) for etiquetas, serie in self._series.items())
+        for etiquetas, serie in series:
+            base = ','.join(f'{n}="{v}"' for n, v in zip(self.etiquetas, etiquetas))
+            acumulado = 0
+            for limite, cuenta in zip(METRICAS_BUCKETS, serie):
+                acumulado += cuenta
+                lineas.append(f'{self.nombre}_bucket{{{base},le="{limite:g}"}} {acumulado}')
+            acumulado += serie[-2]
+            lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {acumulado}')
+            lineas.append(f'{self.nombre}_sum{{{base}}} {serie[-1]:.6f}')
+            lineas.append(f'{self.nombre}_count{{{base}}} {acumulado}')
+        return lineas
+
+
+# resultado: HIT / REVALIDATED (cache), MISS (fue a la API), COALESCED (asgi), ERROR
+PROXY_PETICIONES = Histograma(
+    'proxy_request_duration_seconds', 'Duracion de /api/* en el proxy hasta el ultimo byte',
+    ('upstream', 'resultado'),
+)
+PROXY_UPSTREAM = Histograma(
+    'proxy_upstream_ttfb_seconds', 'Desde enviar la peticion a la API hasta recibir sus headers',
+    ('upstream', 'status'),
+)
+PROXY_API = Histograma(
+    'proxy_upstream_app_seconds', 'Tiempo que reporta la API en Server-Timing (app;dur)',
+    ('upstream',),
+)
+
+
+def upstream_de(path):
+    """Upstream de una ruta: el primer segmento (mundo, hoja_vida, factura_db...)"""
+    return path.split('/', 1)[0]
+
+def observar_upstream(upstream, status, headers, segundos):
+    """Registra el tiempo hasta los headers de la API y el que ella reporta
+
+    La diferencia entre los dos es red mas espera en el pool del proxy.
+    """
+    PROXY_UPSTREAM.observar(segundos, upstream, str(status))
+    for metrica in headers.get('Server-Timing', '').split(','):
+        nombre, _, parametros = metrica.strip().partition(';')
+        if nombre == 'app' and parametros.startswith('dur='):
+            try:
+                PROXY_API.observar(float(parametros[4:]) / 1000, upstream)
+            except ValueError:
+                pass
+
+def medir_total(bloques, inicio, upstream, resultado):
+    """Reenvia los bloques y registra la duracion total al terminar (o al cortarse)"""
+    try:
+        yield from bloques
+    finally:
+        bloques.close()
+        PROXY_PETICIONES.observar(time.perf_counter() - inicio, upstream, resultado)
+
+# Cache compartida del proxy (solo respuestas publicas de la API)
+PROXY_CACHE_SIZE = int(os.getenv('PROXY_CACHE_SIZE', '256'))
+PROXY_CACHE_MAX_BYTES = int(os.getenv('PROXY_CACHE_MAX_BYTES', str(1024 * 1024)))
+
+
+def directivas(cache_control):
+    """'public, max-age=60' -> {'public': None, 'max-age': '60'}"""
+    resultado = {}
+    for parte in (cache_control or '').split(','):
+        nombre, _, valor = parte.strip().partition('=')
+        if nombre:
+            resultado[nombre.lower()] = valor.strip('"') or None
+    return resultado
+
+
+def vigencia(cache_control):
+    """Segundos que una respuesta compartida sigue fresca, o None si no se puede guardar"""
+    d = directivas(cache_control)
+    if 'private' in d or 'no-store' in d:
+        return None
+    if 'no-cache' in d:
+        return 0
+    valor = d.get('s-maxage') or d.get('max-age')
+    return int(valor) if valor and valor.isdigit() else 0
+
+
+class ProxyCache:
+    """Cache LRU de respuestas GET de la API que respeta Cache-Control y ETag
+
+    Una entrada fresca se sirve sin llamar a la API; una vencida con ETag se
+    revalida con If-None-Match y, si la API responde 304, se reutiliza. Las
+    entradas no se modifican despues de guardarse: renovar una la reemplaza
+    por otra, asi quien ya la tiene no ve headers a medio cambiar.
+    """
+
+    def __init__(self, maxsize=256, max_bytes=1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidaciones = 0
+        self.misses = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._data.get(clave)
+            if entrada is not None:
+                self._data.move_to_end(clave)
+            return entrada
+
+    def set(self, clave, entrada):
+        with self._lock:
+            self._data[clave] = entrada
+            self._data.move_to_end(clave)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def renovar(self, clave, entrada, cache_control):
+        """Copia de la entrada revalidada (con el Cache-Control nuevo, si llego) que reemplaza a la guardada"""
+        nueva = dict(entrada, guardado=time.monotonic())
+        if cache_control is not None:
+            nueva['headers'] = dict(entrada['headers'], **{'Cache-Control': cache_control})
+            nueva['vigencia'] = vigencia(cache_control) or 0
+        with self._lock:
+            self.revalidaciones += 1
+            # Si otra peticion ya la reemplazo o la saco, se deja la suya
+            if self._data.get(clave) is entrada:
+                self._data[clave] = nueva
+        return nueva
+
+    def contar(self, contador):
+        """Suma uno a hits o misses"""
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'revalidaciones': self.revalidaciones,
+                'misses': self.misses,
+            }
+
+
+proxy_cache = ProxyCache(PROXY_CACHE_SIZE, PROXY_CACHE_MAX_BYTES)
+
 @app.route('/')
 def index():
     """Pagina principal"""
@@ -33,61 +235,180 @@ def historial_factura():
 
 @app.route('/api/<path:path>', methods=['GET', 'POST'])
 def proxy_api(path):
-    """Proxy para reenviar peticiones a la API externa y evitar CORS"""
+    """Proxy para reenviar peticiones a la API externa y evitar CORS
+
+    Reutiliza conexiones keep-alive del pool de la sesion y transmite el cuerpo
+    de la API tal cual llega (sin decodificar ni descomprimir). Los GET publicos
+    pasan por la cache compartida del proxy.
+    """
+    inicio = time.perf_counter()
+    upstream = upstream_de(path)
     try:
-        # Construir URL completa de la API
+        # Construir URL completa de la API (query string sin reinterpretar)
         api_url = f"{API_BASE}/{path}"
-        
-        # Preparar headers minimos
-        headers = {}
-        if request.content_type:
-            headers['Content-Type'] = request.content_type
-        
-        # Manejar peticion GET
-        if request.method == 'GET':
-            response = requests.get(
-                api_url,
-                params=request.args,
-                headers=headers,
-                timeout=30
-            )
-        
-        # Manejar peticion POST
-        elif request.method == 'POST':
-            if request.content_type and 'application/json' in request.content_type:
-                # Enviar como JSON
-                json_data = request.get_json(silent=True)
-                response = requests.post(
-                    api_url,
-                    json=json_data,
-                    headers=headers,
-                    timeout=30
-                )
-            else:
-                # Enviar como form-data
-                response = requests.post(
-                    api_url,
-                    data=request.form,
-                    files=request.files,
-                    headers=headers,
-                    timeout=30
-                )
-        
+        if request.query_string:
+            api_url += '?' + request.query_string.decode('latin-1')
+
+        # Headers del navegador que la API necesita ver
+        headers = {
+            nombre: request.headers[nombre]
+            for nombre in HEADERS_PETICION if nombre in request.headers
+        }
+        # Sin Accept-Encoding del navegador no se pide compresion: el cuerpo pasa sin tocar
+        headers.setdefault('Accept-Encoding', 'identity')
+
+        # Cache compartida: la clave incluye Accept-Encoding (la API varia por compresion)
+        clave = (api_url, headers['Accept-Encoding']) if request.method == 'GET' else None
+        entrada = proxy_cache.get(clave) if clave else None
+        revalidando = False
+        if entrada is not None:
+            if 'no-cache' not in directivas(request.headers.get('Cache-Control')) and \
+                    time.monotonic() - entrada['guardado'] < entrada['vigencia']:
+                proxy_cache.contar('hits')
+                PROXY_PETICIONES.observar(time.perf_counter() - inicio, upstream, 'HIT')
+                return desde_cache(entrada, 'HIT')
+            if entrada['headers'].get('ETag') and 'If-None-Match' not in headers:
+                headers['If-None-Match'] = entrada['headers']['ETag']
+                revalidando = True
+        elif clave:
+            proxy_cache.contar('misses')
+
+        # GET sin cuerpo; POST reenvia los bytes originales (JSON, form o multipart)
+        data = request.get_data(cache=False) if request.method == 'POST' else None
+
+        enviado = time.perf_counter()
+        response = session.request(
+            request.method,
+            api_url,
+            data=data,
+            headers=headers,
+            stream=True,
+            allow_redirects=False,
+            timeout=(PROXY_CONNECT_TIMEOUT, PROXY_TIMEOUT)
+        )
+        observar_upstream(upstream, response.status_code, response.headers, time.perf_counter() - enviado)
+
+        if revalidando and response.status_code == 304:
+            # Sigue vigente: se renueva la entrada con los headers nuevos de la API
+            response.close()
+            entrada = proxy_cache.renovar(clave, entrada, response.headers.get('Cache-Control'))
+            PROXY_PETICIONES.observar(time.perf_counter() - inicio, upstream, 'REVALIDATED')
+            return desde_cache(entrada, 'REVALIDATED')
+
         # Preparar respuesta
-        response_headers = {}
-        if 'content-type' in response.headers:
-            response_headers['Content-Type'] = response.headers['content-type']
-        
-        return response.text, response.status_code, response_headers
-        
+        response_headers = {
+            nombre: response.headers[nombre]
+            for nombre in HEADERS_RESPUESTA if nombre in response.headers
+        }
+
+        cuerpo = transmitir(response)
+        if clave and guardable(response):
+            cuerpo = transmitir_y_guardar(cuerpo, clave, response.status_code, response_headers)
+        cuerpo = medir_total(cuerpo, inicio, upstream, 'MISS')
+
+        return Response(
+            cuerpo,
+            status=response.status_code,
+            headers=response_headers,
+            direct_passthrough=True
+        )
+
     except requests.exceptions.Timeout:
-        return jsonify({"error": "Timeout al conectar con la API"}), 502
+        return error_proxy(inicio, upstream, "Timeout al conectar con la API", 502)
     except requests.exceptions.ConnectionError:
-        return jsonify({"error": "Error de conexion con la API"}), 502
+        return error_proxy(inicio, upstream, "Error de conexion con la API", 502)
     except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error en la peticion: {str(e)}"}), 502
+        return error_proxy(inicio, upstream, f"Error en la peticion: {str(e)}", 502)
+    except Exception as e:
+        return error_proxy(inicio, upstream, f"Error interno del proxy: {str(e)}", 500)
+
+def error_proxy(inicio, upstream, mensaje, status):
+    PROXY_PETICIONES.observar(time.perf_counter() - inicio, upstream, 'ERROR')
+    return jsonify({"error": mensaje}), status
+
+@app.route('/proxy/cache')
+def proxy_cache_stats():
+    """Contadores de la cache compartida del proxy"""
+    return jsonify(proxy_cache.stats())
+
+@app.route('/metrics')
+def metrics():
+    """Metricas del proxy en formato de texto de Prometheus"""
+    lineas = []
+    for metrica in (PROXY_PETICIONES, PROXY_UPSTREAM, PROXY_API):
+        lineas.extend(metrica.exponer())
+    return Response('\n'.join(lineas) + '\n', mimetype='text/plain; version=0.0.4')
+
+def guardable(response):
+    """Solo 200 publicos, con tamano conocido o acotado y sin Vary: *"""
+    if response.status_code != 200 or vigencia(response.headers.get('Cache-Control')) is None:
+        return False
+    if response.headers.get('Vary', '').strip() == '*':
+        return False
+    if 'Cache-Control' not in response.headers and 'ETag' not in response.headers:
+        return False
+    longitud = response.headers.get('Content-Length')
+    return longitud is None or int(longitud) <= proxy_cache.max_bytes
+
+def transmitir_y_guardar(bloques, clave, status, headers):
+    """Reenvia los bloques y, si la respuesta termino completa y cabe, la guarda"""
+    partes, total = [], 0
+    try:
+        for bloque in bloques:
+            if partes is not None:
+                total += len(bloque)
+                if total > proxy_cache.max_bytes:
+                    partes = None
+                else:
+                    partes.append(bloque)
+            yield bloque
+    finally:
+        # Si el navegador se desconecta tambien se corta la peticion a la API
+        bloques.close()
+    if partes is not None and (
+            'Content-Length' not in headers or int(headers['Content-Length']) == total):
+        proxy_cache.set(clave, {
+            'status': status,
+            'headers': dict(headers),
+            'cuerpo': b''.join(partes),
+            'guardado': time.monotonic(),
+            'vigencia': vigencia(headers.get('Cache-Control')),
+        })
+
+def coincide_etag(etag, if_none_match):
+    """Comparacion debil de If-None-Match (ignora el prefijo W/)"""
+    if not etag or not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    etiquetas = [e.strip().removeprefix('W/') for e in if_none_match.split(',')]
+    return etag.removeprefix('W/') in etiquetas
+
+def desde_cache(entrada, estado):
+    """Respuesta desde la cache (304 si el navegador ya tiene esa version)"""
+    headers = dict(entrada['headers'])
+    headers['Age'] = str(int(time.monotonic() - entrada['guardado']))
+    headers['X-Cache'] = estado
+    if coincide_etag(headers.get('ETag'), request.headers.get('If-None-Match')):
+        headers.pop('Content-Length', None)
+        return Response(status=304, headers=headers)
+    return Response(entrada['cuerpo'], status=entrada['status'], headers=headers)
+
+def transmitir(response):
+    """Bytes crudos de la API por bloques; cierra la peticion a la API al terminar
+
+    Si el navegador se desconecta, el servidor cierra este generador y el
+    finally corta la conexion con la API en vez de seguir leyendo el cuerpo.
+    """
+    try:
+        for bloque in response.raw.stream(PROXY_CHUNK_BYTES, decode_content=False):
+            yield bloque
     except Exception as e:
-        return jsonify({"error": f"Error interno del proxy: {str(e)}"}), 500
+        # Los headers ya se enviaron: solo queda cortar la respuesta
+        app.logger.warning("Error transmitiendo %s: %s", response.url, e)
+    finally:
+        response.close()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Servidor de desarrollo; el depurador (y el reloader) solo con FRONTEND_DEBUG=1
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FRONTEND_DEBUG', '0') == '1')
@@ -0,0 +1,292 @@
+"""Modo asincrono (ASGI) del frontend
+
+El proxy /api/<path> corre sobre asyncio con un cliente httpx compartido, asi
+que una llamada lenta a la API no ocupa un hilo. Las paginas (index, mundo,
+hojaVida, historialFactura) y los estaticos siguen saliendo de la app Flask de
+app.py a traves de WsgiToAsgi.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Variables de entorno (ademas de las de app.py):
+    PROXY_LIMITE          llamadas simultaneas por upstream (por defecto 32)
+    PROXY_LIMITES         limites por upstream, ej. "hoja_vida=8,mundo=16"
+    PROXY_COLA_TIMEOUT    segundos de espera por un cupo antes de responder 503
+"""
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    API_BASE, HEADERS_PETICION, HEADERS_RESPUESTA, PROXY_CHUNK_BYTES, PROXY_CONNECT_TIMEOUT,
+    PROXY_PETICIONES, PROXY_POOL_SIZE, PROXY_TIMEOUT, app as flask_app, observar_upstream, upstream_de,
+)
+
+PROXY_LIMITE = int(os.getenv('PROXY_LIMITE', '32'))
+PROXY_LIMITES = {
+    nombre.strip(): int(valor)
+    for nombre, valor in (
+        par.split('=', 1) for par in os.getenv('PROXY_LIMITES', '').split(',') if '=' in par
+    )
+}
+PROXY_COLA_TIMEOUT = float(os.getenv('PROXY_COLA_TIMEOUT', '10'))
+
+# Bloques en cola por cliente: el upstream espera al cliente mas lento
+COLA_BLOQUES = 16
+
+paginas = WsgiToAsgi(flask_app)
+
+client = None
+semaforos = {}
+en_vuelo = {}
+estadisticas = {"peticiones": 0, "upstream": 0, "coalescidas": 0, "rechazadas": 0}
+
+
+def get_client():
+    """Cliente httpx compartido (se crea dentro del loop que lo usa)"""
+    global client
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=PROXY_POOL_SIZE,
+                max_keepalive_connections=PROXY_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(PROXY_TIMEOUT, connect=PROXY_CONNECT_TIMEOUT, pool=None),
+        )
+    return client
+
+
+def semaforo(upstream):
+    if upstream not in semaforos:
+        semaforos[upstream] = asyncio.Semaphore(PROXY_LIMITES.get(upstream, PROXY_LIMITE))
+    return semaforos[upstream]
+
+
+class Vuelo:
+    """Una llamada a la API y los clientes que esperan su respuesta
+
+    Los clientes se suman mientras la API no ha respondido los headers; desde
+    ahi cada bloque se copia a la cola de cada cliente.
+    """
+
+    def __init__(self):
+        self.cabecera = asyncio.get_running_loop().create_future()
+        self.suscriptores = []
+        self.tarea = None
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=COLA_BLOQUES)
+        self.suscriptores.append(cola)
+        return cola
+
+    def retirar(self, cola):
+        if cola in self.suscriptores:
+            self.suscriptores.remove(cola)
+        # Libera un put() pendiente del upstream sobre esta cola
+        while not cola.empty():
+            cola.get_nowait()
+        if not self.suscriptores and self.tarea and not self.tarea.done():
+            # Nadie mas espera: se cancela la llamada a la API
+            self.tarea.cancel()
+
+
+async def volar(vuelo, clave, metodo, url, headers, cuerpo, upstream):
+    """Hace la llamada a la API y reparte headers y bloques a los suscriptores"""
+    try:
+        limite = semaforo(upstream)
+        try:
+            await asyncio.wait_for(limite.acquire(), PROXY_COLA_TIMEOUT)
+        except asyncio.TimeoutError:
+            estadisticas["rechazadas"] += 1
+            vuelo.cabecera.set_result(error_upstream(
+                503, f"Demasiadas peticiones simultaneas a {upstream}", {'Retry-After': '1'}
+            ))
+            return
+        try:
+            estadisticas["upstream"] += 1
+            peticion = get_client().build_request(metodo, url, headers=headers, content=cuerpo)
+            enviado = time.perf_counter()
+            response = await get_client().send(peticion, stream=True)
+            observar_upstream(upstream, response.status_code, response.headers, time.perf_counter() - enviado)
+            try:
+                response_headers = [
+                    (nombre.lower().encode('latin-1'), response.headers[nombre].encode('latin-1'))
+                    for nombre in HEADERS_RESPUESTA if nombre in response.headers
+                ]
+                vuelo.cabecera.set_result((response.status_code, response_headers, None))
+                # Desde aqui una peticion identica abre su propia llamada
+                if en_vuelo.get(clave) is vuelo:
+                    del en_vuelo[clave]
+                async for bloque in response.aiter_raw(PROXY_CHUNK_BYTES):
+                    for cola in list(vuelo.suscriptores):
+                        await cola.put(bloque)
+            finally:
+                await response.aclose()
+        finally:
+            limite.release()
+        fin = None
+    except httpx.TimeoutException:
+        fin = error_upstream(502, "Timeout al conectar con la API")
+    except httpx.ConnectError:
+        fin = error_upstream(502, "Error de conexion con la API")
+    except httpx.HTTPError as e:
+        fin = error_upstream(502, f"Error en la peticion: {str(e)}")
+    except Exception as e:
+        fin = error_upstream(500, f"Error interno del proxy: {str(e)}")
+    finally:
+        if en_vuelo.get(clave) is vuelo:
+            del en_vuelo[clave]
+
+    if not vuelo.cabecera.done():
+        vuelo.cabecera.set_result(fin)
+    elif fin is not None:
+        # Los headers ya se enviaron: solo queda cortar la respuesta
+        print(f"Error transmitiendo {url}: {fin[2]}")
+    for cola in list(vuelo.suscriptores):
+        await cola.put(None)
+
+
+def error_upstream(status, mensaje, headers=None):
+    cuerpo = json.dumps({"error": mensaje}).encode()
+    cabeceras = [(b'content-type', b'application/json'), (b'content-length', str(len(cuerpo)).encode())]
+    cabeceras += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return status, cabeceras, cuerpo
+
+
+async def leer_cuerpo(receive):
+    partes = []
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'http.disconnect':
+            return None
+        partes.append(mensaje.get('body', b''))
+        if not mensaje.get('more_body'):
+            return b''.join(partes)
+
+
+async def proxy(scope, receive, send):
+    """Proxy asincrono equivalente a proxy_api de app.py
+
+    Los GET identicos en vuelo (misma URL y mismos headers reenviados)
+    comparten una sola llamada a la API.
+    """
+    estadisticas["peticiones"] += 1
+    inicio = time.perf_counter()
+    metodo = scope['method']
+    if metodo not in ('GET', 'POST'):
+        await responder(send, *error_upstream(405, "Metodo no permitido"))
+        return
+
+    path = scope['path'][len('/api/'):]
+    api_url = f"{API_BASE}/{path}"
+    if scope['query_string']:
+        api_url += '?' + scope['query_string'].decode('latin-1')
+
+    recibidos = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    headers = {
+        nombre: recibidos[nombre.lower()]
+        for nombre in HEADERS_PETICION if nombre.lower() in recibidos
+    }
+    headers.setdefault('Accept-Encoding', 'identity')
+
+    cuerpo = None
+    if metodo == 'POST':
+        cuerpo = await leer_cuerpo(receive)
+        if cuerpo is None:
+            return
+
+    clave = (api_url, tuple(sorted(headers.items()))) if metodo == 'GET' else None
+    vuelo = en_vuelo.get(clave) if clave else None
+    if vuelo is None:
+        vuelo = Vuelo()
+        resultado = 'MISS'
+        if clave:
+            en_vuelo[clave] = vuelo
+        cola = vuelo.suscribir()
+        vuelo.tarea = asyncio.create_task(
+            volar(vuelo, clave, metodo, api_url, headers, cuerpo, upstream_de(path))
+        )
+    else:
+        estadisticas["coalescidas"] += 1
+        resultado = 'COALESCED'
+        cola = vuelo.suscribir()
+
+    desconexion = asyncio.create_task(esperar_desconexion(receive))
+    try:
+        espera = asyncio.ensure_future(asyncio.shield(vuelo.cabecera))
+        await asyncio.wait([espera, desconexion], return_when=asyncio.FIRST_COMPLETED)
+        if not espera.done():
+            espera.cancel()
+            return
+        status, response_headers, error = espera.result()
+        if error is not None:
+            resultado = 'ERROR'
+            await responder(send, status, response_headers, error)
+            return
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        while True:
+            siguiente = asyncio.ensure_future(cola.get())
+            await asyncio.wait([siguiente, desconexion], return_when=asyncio.FIRST_COMPLETED)
+            if not siguiente.done():
+                siguiente.cancel()
+                return
+            bloque = siguiente.result()
+            if bloque is None:
+                break
+            await send({'type': 'http.response.body', 'body': bloque, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        desconexion.cancel()
+        vuelo.retirar(cola)
+        PROXY_PETICIONES.observar(time.perf_counter() - inicio, upstream_de(path), resultado)
+
+
+async def esperar_desconexion(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def responder(send, status, headers, cuerpo):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': cuerpo})
+
+
+async def proxy_stats(send):
+    cuerpo = json.dumps({
+        **estadisticas,
+        "en_vuelo": len(en_vuelo),
+        "limites": {
+            nombre: {"limite": PROXY_LIMITES.get(nombre, PROXY_LIMITE), "libres": s._value}
+            for nombre, s in semaforos.items()
+        },
+    }).encode()
+    await responder(send, 200, [(b'content-type', b'application/json')], cuerpo)
+
+
+async def lifespan(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'lifespan.startup':
+            get_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensaje['type'] == 'lifespan.shutdown':
+            if client is not None:
+                await client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Aplicacion ASGI: /api/* asincrono, todo lo demas a Flask"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['path'] == '/proxy/stats':
+        await proxy_stats(send)
+    elif scope['type'] == 'http' and scope['path'].startswith('/api/'):
+        await proxy(scope, receive, send)
+    else:
+        await paginas(scope, receive, send)
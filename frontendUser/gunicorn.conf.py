@@ -0,0 +1,71 @@
+"""Configuracion de gunicorn para el frontend en produccion
+
+    gunicorn -c gunicorn.conf.py app:app                                         (WSGI, hilos)
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app       (ASGI)
+
+Con preload el codigo se importa una vez en el master; la sesion de requests
+(y el cliente httpx del modo ASGI) no abre conexiones hasta la primera
+llamada, asi que cada worker arranca con sus propias conexiones a la API.
+En modo WSGI el worker abre una conexion keep-alive a la API (GET /health)
+antes de recibir trafico.
+
+Recarga sin cortar peticiones: kill -HUP <master> arranca workers nuevos y
+deja que los viejos terminen lo que tienen en curso (GUNICORN_GRACEFUL_TIMEOUT).
+
+Variables de entorno: GUNICORN_BIND (0.0.0.0:5000), GUNICORN_WORKERS,
+GUNICORN_THREADS, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT,
+GUNICORN_MAX_REQUESTS y GUNICORN_PRELOAD (iguales a las de la API).
+"""
+import os
+import time
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(os.cpu_count() or 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+worker_class = "gthread"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+accesslog = "-"
+errorlog = "-"
+
+_inicio_master = time.perf_counter()
+
+
+def _rss():
+    """Memoria residente del proceso en MB (Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return f"{int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024:.1f} MB"
+    except (OSError, ValueError, IndexError):
+        return "?"
+
+
+def when_ready(server):
+    server.log.info("Master listo en %.2fs (%d workers, preload=%s)",
+                    time.perf_counter() - _inicio_master, workers, preload_app)
+
+
+def post_fork(server, worker):
+    worker.inicio_arranque = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Calienta la conexion a la API (modo WSGI) antes de recibir trafico"""
+    if worker.cfg.worker_class_str == "gthread":
+        import app
+
+        try:
+            app.session.get(f"{app.API_BASE}/health",
+                            timeout=(app.PROXY_CONNECT_TIMEOUT, app.PROXY_TIMEOUT)).close()
+        except Exception as e:
+            worker.log.warning("Worker %s: la API no responde al calentar (%s)", worker.pid, e)
+    worker.log.info("Worker %s listo en %.2fs, RSS %s",
+                    worker.pid, time.perf_counter() - worker.inicio_arranque, _rss())
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s termina, RSS %s", worker.pid, _rss())
@@ -0,0 +1,87 @@
+"""Prueba de carga del proxy /api del frontend
+
+Lanza rafagas de peticiones concurrentes contra uno o varios frontends y
+reporta throughput y latencias por nivel de concurrencia, para comparar el
+proxy sincrono (python app.py) con el asincrono (uvicorn asgi:app):
+
+    python loadtest.py \\
+        --url sync=http://localhost:5000 --url asgi=http://localhost:5001 \\
+        --path /api/hoja_vida/reporte_tiempo_experiencia/CC1001 \\
+        --concurrencia 1,10,50,200 --peticiones 400
+
+Con --distintas cada peticion lleva un query string diferente, asi el
+proxy asincrono no puede coalescer las llamadas.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def rafaga(client, url, concurrencia, peticiones, distintas):
+    latencias = []
+    errores = {}
+    pendientes = iter(range(peticiones))
+
+    async def trabajador():
+        for i in pendientes:
+            destino = f"{url}{'&' if '?' in url else '?'}_n={i}" if distintas else url
+            inicio = time.perf_counter()
+            try:
+                response = await client.get(destino)
+                await response.aread()
+                if response.status_code >= 400:
+                    errores[response.status_code] = errores.get(response.status_code, 0) + 1
+                else:
+                    latencias.append(time.perf_counter() - inicio)
+            except httpx.HTTPError as e:
+                errores[type(e).__name__] = errores.get(type(e).__name__, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+    return {
+        "ok": len(latencias),
+        "errores": errores,
+        "rps": len(latencias) / total if total else 0.0,
+        "p50": percentil(latencias, 50) * 1000,
+        "p95": percentil(latencias, 95) * 1000,
+        "p99": percentil(latencias, 99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del proxy del frontend")
+    parser.add_argument("--url", action="append", required=True,
+                        help="frontend a probar, como nombre=http://host:puerto (repetible)")
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--concurrencia", default="1,10,50,100")
+    parser.add_argument("--peticiones", type=int, default=200, help="peticiones por nivel")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--distintas", action="store_true", help="query string unico por peticion")
+    args = parser.parse_args()
+
+    niveles = [int(n) for n in args.concurrencia.split(",")]
+    objetivos = [u.split("=", 1) if "=" in u.split("://")[0] else (u, u) for u in args.url]
+
+    print(f"{'frontend':<10} {'conc':>5} {'ok':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errores")
+    for nombre, base in objetivos:
+        limites = httpx.Limits(max_connections=max(niveles), max_keepalive_connections=max(niveles))
+        async with httpx.AsyncClient(limits=limites, timeout=args.timeout) as client:
+            for concurrencia in niveles:
+                r = await rafaga(client, base.rstrip("/") + args.path, concurrencia,
+                                 max(args.peticiones, concurrencia), args.distintas)
+                print(f"{nombre:<10} {concurrencia:>5} {r['ok']:>6} {r['rps']:>9.1f} "
+                      f"{r['p50']:>9.1f} {r['p95']:>9.1f} {r['p99']:>9.1f}  {r['errores'] or ''}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -261,22 +261,30 @@ async function fetchTablaProducto(nombreTabla) {
 // Funcion para verificar el estado de la API
 async function pingHealth() {
     try {
-        setStatus('Verificando estado de la API...', 'loading');
+        setStatus('Verificando estado de la API y las bases de datos...', 'loading');
         setButtonsDisabled(true);
 
-        const response = await fetch(`${BASE}/health`);
-        const data = await handleApiResponse(response);
+        // /ready prueba MySQL, MariaDB y Postgres (503 si alguna no responde)
+        const response = await fetch('/api/ready');
+        const data = await response.json().catch(() => null);
 
-        // Limpiar tabla ya que health no devuelve datos tabulares
+        // Limpiar tabla ya que ready no devuelve datos tabulares
         currentData = [];
         tableHead.innerHTML = '';
         renderRows([]);
         paginationContainer.innerHTML = '';
 
+        if (!data || !data.backends) {
+            setStatus(`API respondió con estado: ${response.status}`, 'error');
+            return;
+        }
+        const detalle = Object.entries(data.backends)
+            .map(([nombre, b]) => b.ok ? `${nombre} ok (${b.latency_ms} ms)` : `${nombre} caido: ${b.error}`)
+            .join(' | ');
         if (response.ok) {
-            setStatus('API funcionando correctamente', 'success');
+            setStatus(`API funcionando correctamente: ${detalle}`, 'success');
         } else {
-            setStatus(`API respondió con estado: ${response.status}`, 'error');
+            setStatus(`API sin acceso a todas las bases: ${detalle}`, 'error');
         }
     } catch (error) {
         console.error('Error al verificar health:', error);
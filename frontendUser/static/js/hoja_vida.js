@@ -36,6 +36,7 @@ const paginationContainer = document.getElementById('pagination');
 
 // Botones
 const reporteExperienciaBtn = document.getElementById('reporteExperienciaBtn');
+const hojaVidaBtn = document.getElementById('hojaVidaBtn');
 const consultarTablaBtn = document.getElementById('consultarTablaBtn');
 const healthBtn = document.getElementById('healthBtn');
 
@@ -52,6 +53,7 @@ function setStatus(message, type = 'info') {
 // Funcion para deshabilitar/habilitar botones
 function setButtonsDisabled(disabled) {
     reporteExperienciaBtn.disabled = disabled;
+    hojaVidaBtn.disabled = disabled;
     consultarTablaBtn.disabled = disabled;
     healthBtn.disabled = disabled;
 }
@@ -251,6 +253,66 @@ async function fetchReporteExperiencia(numeroDocumento) {
     }
 }
 
+// Secciones de la hoja de vida completa (en el orden en que se muestran)
+const SECCIONES_HOJA_VIDA = [
+    ['libreta_militar', 'Libreta militar'],
+    ['idiomas', 'Idioma'],
+    ['educacion_basica', 'Educación básica'],
+    ['educacion_superior', 'Educación superior'],
+    ['experiencia_laboral', 'Experiencia laboral'],
+    ['reporte_experiencia', 'Reporte de experiencia'],
+];
+
+// Funcion para aplanar la hoja de vida en filas (seccion, registro, campo, valor)
+function aplanarHojaVida(data) {
+    const filas = [];
+    const agregar = (seccion, registro, objeto) => {
+        Object.entries(objeto).forEach(([campo, valor]) => {
+            filas.push({ seccion, registro, campo, valor: valor === null ? '' : String(valor) });
+        });
+    };
+
+    agregar('Persona', 1, data.persona);
+    SECCIONES_HOJA_VIDA.forEach(([clave, titulo]) => {
+        const valor = data[clave];
+        const registros = Array.isArray(valor) ? valor : (valor ? [valor] : []);
+        registros.forEach((registro, i) => agregar(titulo, i + 1, registro));
+    });
+    return filas;
+}
+
+// Funcion para obtener la hoja de vida completa (una sola llamada a la API)
+async function fetchHojaVida(numeroDocumento) {
+    if (!numeroDocumento || numeroDocumento.trim().length === 0) {
+        setStatus('Por favor ingrese un número de documento válido', 'error');
+        return;
+    }
+
+    try {
+        setStatus(`Obteniendo hoja de vida para documento: ${numeroDocumento}...`, 'loading');
+        setButtonsDisabled(true);
+
+        const encodedDocumento = encodeURIComponent(numeroDocumento.trim());
+        const response = await fetch(`${BASE}/hoja_vida/persona/${encodedDocumento}`);
+        const data = await handleApiResponse(response);
+
+        currentData = aplanarHojaVida(data);
+        currentPage = 1;
+        tableHead.innerHTML = '';
+        paginate(currentData, currentPage);
+        setStatus(`Hoja de vida de ${data.persona.nombres} ${data.persona.primer_apellido} (${data.numero_documento})`, 'success');
+    } catch (error) {
+        console.error('Error al obtener hoja de vida:', error);
+        setStatus(`Error al obtener hoja de vida: ${error.message}`, 'error');
+        currentData = [];
+        tableHead.innerHTML = '';
+        renderRows([]);
+        paginationContainer.innerHTML = '';
+    } finally {
+        setButtonsDisabled(false);
+    }
+}
+
 // Funcion para consultar tabla del sistema
 async function fetchTablaPersona(nombreTabla) {
     if (!nombreTabla) {
@@ -296,22 +358,30 @@ async function fetchTablaPersona(nombreTabla) {
 // Funcion para verificar el estado de la API
 async function pingHealth() {
     try {
-        setStatus('Verificando estado de la API...', 'loading');
+        setStatus('Verificando estado de la API y las bases de datos...', 'loading');
         setButtonsDisabled(true);
 
-        const response = await fetch(`${BASE}/health`);
-        const data = await handleApiResponse(response);
+        // /ready prueba MySQL, MariaDB y Postgres (503 si alguna no responde)
+        const response = await fetch('/api/ready');
+        const data = await response.json().catch(() => null);
 
-        // Limpiar tabla ya que health no devuelve datos tabulares
+        // Limpiar tabla ya que ready no devuelve datos tabulares
         currentData = [];
         tableHead.innerHTML = '';
         renderRows([]);
         paginationContainer.innerHTML = '';
 
+        if (!data || !data.backends) {
+            setStatus(`API respondió con estado: ${response.status}`, 'error');
+            return;
+        }
+        const detalle = Object.entries(data.backends)
+            .map(([nombre, b]) => b.ok ? `${nombre} ok (${b.latency_ms} ms)` : `${nombre} caido: ${b.error}`)
+            .join(' | ');
         if (response.ok) {
-            setStatus('API funcionando correctamente', 'success');
+            setStatus(`API funcionando correctamente: ${detalle}`, 'success');
         } else {
-            setStatus(`API respondió con estado: ${response.status}`, 'error');
+            setStatus(`API sin acceso a todas las bases: ${detalle}`, 'error');
         }
     } catch (error) {
         console.error('Error al verificar health:', error);
@@ -358,6 +428,14 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    // Evento para hoja de vida completa
+    hojaVidaBtn.addEventListener('click', function () {
+        const numeroDocumento = numeroDocumentoInput.value.trim();
+        if (validateTextInput(numeroDocumentoInput)) {
+            fetchHojaVida(numeroDocumento);
+        }
+    });
+
     // Evento para consultar tabla
     consultarTablaBtn.addEventListener('click', function () {
         const nombreTabla = tablaPersonaSelect.value;
@@ -6,6 +6,8 @@ const BASE = "/api/mundo";
 let currentData = [];
 let currentPage = 1;
 const pageSize = 100;
+// Filas por pagina pedidas a la API al cargar todo
+const apiPageSize = 5000;
 
 // Elementos del DOM
 const statusArea = document.getElementById('statusArea');
@@ -126,21 +128,37 @@ async function handleApiResponse(response) {
 }
 
 // Funcion para cargar todos los datos
+// Se pide por paginas (keyset) usando el cursor que devuelve la API en X-Next-After
 async function fetchAll() {
     try {
         setStatus('Cargando todos los paises, estados y ciudades...', 'loading');
         setButtonsDisabled(true);
 
-        const response = await fetch(`${BASE}/mundo/obtenerPaisesEstadosCiudades`);
-        const data = await handleApiResponse(response);
-
-        if (Array.isArray(data) && data.length > 0) {
-            currentData = data;
-            currentPage = 1;
-            paginate(currentData, currentPage);
-            setStatus(`Se cargaron ${data.length} registros exitosamente`, 'success');
+        currentData = [];
+        currentPage = 1;
+        let after = null;
+
+        do {
+            const query = `limit=${apiPageSize}` + (after ? `&after=${after}` : '');
+            const response = await fetch(`${BASE}/obtenerPaisesEstadosCiudades?${query}`);
+            const data = await handleApiResponse(response);
+
+            if (Array.isArray(data)) {
+                currentData = currentData.concat(data);
+            }
+            after = response.headers.get('X-Next-After');
+
+            if (currentData.length > 0) {
+                paginate(currentData, currentPage);
+                if (after) {
+                    setStatus(`Cargando... ${currentData.length} registros recibidos`, 'loading');
+                }
+            }
+        } while (after);
+
+        if (currentData.length > 0) {
+            setStatus(`Se cargaron ${currentData.length} registros exitosamente`, 'success');
         } else {
-            currentData = [];
             renderRows([]);
             paginationContainer.innerHTML = '';
             setStatus('No se encontraron datos', 'empty');
@@ -235,21 +253,29 @@ async function fetchDuplicates(countryName) {
 // Funcion para verificar el estado de la API
 async function pingHealth() {
     try {
-        setStatus('Verificando estado de la API...', 'loading');
+        setStatus('Verificando estado de la API y las bases de datos...', 'loading');
         setButtonsDisabled(true);
 
-        const response = await fetch(`${BASE}/health`);
-        const data = await handleApiResponse(response);
+        // /ready prueba MySQL, MariaDB y Postgres (503 si alguna no responde)
+        const response = await fetch('/api/ready');
+        const data = await response.json().catch(() => null);
 
-        // Limpiar tabla ya que health no devuelve datos tabulares
+        // Limpiar tabla ya que ready no devuelve datos tabulares
         currentData = [];
         renderRows([]);
         paginationContainer.innerHTML = '';
 
+        if (!data || !data.backends) {
+            setStatus(`API respondio con estado: ${response.status}`, 'error');
+            return;
+        }
+        const detalle = Object.entries(data.backends)
+            .map(([nombre, b]) => b.ok ? `${nombre} ok (${b.latency_ms} ms)` : `${nombre} caido: ${b.error}`)
+            .join(' | ');
         if (response.ok) {
-            setStatus('API funcionando correctamente', 'success');
+            setStatus(`API funcionando correctamente: ${detalle}`, 'success');
         } else {
-            setStatus(`API respondio con estado: ${response.status}`, 'error');
+            setStatus(`API sin acceso a todas las bases: ${detalle}`, 'error');
         }
     } catch (error) {
         console.error('Error al verificar health:', error);
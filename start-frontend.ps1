@@ -31,9 +31,13 @@ if (Test-Path "requirements.txt") {
     Write-Host "Warning: No se encontró requirements.txt" -ForegroundColor Yellow
 }
 
-# Ejecutar la aplicación Flask
-Write-Host "Iniciando aplicación Flask..." -ForegroundColor Yellow
-if (Test-Path "app.py") {
+# Ejecutar la aplicación Flask ($env:FRONTEND_MODO = "asgi" para el proxy asíncrono)
+# gunicorn no corre en Windows: para producción con varios workers usar start-frontend.sh
+if ($env:FRONTEND_MODO -eq "asgi") {
+    Write-Host "Iniciando aplicación en modo ASGI (uvicorn)..." -ForegroundColor Yellow
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+} elseif (Test-Path "app.py") {
+    Write-Host "Iniciando aplicación Flask..." -ForegroundColor Yellow
     python app.py
 } else {
     Write-Host "Error: No se encontró app.py" -ForegroundColor Red
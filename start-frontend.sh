@@ -33,9 +33,19 @@ else
     echo "Warning: No se encontró requirements.txt"
 fi
 
-# Ejecutar la aplicación Flask
-echo "Iniciando aplicación Flask..."
-if [ -f "app.py" ]; then
+# Ejecutar la aplicación Flask (FRONTEND_MODO=asgi para el proxy asíncrono,
+# gunicorn / gunicorn-asgi para producción con varios workers)
+if [ "$FRONTEND_MODO" = "gunicorn" ]; then
+    echo "Iniciando aplicación con gunicorn..."
+    gunicorn -c gunicorn.conf.py app:app
+elif [ "$FRONTEND_MODO" = "gunicorn-asgi" ]; then
+    echo "Iniciando aplicación con gunicorn (workers ASGI)..."
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+elif [ "$FRONTEND_MODO" = "asgi" ]; then
+    echo "Iniciando aplicación en modo ASGI (uvicorn)..."
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+elif [ -f "app.py" ]; then
+    echo "Iniciando aplicación Flask..."
     python app.py
 else
     echo "Error: No se encontró app.py"